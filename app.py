@@ -1,13 +1,58 @@
+import os
 import argparse 
-from mode import Mode
+import threading
+from argparse import Namespace
+from contextlib import contextmanager
+from rich.markup import escape
+from mode import Mode, PathArgument
 from typing import Type
 from console import Console
+from profiler import profiled
+
+class ArgumentParser(argparse.ArgumentParser):
+    """
+    ArgumentParser printing its usage, help and errors to the console set by
+    `redirect` for the current thread, if any. The sessions of the serve
+    daemon parse their command lines concurrently.
+    """
+
+    _output = threading.local()
+
+    @classmethod
+    @contextmanager
+    def redirect(cls, console: Console):
+        cls._output.console = console
+        try:
+            yield
+        finally:
+            cls._output.console = None
+
+    def _print_message(self, message: str, file=None):
+        console = getattr(self._output, "console", None)
+        if console is None:
+            super()._print_message(message, file)
+        elif message:
+            console.print(escape(message), end="")
+
+def resolve_paths(args: Namespace, cwd: str):
+    """Makes the relative path arguments of `args` relative to `cwd` instead of the current directory."""
+    for key, value in vars(args).items():
+        if isinstance(value, PathArgument):
+            setattr(args, key, PathArgument(os.path.normpath(os.path.join(cwd, value))))
+        elif isinstance(value, list):
+            setattr(args, key, [PathArgument(os.path.normpath(os.path.join(cwd, v))) if isinstance(v, PathArgument) else v for v in value])
 
 class App:
     modes: dict[str, Mode] = {}
 
+    # Options handled by the App itself, not forwarded to the modes
+    GLOBAL_ARGS = {"mode", "no_daemon", "profile", "profile_dir"}
+
     def __init__(self, console: Console):
-        self.parser = argparse.ArgumentParser()
+        self.parser = ArgumentParser()
+        self.parser.add_argument("--no-daemon", action="store_true", help="Run locally even if a serve daemon is running")
+        self.parser.add_argument("--profile", action="store_true", help="Profile the mode and write the reports to --profile-dir")
+        self.parser.add_argument("--profile-dir", type=str, default="profile", metavar="DIR", help="Directory of the profile reports (default: ./profile)")
         self.subparser = self.parser.add_subparsers(dest="mode", required=True)
         self.console = console
 
@@ -15,9 +60,19 @@ class App:
         self.modes[name] = mode
         mode.add_subparser(name, self.subparser)
 
+    def create(self, args: Namespace, console: Console) -> Mode:
+        dargs = {k: v for k, v in args.__dict__.items() if k not in self.GLOBAL_ARGS}
+
+        mode = self.modes[args.mode](console, **dargs)
+        mode.app = self
+        return mode
+
     def run(self):
         args = self.parser.parse_args()
-        dargs = {k: v for k, v in args.__dict__.items() if k != "mode"}
 
-        mode = self.modes[args.mode](self.console, **dargs)
-        mode.run()
\ No newline at end of file
+        mode = self.create(args, self.console)
+        if args.profile:
+            with profiled(args.profile_dir, self.console):
+                mode.run()
+        else:
+            mode.run()
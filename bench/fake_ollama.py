@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Ollama-compatible stand-in server.
+
+Serves the endpoints the modes call, /api/chat (NDJSON streaming),
+/api/embed and the OpenAI-style /v1/embeddings, with the answers and
+bag-of-words embeddings of bench/fakes.py. At most `slots` generations run
+at once, like OLLAMA_NUM_PARALLEL, the other requests wait in line.
+
+    python -m bench.fake_ollama --port 11435 --slots 4
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from bench.fakes import DEFAULT_RESPONSE, FakeEmbeddings, count
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/version":
+            self._send_json({"version": "0.0.0-fake"})
+        elif self.path == "/api/tags":
+            self._send_json({"models": []})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        request = self._read_json()
+        if self.path == "/api/chat":
+            self._chat(request)
+        elif self.path == "/api/embed":
+            embeddings = self.server.embeddings.embed_documents(self._texts(request["input"]))
+            self._send_json({"model": request.get("model"), "embeddings": embeddings})
+        elif self.path == "/v1/embeddings":
+            embeddings = self.server.embeddings.embed_documents(self._texts(request["input"]))
+            self._send_json({
+                "object": "list",
+                "model": request.get("model"),
+                "data": [{"object": "embedding", "index": i, "embedding": e} for i, e in enumerate(embeddings)],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            })
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    @staticmethod
+    def _texts(inputs) -> list[str]:
+        # Inputs may be a string, strings, or token ids from OpenAI clients
+        if isinstance(inputs, str):
+            return [inputs]
+        return [item if isinstance(item, str) else " ".join(map(str, item)) for item in inputs]
+
+    def _chat(self, request: dict):
+        server = self.server
+        model = request.get("model")
+        tokens = server.response.split(" ")
+        tokens = [token + " " for token in tokens[:-1]] + tokens[-1:]
+        prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in request.get("messages", []))
+
+        def message(content: str, done: bool) -> dict:
+            payload = {
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "message": {"role": "assistant", "content": content},
+                "done": done,
+            }
+            if done:
+                payload.update({"done_reason": "stop", "prompt_eval_count": prompt_tokens, "eval_count": len(tokens)})
+            return payload
+
+        with server.slots:
+            count(llm_calls=1)
+            time.sleep(server.latency)
+
+            if request.get("stream", True) is False:
+                time.sleep(len(tokens) / server.tokens_per_second)
+                self._send_json(message("".join(tokens), True))
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for i, token in enumerate(tokens):
+                    if i:
+                        time.sleep(1 / server.tokens_per_second)
+                    self._chunk(message(token, False))
+                self._chunk(message("", True))
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client cancelled the generation
+                pass
+
+    def _chunk(self, payload: dict):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """HTTP server answering like Ollama, see the module docstring."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int = 0,
+        slots: int = 4,
+        latency: float = 0.05,
+        tokens_per_second: float = 200.0,
+        embedding_latency: float = 0.01,
+        response: str = DEFAULT_RESPONSE):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.slots = threading.BoundedSemaphore(slots)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.embeddings = FakeEmbeddings(latency=embedding_latency)
+        self.response = response
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama-compatible stand-in server")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--slots", type=int, default=4, help="Generations running at once")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--embedding-latency", type=float, default=0.01)
+    options = parser.parse_args()
+
+    server = FakeOllamaServer(options.port, options.slots, options.latency, options.tokens_per_second, options.embedding_latency)
+    print(f"Listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
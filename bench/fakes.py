@@ -0,0 +1,261 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Any, Iterator
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from console import Console
+import resources
+
+# Calls made to the fakes since the last reset, read by the benchmarks
+COUNTERS = {"llm_calls": 0, "embedding_calls": 0, "embedded_texts": 0, "transcript_listings": 0, "transcript_fetches": 0}
+_counters_lock = threading.Lock()
+
+def count(**increments):
+    with _counters_lock:
+        for name, value in increments.items():
+            COUNTERS[name] += value
+
+def reset_counters():
+    with _counters_lock:
+        for name in COUNTERS:
+            COUNTERS[name] = 0
+
+DEFAULT_RESPONSE = (
+    "Voici une réponse générée par le modèle de test. Elle contient assez de mots "
+    "pour simuler un flux de tokens réaliste, avec une ponctuation ordinaire, "
+    "quelques phrases courtes et une conclusion."
+)
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model streaming a fixed answer at a configurable pace.
+
+    With tools bound, it first calls every tool once, then answers. Its
+    structured outputs get `rating` in their integer fields and the answer
+    in the others.
+    """
+
+    response: str = DEFAULT_RESPONSE
+    # Seconds before the first token
+    latency: float = 0.05
+    tokens_per_second: float = 200.0
+    rating: int = 80
+    tools: list[dict] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"tools": [convert_to_openai_tool(tool) for tool in tools]})
+
+    def with_structured_output(self, schema, **kwargs):
+        def structured(input) -> Any:
+            count(llm_calls=1)
+            time.sleep(self.latency)
+            return schema(**{
+                name: self.rating if field.annotation is int else self.response
+                for name, field in schema.model_fields.items()
+            })
+        return RunnableLambda(structured)
+
+    def _tool_calls(self) -> list[dict]:
+        calls = []
+        for i, tool in enumerate(self.tools):
+            properties = tool["function"]["parameters"].get("properties", {})
+            args = {name: j + 2 if spec.get("type") == "integer" else "test" for j, (name, spec) in enumerate(properties.items())}
+            calls.append({"name": tool["function"]["name"], "args": args, "id": f"call_{i}", "type": "tool_call"})
+        return calls
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str]|None = None,
+        run_manager: CallbackManagerForLLMRun|None = None,
+        **kwargs: Any) -> ChatResult:
+        if self.tools and not isinstance(messages[-1], ToolMessage):
+            count(llm_calls=1)
+            time.sleep(self.latency)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content="", tool_calls=self._tool_calls()))])
+
+        chunks = list(self._stream(messages, stop, None, **kwargs))
+        message = AIMessage(
+            content="".join(chunk.message.content for chunk in chunks),
+            usage_metadata=chunks[-1].message.usage_metadata)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str]|None = None,
+        run_manager: CallbackManagerForLLMRun|None = None,
+        **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        count(llm_calls=1)
+        time.sleep(self.latency)
+
+        tokens = re.findall(r"\S+\s*", self.response)
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+        input_tokens = sum(len(str(message.content).split()) for message in messages)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": len(tokens),
+            "total_tokens": input_tokens + len(tokens),
+        }))
+
+@lru_cache(maxsize=65536)
+def _word_vector(word: str, size: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(word.encode()).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(size).astype(np.float32)
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings: texts sharing words get close
+    vectors, so retrieval and the semantic cache behave plausibly.
+    """
+
+    def __init__(self, size: int = 256, latency: float = 0.01, per_text: float = 0.0):
+        self.size = size
+        self.latency = latency
+        self.per_text = per_text
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector += _word_vector(word, self.size)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        count(embedding_calls=1, embedded_texts=len(texts))
+        time.sleep(self.latency + self.per_text * len(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        count(embedding_calls=1, embedded_texts=1)
+        time.sleep(self.latency)
+        return self._embed(text)
+
+def install(chat_model: BaseChatModel, embeddings: Embeddings):
+    """Makes the resources registry hand out the fakes to every mode."""
+    resources.chat_model = lambda *args, **kwargs: chat_model
+    resources.embeddings = lambda *args, **kwargs: embeddings
+
+class ScriptExhausted(Exception):
+    pass
+
+class ScriptedConsole(Console):
+    """Console answering the modes' prompts from a list, output discarded."""
+
+    def __init__(self, inputs: list[str]):
+        super().__init__(file=open(os.devnull, "w"))
+        self.inputs = list(inputs)
+        self.chunk_times: list[float] = []
+
+    def human_input(self) -> str:
+        if not self.inputs:
+            raise ScriptExhausted()
+        return self.inputs.pop(0)
+
+    def bot_chunk(self, chunk: str):
+        self.chunk_times.append(time.perf_counter())
+        super().bot_chunk(chunk)
+
+class FakeTranscript:
+    """Transcript of FakeTranscriptApi, each fetch costs `latency` seconds."""
+
+    def __init__(self, language_code: str, latency: float, text: str, translatable: bool = True, fails: bool = False):
+        self.language_code = language_code
+        self.latency = latency
+        self.text = text
+        self.is_generated = True
+        self.is_translatable = translatable
+        self.fails = fails
+
+    def fetch(self):
+        count(transcript_fetches=1)
+        time.sleep(self.latency)
+        if self.fails:
+            raise RuntimeError(f"Transcript {self.language_code} unavailable")
+        return [{"text": word} for word in self.text.split()]
+
+    def translate(self, language_code: str) -> "FakeTranscript":
+        # Only translations to English succeed, the worst case for the
+        # French-first resolution order
+        return FakeTranscript(language_code, self.latency, self.text, translatable=False, fails=language_code != "en" or self.fails)
+
+class FakeTranscriptList:
+    def __init__(self, transcripts: list[FakeTranscript]):
+        self.transcripts = transcripts
+
+    def __iter__(self):
+        return iter(self.transcripts)
+
+    def find_transcript(self, language_codes: list[str]) -> FakeTranscript:
+        for transcript in self.transcripts:
+            if transcript.language_code in language_codes:
+                return transcript
+        raise LookupError(f"No transcript in {language_codes}")
+
+class FakeTranscriptApi:
+    """
+    Stand-in for YouTubeTranscriptApi: no French transcript, `languages`
+    translatable transcripts of which only the last one can be fetched.
+    """
+
+    def __init__(self, languages: int = 4, latency: float = 0.2, words: int = 2000):
+        self.languages = languages
+        self.latency = latency
+        self.text = " ".join(f"mot{i}" for i in range(words))
+
+    def list_transcripts(self, video_id: str) -> FakeTranscriptList:
+        count(transcript_listings=1)
+        time.sleep(self.latency)
+        return FakeTranscriptList([
+            FakeTranscript(f"l{i}", self.latency, self.text, fails=i < self.languages - 1)
+            for i in range(self.languages)
+        ])
+
+def write_pdf(path: str, pages: list[list[str]]):
+    """Writes a minimal PDF, one page per list of text lines, for PyPDFLoader."""
+    def text(line: str) -> bytes:
+        data = line.encode("cp1252", errors="replace")
+        return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (4 + 2 * i) for i in range(len(pages))) + b"] /Count %d >>" % len(pages),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for i, lines in enumerate(pages):
+        stream = b"BT /F1 10 Tf 12 TL 40 800 Td " + b" T* ".join(text(line) + b" Tj" for line in lines) + b" ET"
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (5 + 2 * i))
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
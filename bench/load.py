@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Concurrent-session load test of the chat stack.
+
+Virtual users replay scripted conversations through the ChatMode or
+BookMode classes, all in this process like sessions of the serve daemon,
+against the Ollama-compatible stand-in of bench/fake_ollama.py or against
+--target. The number of users ramps up stage by stage, each stage reports
+throughput, TTFT and end-to-end latency percentiles and the error rate.
+
+    python -m bench.load --mode chat --users 1 2 4 8 16 --slots 4
+    python -m bench.load --mode book --target http://localhost:11434 --model llama3.2:1b
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from console import Console
+from bench.fakes import ScriptedConsole, ScriptExhausted
+from bench.run import ROOT, QUESTIONS, _read_haikus
+
+class TimedConsole(ScriptedConsole):
+    """Scripted console recording the TTFT and latency of each turn."""
+
+    def __init__(self, inputs: list[str], think: float = 0.0):
+        super().__init__(inputs)
+        self.think = think
+        self.turns: list[dict] = []
+        self._start: float|None = None
+        self._first: float|None = None
+
+    def human_input(self) -> str:
+        # The previous answer is complete once the mode asks again
+        self.end_turn()
+        if self.inputs and self.think:
+            time.sleep(self.think)
+        user_input = super().human_input()
+        self._start = time.perf_counter()
+        self._first = None
+        return user_input
+
+    def bot_chunk(self, chunk: str):
+        if self._start is not None and self._first is None:
+            self._first = time.perf_counter()
+        super().bot_chunk(chunk)
+
+    def end_turn(self):
+        if self._start is None:
+            return
+        self.turns.append({
+            "ttft": self._first - self._start if self._first is not None else None,
+            "latency": time.perf_counter() - self._start,
+        })
+        self._start = None
+
+    def fail(self, error: Exception):
+        self.turns.append({"error": f"{type(error).__name__}: {error}"})
+        self._start = None
+
+def virtual_user(user: int, options) -> list[dict]:
+    from modes.chat_mode import ChatMode
+    from modes.book_mode import BookMode
+
+    # Users start at different questions so that prompts differ
+    questions = [QUESTIONS[(user + i) % len(QUESTIONS)] for i in range(options.turns)]
+    console = TimedConsole(questions, options.think)
+    try:
+        if options.mode == "chat":
+            try:
+                ChatMode(console, model=options.model).run()
+            except ScriptExhausted:
+                pass
+        else:
+            # BookMode answers one question per run, answers are not cached
+            # so that every turn reaches the model
+            while console.inputs:
+                BookMode(console, model=options.model, no_cache=True, retrieval="dense").run()
+            console.end_turn()
+    except Exception as e:
+        console.fail(e)
+    return console.turns
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+def run_stage(users: int, options) -> dict:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        sessions = list(executor.map(lambda user: virtual_user(user, options), range(users)))
+    wall = time.perf_counter() - start
+
+    turns = [turn for session in sessions for turn in session]
+    completed = [turn for turn in turns if "error" not in turn]
+    errors = [turn["error"] for turn in turns if "error" in turn]
+    return {
+        "users": users,
+        "wall": wall,
+        "turns": len(completed),
+        "errors": len(errors),
+        "error_rate": len(errors) / len(turns) if turns else 0.0,
+        "throughput": len(completed) / wall if wall else 0.0,
+        "ttft": _percentiles([turn["ttft"] for turn in completed if turn["ttft"] is not None]),
+        "latency": _percentiles([turn["latency"] for turn in completed]),
+        "first_error": errors[0] if errors else None,
+    }
+
+def setup_book_store():
+    import resources
+    from langchain_openai import OpenAIEmbeddings
+    # Send raw text, the stand-in server has no use for tiktoken token ids
+    resources._embeddings[("openai", None)] = OpenAIEmbeddings(check_embedding_ctx_length=False)
+    resources.vector_store(os.getenv("BOOK_COLLECTION"), "openai").add_texts(_read_haikus())
+
+def _ms(value: float|None) -> str:
+    return f"{value * 1000:7.0f}" if value is not None else "      -"
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test")
+    parser.add_argument("--mode", choices=["chat", "book"], default="chat")
+    parser.add_argument("--users", nargs="*", type=int, default=[1, 2, 4, 8, 16], help="Concurrent users of each stage")
+    parser.add_argument("--turns", type=int, default=5, help="Questions asked by each user")
+    parser.add_argument("--think", type=float, default=0.0, help="Seconds a user waits before each question")
+    parser.add_argument("--model", type=str, default="llama3.2:1b")
+    parser.add_argument("--target", type=str, default=None, help="Ollama-compatible server to load instead of the stand-in")
+    parser.add_argument("--slots", type=int, default=4, help="Stand-in generations running at once")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stand-in seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--embedding-latency", type=float, default=0.01)
+    parser.add_argument("--out", type=str, default=None, help="Write the results to this JSON file")
+    options = parser.parse_args()
+
+    console = Console()
+
+    server = None
+    if options.target:
+        url = options.target.rstrip("/")
+    else:
+        from bench.fake_ollama import FakeOllamaServer
+        server = FakeOllamaServer(
+            slots=options.slots,
+            latency=options.latency,
+            tokens_per_second=options.tokens_per_second,
+            embedding_latency=options.embedding_latency).start()
+        url = server.url
+        console.info(f"Stand-in server on {url} ({options.slots} slots)")
+
+    stages = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            "OLLAMA_HOST": url,
+            "OPENAI_BASE_URL": url + "/v1",
+            "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "load-test",
+            "PROMPTS_DIR": os.path.join(ROOT, "prompts"),
+            "VECTOR_STORE_DATA": os.path.join(tmp, "store"),
+            "CACHE_DIR": os.path.join(tmp, "cache") + os.sep,
+            "METRICS_FILE": os.path.join(tmp, "metrics.jsonl"),
+            "ROUTING_LOG": os.path.join(tmp, "routing.jsonl"),
+            "BOOK_COLLECTION": "books",
+        })
+        if options.mode == "book":
+            setup_book_store()
+
+        console.info("users | turns/s | ttft p50   p95   p99 (ms) | e2e p50   p95   p99 (ms) | errors")
+        for users in options.users:
+            stage = run_stage(users, options)
+            stages.append(stage)
+            ttft, latency = stage["ttft"], stage["latency"]
+            console.info(
+                f"{users:>5} | {stage['throughput']:7.2f} | "
+                f"{_ms(ttft['p50'])}{_ms(ttft['p95'])}{_ms(ttft['p99'])} | "
+                f"{_ms(latency['p50'])}{_ms(latency['p95'])}{_ms(latency['p99'])} | "
+                f"{stage['error_rate']:.1%}")
+            if stage["first_error"]:
+                console.error(stage["first_error"])
+
+    if server:
+        server.shutdown()
+
+    if options.out:
+        with open(options.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": time.time(),
+                "options": {k: v for k, v in vars(options).items() if k != "out"},
+                "stages": stages,
+            }, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
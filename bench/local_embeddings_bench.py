@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Local hashed n-gram embeddings against an Ollama embedding model.
+
+Reports the encoding throughput of both backends, then the latency per
+query (query embedding and brute-force search) and recall@k on haikus.txt.
+Each query is a few words drawn from one haiku, which is the expected
+answer. The agreement column is the overlap of the local top k with the
+reference top k.
+
+    python -m bench.local_embeddings_bench --reference mxbai-embed-large --scale 50
+"""
+import sys
+import time
+import random
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+from console import Console
+from local_embeddings import HashedNgramEmbeddings
+from bench.run import _read_haikus
+
+def make_queries(haikus: list[str], count: int, words: int, seed: int = 0) -> list[tuple[str, int]]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        index = rng.randrange(len(haikus))
+        tokens = haikus[index].split()
+        queries.append((" ".join(rng.sample(tokens, min(words, len(tokens)))), index))
+    return queries
+
+def evaluate(embed_query, matrix: np.ndarray, queries: list[tuple[str, int]], k: int) -> tuple[float, float, list[set]]:
+    """Returns the mean latency per query, recall@k and the top k of each query."""
+    hits = 0
+    tops = []
+    start = time.perf_counter()
+    for query, expected in queries:
+        scores = matrix @ np.asarray(embed_query(query), dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        tops.append(set(top.tolist()))
+        hits += expected in tops[-1]
+    return (time.perf_counter() - start) / len(queries), hits / len(queries), tops
+
+def normalized(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local embeddings benchmark")
+    parser.add_argument("--reference", type=str, default="mxbai-embed-large", help="Ollama embedding model compared against")
+    parser.add_argument("--scale", type=int, default=50, help="Copies of haikus.txt encoded for the throughput")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--words", type=int, default=3, help="Words of the haiku kept in each query")
+    parser.add_argument("--k", type=int, default=4)
+    options = parser.parse_args()
+
+    load_dotenv()
+    console = Console()
+    haikus = _read_haikus()
+    queries = make_queries(haikus, options.queries, options.words)
+    corpus = haikus * options.scale
+
+    local = HashedNgramEmbeddings()
+    start = time.perf_counter()
+    for i in range(0, len(corpus), options.batch_size):
+        local.encode(corpus[i:i + options.batch_size])
+    throughput = len(corpus) / (time.perf_counter() - start)
+    matrix = local.encode(haikus)
+    latency, recall, local_tops = evaluate(local.embed_query, matrix, queries, options.k)
+    console.info(f"{local.name:<28} : {throughput:9.0f} texts/s | {latency * 1000:7.2f} ms/query | recall@{options.k} {recall:.3f}")
+
+    try:
+        import resources
+        reference = resources.embeddings("ollama", options.reference)
+        start = time.perf_counter()
+        vectors = reference.embed_documents(haikus)
+        throughput = len(haikus) / (time.perf_counter() - start)
+    except Exception as e:
+        console.error(f"Reference model {options.reference} unavailable : {e}")
+        return 1
+
+    latency, recall, reference_tops = evaluate(reference.embed_query, normalized(vectors), queries, options.k)
+    agreement = np.mean([len(a & b) / options.k for a, b in zip(local_tops, reference_tops)])
+    console.info(f"{options.reference:<28} : {throughput:9.0f} texts/s | {latency * 1000:7.2f} ms/query | recall@{options.k} {recall:.3f}")
+    console.info(f"Top {options.k} agreement of the local backend with {options.reference} : {agreement:.1%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Quantized index against exact float32 search.
+
+Reports, for float32 brute force and each quantization, the bytes scanned
+per query and on disk, the query latency and recall@k against the exact
+results. The disk size of a quantized index includes its float32 re-rank
+vectors.
+Vectors are synthetic (clustered, like sentence embeddings) unless
+--collection names a Chroma collection of VECTOR_STORE_DATA.
+
+    python -m bench.quantized_bench --count 100000 --dimension 1024
+    python -m bench.quantized_bench --collection books --provider openai
+"""
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from console import Console
+from quantized_index import QuantizedIndex, DTYPES
+
+def synthetic_vectors(count: int, dimension: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    return centers[labels] + 0.5 * rng.standard_normal((count, dimension)).astype(np.float32)
+
+def collection_vectors(collection: str, provider: str) -> np.ndarray:
+    import resources
+    index = QuantizedIndex.from_vector_store(resources.vector_store(collection, provider), "float16")
+    return np.asarray(index.vectors)
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized index benchmark")
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--dimension", type=int, default=1024)
+    parser.add_argument("--collection", type=str, default=None)
+    parser.add_argument("--provider", type=str, default="ollama", help="Embeddings provider of the collection")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--oversample", type=int, default=4)
+    options = parser.parse_args()
+
+    load_dotenv()
+    console = Console()
+
+    if options.collection:
+        vectors = collection_vectors(options.collection, options.provider)
+    else:
+        vectors = synthetic_vectors(options.count, options.dimension)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    documents = [Document(page_content=str(i)) for i in range(len(vectors))]
+    console.info(f"{len(vectors)} vectors of dimension {vectors.shape[1]}")
+
+    # Queries close to stored vectors, as real questions are close to passages
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, len(vectors), options.queries)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32) / np.sqrt(vectors.shape[1])
+
+    start = time.perf_counter()
+    truth = []
+    for query in queries:
+        scores = vectors @ (query / np.linalg.norm(query))
+        truth.append(set(np.argpartition(-scores, options.k - 1)[:options.k].tolist()))
+    latency = (time.perf_counter() - start) / len(queries)
+    console.info(f"float32  : {vectors.nbytes / 2**20:8.1f} MiB ({vectors.nbytes / 2**20:.1f} MiB on disk) | {latency * 1000:7.2f} ms/query | recall@{options.k} 1.000")
+
+    for dtype in DTYPES:
+        with tempfile.TemporaryDirectory() as directory:
+            QuantizedIndex.build(vectors, documents, dtype).save(directory)
+            index = QuantizedIndex.load(directory)
+
+            hits = 0
+            start = time.perf_counter()
+            for query, expected in zip(queries, truth):
+                results = index.search_by_vector(query, k=options.k, oversample=options.oversample)
+                hits += len({int(document.page_content) for document, _ in results} & expected)
+            latency = (time.perf_counter() - start) / len(queries)
+
+            recall = hits / (len(queries) * options.k)
+            console.info(f"{dtype:<8} : {index.memory_footprint() / 2**20:8.1f} MiB ({index.disk_size() / 2**20:.1f} MiB on disk) | {latency * 1000:7.2f} ms/query | recall@{options.k} {recall:.3f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
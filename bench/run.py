@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the modes.
+
+Each scenario drives a mode end to end in a fresh process, with the fake chat
+model, embeddings and transcript API of bench/fakes.py and a scripted
+console, then reports wall time, CPU time, peak RSS and the number of
+LLM/embedding calls. Every mode has a scenario except serve, whose
+concurrent sessions are measured by bench/load.py.
+
+    python -m bench.run
+    python -m bench.run --scenarios chat book --turns 10 --save-baseline
+    python -m bench.run --baseline bench/baseline.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from console import Console
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HAIKUS = os.path.join(ROOT, "haikus.txt")
+DEFAULT_BASELINE = os.path.join(ROOT, "bench", "baseline.json")
+
+QUESTIONS = [
+    "Qu'est-ce qu'une fonction propre ?",
+    "Comment bien nommer une variable ?",
+    "Pourquoi éviter les commentaires inutiles ?",
+    "Combien d'arguments une fonction devrait-elle avoir ?",
+    "Comment gérer les erreurs proprement ?",
+]
+
+def _questions(turns: int) -> list[str]:
+    return [QUESTIONS[i % len(QUESTIONS)] for i in range(turns)]
+
+def _read_haikus() -> list[str]:
+    with open(HAIKUS, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+# Scenarios. `setup` runs before the measurement, `run` is measured.
+
+def setup_haiku_store(options):
+    from modes.load_haiku_mode import LoadHaikuMode
+    from bench.fakes import ScriptedConsole
+    LoadHaikuMode(ScriptedConsole([]), file=HAIKUS).run()
+
+def setup_book_store(options):
+    import resources
+    # Haikus stand in for book passages
+    resources.vector_store(os.getenv("BOOK_COLLECTION"), "openai").add_texts(_read_haikus())
+
+def _book_path() -> str:
+    return os.path.join(os.getenv("CACHE_DIR"), "book.pdf")
+
+def setup_book_pdf(options):
+    from bench.fakes import write_pdf
+    # Five copies of the haikus, ten per page, stand in for a book
+    haikus = _read_haikus() * 5
+    write_pdf(_book_path(), [haikus[i:i + 10] for i in range(0, len(haikus), 10)])
+
+def setup_youtube_prompts(options):
+    import shutil
+    # The youtube mode reads its prompts from PROMPTS_DIR/system
+    prompts = os.path.join(os.getenv("CACHE_DIR"), "prompts")
+    shutil.copytree(os.path.join(ROOT, "prompts"), os.path.join(prompts, "system"))
+    os.environ["PROMPTS_DIR"] = prompts
+
+def run_chat(options):
+    from modes.chat_mode import ChatMode
+    from bench.fakes import ScriptedConsole, ScriptExhausted
+    try:
+        ChatMode(ScriptedConsole(_questions(options.turns)), model="fake").run()
+    except ScriptExhausted:
+        pass
+
+def run_ask(options):
+    from modes.ask_mode import AskMode
+    from bench.fakes import ScriptedConsole
+    for question in _questions(options.turns):
+        AskMode(ScriptedConsole([question]), model="fake").run()
+
+def run_haiku(options):
+    from modes.haiku_mode import HaikuMode
+    from bench.fakes import ScriptedConsole, ScriptExhausted
+    try:
+        HaikuMode(ScriptedConsole(_questions(options.turns))).run()
+    except ScriptExhausted:
+        pass
+
+def run_load_haiku(options):
+    from modes.load_haiku_mode import LoadHaikuMode
+    from bench.fakes import ScriptedConsole
+    LoadHaikuMode(ScriptedConsole([]), file=HAIKUS).run()
+
+def run_book(options):
+    from modes.book_mode import BookMode
+    from bench.fakes import ScriptedConsole
+    for question in _questions(options.turns):
+        BookMode(ScriptedConsole([question]), model="fake").run()
+
+def run_doc(options):
+    from modes.doc_mode import DocMode
+    from bench.fakes import ScriptedConsole
+    DocMode(ScriptedConsole([]), model="fake", path=ROOT).run()
+
+def run_load_book(options):
+    from modes.load_book_mode import LoadBookMode
+    from bench.fakes import ScriptedConsole
+    LoadBookMode(ScriptedConsole([]), book=_book_path()).run()
+
+def run_youtube(options):
+    from modes.youtube_mode import YoutubeMode
+    from bench.fakes import FakeTranscriptApi, ScriptedConsole, ScriptExhausted
+    YoutubeMode.transcript_api = FakeTranscriptApi(latency=options.latency)
+    try:
+        YoutubeMode(ScriptedConsole(_questions(options.turns)), url="https://youtu.be/video00001a", model="fake").run()
+    except ScriptExhausted:
+        pass
+
+def run_graph(options):
+    from modes.graph_mode import GraphMode
+    from bench.fakes import ScriptedConsole, ScriptExhausted
+    try:
+        GraphMode(ScriptedConsole(_questions(options.turns)), model="fake").run()
+    except ScriptExhausted:
+        pass
+
+def run_agent(options):
+    from modes.agent_mode import AgentMode
+    from bench.fakes import ScriptedConsole
+    for question in _questions(options.turns):
+        AgentMode(ScriptedConsole([question]), model="fake").run()
+
+def run_store(options):
+    from modes.store_mode import StoreMode
+    from bench.fakes import ScriptedConsole
+    StoreMode(ScriptedConsole([]), "stats", collection=[os.getenv("HAIKU_COLLECTION")], queries=options.turns).run()
+
+SCENARIOS = {
+    "chat": (None, run_chat),
+    "ask": (None, run_ask),
+    "haiku": (setup_haiku_store, run_haiku),
+    "load-haiku": (None, run_load_haiku),
+    "book": (setup_book_store, run_book),
+    "doc": (None, run_doc),
+    "load-book": (setup_book_pdf, run_load_book),
+    "youtube": (setup_youtube_prompts, run_youtube),
+    "graph": (None, run_graph),
+    "agent": (None, run_agent),
+    "store": (setup_haiku_store, run_store),
+}
+
+def _scenario_process(name: str, options, queue):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            "PROMPTS_DIR": os.path.join(ROOT, "prompts"),
+            "VECTOR_STORE_DATA": os.path.join(tmp, "store"),
+            "CACHE_DIR": os.path.join(tmp, "cache") + os.sep,
+            "METRICS_FILE": os.path.join(tmp, "metrics.jsonl"),
+            "HAIKU_COLLECTION": "haikus",
+            "BOOK_COLLECTION": "books",
+            "EMBEDDING_MODEL": "fake",
+        })
+        os.makedirs(os.getenv("CACHE_DIR"))
+
+        from bench import fakes
+        fakes.install(
+            fakes.FakeChatModel(latency=options.latency, tokens_per_second=options.tokens_per_second),
+            fakes.FakeEmbeddings(latency=options.embedding_latency))
+
+        setup, run = SCENARIOS[name]
+        if setup:
+            setup(options)
+        fakes.reset_counters()
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            run(options)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+
+        queue.put({
+            "wall": wall,
+            "cpu": cpu,
+            # Kilobytes on Linux
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            **fakes.COUNTERS,
+            "error": error,
+        })
+
+def run_scenario(name: str, options) -> dict:
+    # A fresh interpreter per scenario keeps peak RSS and caches independent
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_scenario_process, args=(name, options, queue))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        return {"error": f"exit code {process.exitcode}"}
+    return queue.get()
+
+def compare(console: Console, results: dict, baseline: dict, tolerance: float) -> bool:
+    regressed = False
+    for name, result in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if not reference or result.get("error") or reference.get("error"):
+            continue
+        for metric in ("wall", "cpu", "peak_rss_kb", "llm_calls", "embedding_calls"):
+            before, after = reference[metric], result[metric]
+            if not before:
+                continue
+            delta = (after - before) / before
+            line = f"{name:<11} {metric:<16} {before:>12.3f} -> {after:>12.3f} ({delta:+.1%})"
+            if delta > tolerance:
+                regressed = True
+                console.error(line)
+            else:
+                console.info(line)
+    return not regressed
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the chatbot modes")
+    parser.add_argument("--scenarios", nargs="*", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--turns", type=int, default=5, help="Questions asked per scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake model seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--embedding-latency", type=float, default=0.01, help="Fake embeddings seconds per call")
+    parser.add_argument("--out", type=str, default=None, help="Write the results to this JSON file")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative increase reported as a regression")
+    options = parser.parse_args()
+
+    console = Console()
+    results = {}
+    for name in options.scenarios:
+        console.info(f"Running {name}...")
+        results[name] = run_scenario(name, options)
+        result = results[name]
+        if result.get("error"):
+            console.error(f"{name}: {result['error']}")
+        else:
+            console.info(
+                f"{name}: wall {result['wall']:.3f}s | cpu {result['cpu']:.3f}s | "
+                f"rss {result['peak_rss_kb'] / 1024:.1f} MiB | "
+                f"llm {result['llm_calls']} | embeddings {result['embedding_calls']} ({result['embedded_texts']} texts)")
+
+    report = {
+        "timestamp": time.time(),
+        "options": {k: v for k, v in vars(options).items() if k not in ("out", "baseline", "save_baseline")},
+        "results": results,
+    }
+
+    if options.out:
+        with open(options.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if options.save_baseline:
+        with open(options.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        console.info(f"Baseline saved to {options.baseline}")
+        return 0
+
+    if os.path.exists(options.baseline):
+        with open(options.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare(console, results, baseline, options.tolerance):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
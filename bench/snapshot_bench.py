@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Snapshot import against re-ingestion of the haiku collection.
+
+Loads haikus.txt repeated --scale times through LoadHaikuMode (one
+embedding request per haiku, as load-haiku does), exports the collection
+with `store export`, then imports the snapshot into an empty store with
+`store import`. The fake embeddings stand for the network round trip with
+--embedding-latency.
+
+    python -m bench.snapshot_bench --scale 20 --embedding-latency 0.02
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from console import Console
+from bench import fakes
+from bench.fakes import ScriptedConsole
+from bench.run import _read_haikus
+from modes.store_mode import directory_size
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot import benchmark")
+    parser.add_argument("--scale", type=int, default=20, help="Copies of haikus.txt loaded")
+    parser.add_argument("--embedding-latency", type=float, default=0.02, help="Fake embeddings seconds per request")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    options = parser.parse_args()
+
+    console = Console()
+    fakes.install(fakes.FakeChatModel(), fakes.FakeEmbeddings(latency=options.embedding_latency))
+
+    from modes.load_haiku_mode import LoadHaikuMode
+    from modes.store_mode import StoreMode
+    import resources
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            "CACHE_DIR": os.path.join(tmp, "cache") + os.sep,
+            "METRICS_FILE": os.path.join(tmp, "metrics.jsonl"),
+            "HAIKU_COLLECTION": "haikus",
+            "EMBEDDING_MODEL": "fake",
+        })
+
+        # Numbered copies, so that every line is a distinct chunk
+        haikus = [f"{haiku} ({copy})" for copy in range(options.scale) for haiku in _read_haikus()]
+        file = os.path.join(tmp, "haikus.txt")
+        with open(file, "w", encoding="utf-8") as f:
+            f.write("\n".join(haikus))
+        console.info(f"{len(haikus)} haikus")
+
+        os.environ["VECTOR_STORE_DATA"] = os.path.join(tmp, "ingested")
+        fakes.reset_counters()
+        start = time.perf_counter()
+        LoadHaikuMode(ScriptedConsole([]), file=file).run()
+        ingestion = time.perf_counter() - start
+        console.info(f"re-ingestion : {ingestion:8.2f}s | {fakes.COUNTERS['embedding_calls']} embedding calls")
+
+        snapshots = os.path.join(tmp, "snapshots")
+        start = time.perf_counter()
+        StoreMode(ScriptedConsole([]), "export", collection=["haikus"], directory=snapshots, batch_size=options.batch_size).run()
+        export = time.perf_counter() - start
+        console.info(f"export       : {export:8.2f}s | {directory_size(snapshots) / 2**20:.1f} MiB")
+
+        os.environ["VECTOR_STORE_DATA"] = os.path.join(tmp, "imported")
+        fakes.reset_counters()
+        start = time.perf_counter()
+        StoreMode(ScriptedConsole([]), "import", collection=["haikus"], directory=snapshots, batch_size=options.batch_size).run()
+        imported = time.perf_counter() - start
+        console.info(f"import       : {imported:8.2f}s | {fakes.COUNTERS['embedding_calls']} embedding calls")
+
+        count = resources.collection_count(resources.vector_store("haikus", "ollama"))
+        if count != len(haikus):
+            console.error(f"{count} chunks imported, {len(haikus)} expected")
+            return 1
+        console.info(f"import is {ingestion / imported:.1f}x faster than re-ingestion")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Transcript resolution of YoutubeMode against a fake transcript API.
+
+Compares sequential candidate fetching (one worker, the previous behaviour)
+with concurrent fetching kept in preference order, then a second
+resolution of the same video served by the cached transcript listing.
+
+    python -m bench.transcript_bench --languages 6 --latency 0.3
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from console import Console
+from bench import fakes
+from bench.fakes import FakeTranscriptApi, ScriptedConsole
+
+def resolve(workers: int, api: FakeTranscriptApi, video_id: str) -> tuple[float, dict]:
+    from modes.youtube_mode import YoutubeMode
+    YoutubeMode.transcript_api = api
+    YoutubeMode.max_workers = workers
+    mode = YoutubeMode(ScriptedConsole([]), url=f"https://youtu.be/{video_id}")
+
+    fakes.reset_counters()
+    start = time.perf_counter()
+    transcript = mode.get_transcript(video_id)
+    elapsed = time.perf_counter() - start
+    if not transcript:
+        raise RuntimeError("No transcript resolved")
+    return elapsed, dict(fakes.COUNTERS)
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcript resolution benchmark")
+    parser.add_argument("--languages", type=int, default=4, help="Translatable transcripts of the fake video")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per fake API request")
+    parser.add_argument("--workers", type=int, default=8)
+    options = parser.parse_args()
+
+    console = Console()
+    api = FakeTranscriptApi(languages=options.languages, latency=options.latency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CACHE_DIR"] = tmp + os.sep
+
+        runs = [
+            ("sequential", 1, "video00001a"),
+            ("concurrent", options.workers, "video00002b"),
+            ("cached listing", options.workers, "video00002b"),
+        ]
+        for name, workers, video_id in runs:
+            elapsed, counters = resolve(workers, api, video_id)
+            console.info(
+                f"{name:<15}: {elapsed:.3f}s | listings {counters['transcript_listings']} | "
+                f"fetches {counters['transcript_fetches']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
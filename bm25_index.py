@@ -0,0 +1,154 @@
+import os
+import re
+import json
+import math
+import unicodedata
+import numpy as np
+from langchain_core.documents import Document
+
+STOPWORDS = {
+    "le", "la", "les", "un", "une", "des", "de", "du", "et", "ou", "en", "au", "aux",
+    "ce", "ces", "cet", "cette", "que", "qui", "quoi", "dans", "par", "pour", "sur",
+    "avec", "sans", "est", "sont", "pas", "ne", "se", "sa", "son", "ses", "il", "elle",
+    "on", "nous", "vous", "ils", "elles", "je", "tu", "me", "te", "mon", "ton", "leur",
+    "the", "of", "and", "to", "in", "is", "it", "for", "on", "with", "as", "an",
+}
+
+def tokenize(text: str) -> list[str]:
+    # Accents are dropped so that questions typed without them still match
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [token for token in re.findall(r"\w+", text) if len(token) > 1 and token not in STOPWORDS]
+
+def index_directory(collection: str) -> str:
+    return os.path.join(os.getenv("VECTOR_STORE_DATA"), "bm25", collection)
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index stored as flat arrays.
+
+    The vocabulary is a sorted array searched by bisection, and the postings
+    of term i are `postings_docs[offsets[i]:offsets[i+1]]` with their term
+    frequencies in `postings_tf`. Arrays are saved as .npy files and memory
+    mapped on load, documents are kept in a JSONL file.
+    """
+
+    ARRAYS = ("terms", "offsets", "postings_docs", "postings_tf", "doc_lengths")
+
+    def __init__(
+        self,
+        documents: list[Document],
+        terms: np.ndarray,
+        offsets: np.ndarray,
+        postings_docs: np.ndarray,
+        postings_tf: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75):
+        self.documents = documents
+        self.terms = terms
+        self.offsets = offsets
+        self.postings_docs = postings_docs
+        self.postings_tf = postings_tf
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.average_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    @classmethod
+    def build(cls, documents: list[Document]) -> "BM25Index":
+        postings: dict[str, list[tuple[int, int]]] = {}
+        doc_lengths = np.zeros(len(documents), dtype=np.uint32)
+
+        for doc_id, document in enumerate(documents):
+            tokens = tokenize(document.page_content)
+            doc_lengths[doc_id] = len(tokens)
+            frequencies: dict[str, int] = {}
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+            for token, frequency in frequencies.items():
+                postings.setdefault(token, []).append((doc_id, frequency))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+        postings_docs = np.fromiter((d for term in terms for d, _ in postings[term]), dtype=np.uint32, count=offsets[-1])
+        postings_tf = np.fromiter((min(f, 65535) for term in terms for _, f in postings[term]), dtype=np.uint16, count=offsets[-1])
+
+        return cls(documents, np.array(terms, dtype=str), offsets, postings_docs, postings_tf, doc_lengths)
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, "documents.jsonl"), "w", encoding="utf-8") as f:
+            for document in self.documents:
+                f.write(json.dumps({"page_content": document.page_content, "metadata": document.metadata}, ensure_ascii=False) + "\n")
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, "documents.jsonl"))
+
+    @classmethod
+    def load(cls, directory: str) -> "BM25Index":
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in cls.ARRAYS}
+        documents = []
+        with open(os.path.join(directory, "documents.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                data = json.loads(line)
+                documents.append(Document(page_content=data["page_content"], metadata=data["metadata"]))
+        return cls(documents, **arrays)
+
+    def _postings(self, term: str) -> tuple[np.ndarray, np.ndarray]|None:
+        i = int(np.searchsorted(self.terms, term))
+        if i >= len(self.terms) or self.terms[i] != term:
+            return None
+        return self.postings_docs[self.offsets[i]:self.offsets[i + 1]], self.postings_tf[self.offsets[i]:self.offsets[i + 1]]
+
+    def _idf(self, document_frequency: int) -> float:
+        n = len(self.documents)
+        return math.log(1 + (n - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(self, query: str, k: int = 4) -> list[tuple[Document, float]]:
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        lengths = self.doc_lengths.astype(np.float32)
+        for term in set(tokenize(query)):
+            postings = self._postings(term)
+            if postings is None:
+                continue
+            docs, tf = postings
+            tf = tf.astype(np.float32)
+            norm = self.k1 * (1 - self.b + self.b * lengths[docs] / self.average_length)
+            scores[docs] += self._idf(len(docs)) * tf * (self.k1 + 1) / (tf + norm)
+
+        if not scores.any():
+            return []
+        k = min(k, int(np.count_nonzero(scores)))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.documents[i], float(scores[i])) for i in best]
+
+    def strength(self, query: str, results: list[tuple[Document, float]]) -> float:
+        """
+        How well the best result matches the query, between 0 and 1: the
+        share of query terms found in the vocabulary times the top score
+        relative to a document containing each query term once.
+        """
+        terms = set(tokenize(query))
+        if not terms or not results:
+            return 0.0
+
+        known = [postings for postings in map(self._postings, terms) if postings is not None]
+        coverage = len(known) / len(terms)
+        best_possible = sum(self._idf(len(docs)) for docs, _ in known)
+        return coverage * min(results[0][1] / best_possible, 1.0) if best_possible else 0.0
+
+def reciprocal_rank_fusion(rankings: list[list[Document]], k: int = 60) -> list[Document]:
+    """Merges several rankings, documents being identified by their content."""
+    scores: dict[str, float] = {}
+    documents: dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking):
+            scores[document.page_content] = scores.get(document.page_content, 0.0) + 1 / (k + rank + 1)
+            documents.setdefault(document.page_content, document)
+    return [documents[content] for content in sorted(scores, key=scores.get, reverse=True)]
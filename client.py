@@ -0,0 +1,135 @@
+import os
+import json
+import queue
+import socket
+import threading
+from console import Console
+
+# Client side of the serve daemon protocol (see server.py). This module is
+# imported before the modes, it must stay free of the langchain imports.
+
+# Options of the App parser, checked without building it
+LOCAL_OPTIONS = ("--no-daemon", "--profile", "--help", "-h")
+VALUE_OPTIONS = ("--profile-dir",)
+
+def socket_path() -> str:
+    return os.getenv("SERVE_SOCKET") or os.path.join(os.getenv("CACHE_DIR", "."), "chatbot.sock")
+
+def send(wfile, message: dict):
+    wfile.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+    wfile.flush()
+
+def receive(rfile) -> dict:
+    line = rfile.readline()
+    if not line:
+        raise EOFError("Connection closed")
+    return json.loads(line)
+
+def _option(arg: str, options: tuple[str, ...]) -> bool:
+    # argparse also accepts unambiguous prefixes of the long options
+    name = arg.split("=", 1)[0]
+    return any(option == name or (name.startswith("--") and len(name) > 2 and option.startswith(name)) for option in options)
+
+def forwardable(argv: list[str]) -> bool:
+    """
+    Whether the command line runs a mode the daemon can run: not serve, not
+    profiled (profiles are always taken locally), not --no-daemon. Help and
+    command lines without a mode are left to the local parser.
+    """
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if _option(arg, LOCAL_OPTIONS):
+            return False
+        if _option(arg, VALUE_OPTIONS):
+            i += 1 if "=" in arg else 2
+            continue
+        if not arg.startswith("-"):
+            return arg != "serve"
+        i += 1
+    return False
+
+def stats(path: str) -> dict|None:
+    """Returns the counters of the daemon listening on `path`, or None if no daemon answered."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        client.close()
+        return None
+
+    with client, client.makefile("rb") as rfile, client.makefile("wb") as wfile:
+        send(wfile, {"stats": True})
+        try:
+            return receive(rfile)
+        except EOFError:
+            return None
+
+def forward(path: str, argv: list[str], console: Console) -> int|None:
+    """
+    Runs the command line in the daemon listening on `path`, relaying its
+    input and output through `console`. Relative paths of the command line
+    are resolved against the current directory. Ctrl-C during a generation
+    of the daemon cancels it, as in a local run. Returns the exit code, or
+    None if no daemon answered.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        client.close()
+        return None
+
+    with client, client.makefile("rb") as rfile, client.makefile("wb") as wfile:
+        send(wfile, {"argv": argv, "cwd": os.getcwd()})
+
+        # Messages are read by a thread, a KeyboardInterrupt of the main
+        # thread never lands in the middle of a socket read
+        messages: queue.Queue[dict|None] = queue.Queue()
+        def read():
+            try:
+                while True:
+                    messages.put(receive(rfile))
+            except (EOFError, OSError, ValueError):
+                messages.put(None)
+        threading.Thread(target=read, daemon=True).start()
+
+        try:
+            while True:
+                try:
+                    message = messages.get()
+                    if message is None:
+                        console.error("Connection to the daemon lost.")
+                        return 1
+
+                    if message["event"] == "print":
+                        console.print(message["text"], end=message["end"])
+                    elif message["event"] == "input":
+                        send(wfile, {"input": console.input(message["prompt"])})
+                    elif message["event"] == "generating":
+                        console.generating = message["value"]
+                    elif message["event"] == "exit":
+                        return message["code"]
+                except KeyboardInterrupt:
+                    # Raised by the SIGINT handler while the daemon generates
+                    send(wfile, {"cancel": True})
+        finally:
+            console.generating = False
+            # Wakes the reader up, closing rfile waits for its readline
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+def run_in_daemon(argv: list[str], console: Console) -> int|None:
+    """
+    Runs the command line in the serve daemon when one is listening and the
+    command can run there. Returns the exit code, or None when the command
+    must run locally.
+    """
+    if not forwardable(argv):
+        return None
+    path = socket_path()
+    if not os.path.exists(path):
+        return None
+    return forward(path, argv, console)
@@ -2,10 +2,22 @@ SYSTEM_PROMPT_PREFIX = "[bright_black][[/][bold bright_magenta]system[/][bright_
 HUMAN_PROMPT_PREFIX = "[bright_black][[/][bold bright_green]human[/][bright_black]]:[/]\n"
 BOT_PROMPT_PREFIX = "[bright_black][[/][bold bright_blue]bot[/][bright_black]]:[/]\n"
 
+import time
+from typing import Iterator
+from contextlib import contextmanager
 from rich.console import Console
 
 class Console(Console):
 
+    # Seconds spent waiting for the user, excluded from the profiles
+    input_time: float = 0.0
+
+    # True while an answer is being generated, Ctrl-C then only cancels it
+    generating: bool = False
+
+    # True when the last bot_stream was cancelled
+    interrupted: bool = False
+
     def info(self, content: str):
         self.print(f"[bright_black]\[info]: {content}[/]")
 
@@ -16,13 +28,18 @@ class Console(Console):
         self.print(SYSTEM_PROMPT_PREFIX + content)
 
     def human_input(self) -> str:
+        start = time.perf_counter()
         user_input = self.input(HUMAN_PROMPT_PREFIX)
+        self.input_time += time.perf_counter() - start
         if user_input.strip().lower() in ("exit", "quit"):
             self.info("Fermeture de la discussion. À bientôt !")
-            from main import sigkill_handler
-            sigkill_handler(None, None)
+            self.goodbye()
         return user_input
 
+    def goodbye(self):
+        self.bot_output("Au revoir humain!")
+        raise SystemExit(0)
+
     def bot_output(self, content: str):
         self.print(BOT_PROMPT_PREFIX + content)
 
@@ -33,4 +50,38 @@ class Console(Console):
         self.print(chunk, end="")
 
     def bot_end(self):
-        self.print()
\ No newline at end of file
+        self.print()
+
+    @contextmanager
+    def generation(self):
+        """Marks the block as a generation that Ctrl-C cancels."""
+        self.generating = True
+        try:
+            yield
+        finally:
+            self.generating = False
+
+    def bot_stream(self, stream: Iterator[str]) -> str:
+        """
+        Prints the chunks of `stream` as one bot message and returns the
+        answer. Ctrl-C cancels the generation: the stream is closed, which
+        closes the upstream request, and the partial answer is returned.
+        """
+        answer = ""
+        self.interrupted = False
+        self.bot_start()
+        try:
+            with self.generation():
+                for chunk in stream:
+                    answer += chunk
+                    self.bot_chunk(chunk)
+        except KeyboardInterrupt:
+            self.interrupted = True
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+            self.bot_end()
+
+        if self.interrupted:
+            self.info("Génération interrompue.")
+        return answer
\ No newline at end of file
@@ -0,0 +1,163 @@
+import os
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from langchain_core.documents import Document
+import resources
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from summary_store import SummaryStore
+
+TRANSCRIPTS = "transcripts"
+
+class VectorSource:
+    """A Chroma collection, searched with the query embedding of its provider."""
+
+    def __init__(self, name: str, collection: str, provider: str):
+        self.name = name
+        self.collection = collection
+        self.provider = provider
+
+    def search(self, query: str, k: int, embedding: list[float]|None = None) -> list[tuple[Document, float]]:
+        if embedding is None:
+            embedding = resources.embeddings(self.provider).embed_query(query)
+        results = resources.vector_store(self.collection, self.provider).similarity_search_by_vector_with_relevance_scores(embedding, k=k)
+        # Chroma returns distances, the higher score must be the better
+        return [(document, -distance) for document, distance in results]
+
+class TranscriptSource:
+    """
+    BM25 search over the video transcripts of the youtube mode, split into
+    passages. Videos cached without their transcript are searched through
+    their summary.
+    """
+
+    name = TRANSCRIPTS
+
+    # Passages of at most this many words
+    passage_words = 200
+
+    # Index of each store, shared and rebuilt when the store changes
+    _indexes: dict[str, tuple[tuple, BM25Index|None]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, path: str|None = None):
+        self.path = path or os.path.join(os.path.dirname(os.getenv("CACHE_DIR")), "summaries.db")
+        self._store: SummaryStore|None = None
+
+    def _documents(self, store: SummaryStore) -> list[Document]:
+        documents = []
+        for video_id, summary, transcript in store.texts():
+            if not transcript:
+                documents.append(Document(page_content=summary, metadata={"video_id": video_id, "kind": "summary"}))
+                continue
+            words = transcript.split()
+            for passage, start in enumerate(range(0, len(words), self.passage_words)):
+                documents.append(Document(
+                    page_content=" ".join(words[start:start + self.passage_words]),
+                    metadata={"video_id": video_id, "kind": "transcript", "passage": passage}))
+        return documents
+
+    def _load(self) -> BM25Index|None:
+        with TranscriptSource._lock:
+            # The store is opened once per source, on its first search
+            if self._store is None:
+                self._store = SummaryStore(self.path)
+            state = self._store.state()
+            cached = TranscriptSource._indexes.get(self.path)
+            if cached is None or cached[0] != state:
+                documents = self._documents(self._store)
+                cached = TranscriptSource._indexes[self.path] = (state, BM25Index.build(documents) if documents else None)
+            return cached[1]
+
+    def search(self, query: str, k: int, embedding: list[float]|None = None) -> list[tuple[Document, float]]:
+        index = self._load()
+        return index.search(query, k) if index else []
+
+    def close(self):
+        with TranscriptSource._lock:
+            if self._store is not None:
+                self._store.close()
+                self._store = None
+
+def default_sources() -> dict[str, VectorSource|TranscriptSource]:
+    sources = {name: VectorSource(name, name, provider) for name, provider in resources.collections().items()}
+    sources[TRANSCRIPTS] = TranscriptSource()
+    return sources
+
+class FederatedRetriever:
+    """
+    Searches several sources concurrently and merges their results.
+
+    Each source gets `timeout` seconds (or its entry in `timeouts`): a slow
+    or failing source is reported and left out, the others are still
+    returned. A source still running a timed out search is reported busy
+    and skipped until it finishes, so that it holds one worker at most and
+    never delays the others. The rankings are merged by reciprocal rank fusion: distances
+    and BM25 scores are not comparable, and scaling them within each source
+    would put the best hit of an unrelated corpus on par with the others.
+    Documents found by several sources rank higher.
+    """
+
+    def __init__(self, sources: list[str], timeout: float = 2.0, timeouts: dict[str, float]|None = None):
+        available = default_sources()
+        unknown = [name for name in sources if name not in available]
+        if unknown:
+            raise ValueError(f"Unknown sources {', '.join(unknown)}, expected some of {', '.join(available)}")
+        self.sources = [available[name] for name in sources]
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        # Timed out searches keep running in the background, shutdown never
+        # waits for them. Each source runs one search at a time: one worker
+        # per source is enough.
+        self.executor = ThreadPoolExecutor(max_workers=len(self.sources), thread_name_prefix="federated")
+        self.running: dict[str, Future] = {}
+        self.report: dict[str, dict] = {}
+
+    def search(self, query: str, k: int = 4, embeddings: dict[str, list[float]]|None = None) -> list[Document]:
+        """
+        Returns the k best documents of all the sources, tagged with their
+        source in metadata["source"]. `embeddings` gives query embeddings
+        already computed, by provider.
+        """
+        embeddings = embeddings or {}
+        start = time.perf_counter()
+        self.report = {}
+        futures = {}
+        for source in self.sources:
+            previous = self.running.get(source.name)
+            if previous is not None and not previous.done():
+                self.report[source.name] = {"status": "busy", "results": 0}
+                continue
+            futures[source.name] = self.running[source.name] = self.executor.submit(
+                self._timed, source, query, k, embeddings.get(getattr(source, "provider", None)))
+
+        rankings = []
+        for name, future in futures.items():
+            remaining = start + self.timeouts.get(name, self.timeout) - time.perf_counter()
+            try:
+                results, latency = future.result(timeout=max(0.0, remaining))
+            except TimeoutError:
+                self.report[name] = {"status": "timeout", "results": 0}
+                continue
+            except Exception as e:
+                self.report[name] = {"status": "error", "error": str(e), "results": 0}
+                continue
+            self.report[name] = {"status": "ok", "latency": latency, "results": len(results)}
+            rankings.append([
+                Document(page_content=document.page_content, metadata={**document.metadata, "source": name})
+                for document, _ in sorted(results, key=lambda result: result[1], reverse=True)
+            ])
+
+        return reciprocal_rank_fusion(rankings)[:k]
+
+    @staticmethod
+    def _timed(source, query: str, k: int, embedding: list[float]|None) -> tuple[list[tuple[Document, float]], float]:
+        start = time.perf_counter()
+        results = source.search(query, k, embedding)
+        return results, time.perf_counter() - start
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for source in self.sources:
+            if hasattr(source, "close"):
+                source.close()
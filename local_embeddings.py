@@ -0,0 +1,78 @@
+import unicodedata
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from langchain_core.embeddings import Embeddings
+
+# Odd 64-bit multipliers of the rolling hash and of the bucket mixing
+_BASE = np.uint64(0x100000001B3)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+class HashedNgramEmbeddings(Embeddings):
+    """
+    In-process embeddings from hashed character n-grams.
+
+    Each text is lowercased, stripped of its accents and padded with spaces,
+    its character n-grams are hashed into `size` signed buckets, counts are
+    damped with log1p and the vector is L2-normalized. A whole batch is
+    hashed with a handful of NumPy operations, no model is loaded and no
+    request leaves the process. Vectors only make sense against vectors of
+    the same `size` and `ngrams`.
+    """
+
+    def __init__(self, size: int = 1024, ngrams: tuple[int, ...] = (3, 4, 5)):
+        if size & (size - 1):
+            raise ValueError("size must be a power of two")
+        self.size = size
+        self.ngrams = ngrams
+        self._shift = np.uint64(64 - size.bit_length() + 1)
+        self._powers = {n: _BASE ** np.arange(n - 1, -1, -1, dtype=np.uint64) for n in ngrams}
+
+    @property
+    def name(self) -> str:
+        """Identifies the vector space, stored with snapshots of the collections."""
+        return f"hashed-ngrams-{self.size}-{'-'.join(map(str, self.ngrams))}"
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        text = unicodedata.normalize("NFKD", text.lower())
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        return " " + " ".join(text.split()) + " "
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.encode([text])[0].tolist()
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Returns the float32 (len(texts), size) matrix of the texts."""
+        matrix = np.zeros(len(texts) * self.size, dtype=np.float32)
+        if not texts:
+            return matrix.reshape(0, self.size)
+
+        # Every text of the batch in one code point array, with the owner
+        # and the end of the owner's text for each position
+        padded = [self._normalize(text) for text in texts]
+        lengths = np.fromiter((len(text) for text in padded), dtype=np.int64, count=len(padded))
+        codes = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        owners = np.repeat(np.arange(len(texts)), lengths)
+        ends = np.cumsum(lengths)[owners]
+
+        for n in self.ngrams:
+            if len(codes) < n:
+                continue
+            hashes = (sliding_window_view(codes, n) * self._powers[n]).sum(axis=1, dtype=np.uint64)
+            hashes = (hashes + np.uint64(n)) * _MIX
+            # N-grams spanning two texts are dropped
+            starts = np.arange(len(hashes))
+            valid = starts + n <= ends[:len(hashes)]
+            hashes, rows = hashes[valid], owners[:len(valid)][valid]
+
+            buckets = (hashes >> self._shift).astype(np.int64)
+            signs = np.where((hashes >> np.uint64(31)) & np.uint64(1), 1.0, -1.0)
+            matrix += np.bincount(rows * self.size + buckets, weights=signs, minlength=len(texts) * self.size).astype(np.float32)
+
+        matrix = matrix.reshape(len(texts), self.size)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
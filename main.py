@@ -1,18 +1,9 @@
 #!/usr/bin/env python3
+import sys
 import signal
 from dotenv import load_dotenv
 from console import Console
-from modes.book_mode import BookMode
-from modes.chat_mode import ChatMode
-from modes.graph_mode import GraphMode
-from modes.haiku_mode import HaikuMode
-from app import App
-from modes.load_book_mode import LoadBookMode
-from modes.load_haiku_mode import LoadHaikuMode
-from modes.ask_mode import AskMode
-from modes.doc_mode import DocMode
-from modes.youtube_mode import YoutubeMode
-from modes.agent_mode import AgentMode
+from client import run_in_daemon
 
 load_dotenv()
 
@@ -20,8 +11,11 @@ load_dotenv()
 console = Console()
 # Define signal handler
 def sigkill_handler(sig, frame):
-    console.bot_output("Au revoir humain!")
-    exit(0)
+    # Ctrl-C during a generation only cancels it, a second one exits
+    if sig == signal.SIGINT and console.generating:
+        console.generating = False
+        raise KeyboardInterrupt
+    console.goodbye()
 
 if __name__ == "__main__":
     
@@ -29,6 +23,26 @@ if __name__ == "__main__":
     signal.signal(signal.SIGINT, sigkill_handler)
     signal.signal(signal.SIGTERM, sigkill_handler)
 
+    # A running serve daemon takes the command before the modes and
+    # langchain are imported
+    code = run_in_daemon(sys.argv[1:], console)
+    if code is not None:
+        exit(code)
+
+    from app import App
+    from modes.book_mode import BookMode
+    from modes.chat_mode import ChatMode
+    from modes.graph_mode import GraphMode
+    from modes.haiku_mode import HaikuMode
+    from modes.load_book_mode import LoadBookMode
+    from modes.load_haiku_mode import LoadHaikuMode
+    from modes.ask_mode import AskMode
+    from modes.doc_mode import DocMode
+    from modes.youtube_mode import YoutubeMode
+    from modes.agent_mode import AgentMode
+    from modes.serve_mode import ServeMode
+    from modes.store_mode import StoreMode
+
     # Setup app
     app = App(console=console)
 
@@ -42,5 +56,7 @@ if __name__ == "__main__":
     app.use("youtube", YoutubeMode)
     app.use("agent", AgentMode)
     app.use("graph", GraphMode)
+    app.use("serve", ServeMode)
+    app.use("store", StoreMode)
 
     app.run()
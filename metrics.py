@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import fcntl
+import threading
+from contextlib import contextmanager
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from console import Console
+
+class PrometheusTextfile:
+    """
+    Prometheus textfile shared by every mode, process and CLI run.
+
+    Each update merges into the file under an exclusive lock: counters are
+    added to the values found in the file, so that they keep growing across
+    runs and concurrent processes, gauges are replaced. The file is written
+    aside then renamed so the collector never reads a partial file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def update(self, labels: str, counters: dict[str, float], gauges: dict[str, float]):
+        with self._lock, open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            types, series = self._read()
+            for name, value in counters.items():
+                types[name] = "counter"
+                series[name + labels] = series.get(name + labels, 0) + value
+            for name, value in gauges.items():
+                types[name] = "gauge"
+                series[name + labels] = value
+            self._write(types, series)
+
+    def _read(self) -> tuple[dict[str, str], dict[str, float]]:
+        types, series = {}, {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith("# TYPE "):
+                        _, _, name, kind = line.split(" ", 3)
+                        types[name] = kind
+                    elif line and not line.startswith("#"):
+                        key, value = line.rsplit(" ", 1)
+                        series[key] = float(value)
+        except FileNotFoundError:
+            pass
+        return types, series
+
+    def _write(self, types: dict[str, str], series: dict[str, float]):
+        lines = []
+        for name, kind in sorted(types.items()):
+            lines.append(f"# TYPE {name} {kind}")
+            for key in sorted(series):
+                if key.split("{", 1)[0] == name:
+                    value = series[key]
+                    lines.append(f"{key} {int(value) if float(value).is_integer() else value}")
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+
+# One textfile per path for the whole process
+_textfiles: dict[str, PrometheusTextfile] = {}
+_textfiles_lock = threading.Lock()
+
+def prometheus_textfile(path: str) -> PrometheusTextfile:
+    with _textfiles_lock:
+        if path not in _textfiles:
+            _textfiles[path] = PrometheusTextfile(path)
+        return _textfiles[path]
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Collects per-turn latency and throughput metrics.
+
+    Attach it to the chains through `config={"callbacks": [handler]}` to
+    capture time-to-first-token, generation time and token counts. Work done
+    outside of the chains (embedding, retrieval, cache lookups) is reported
+    with `timed()` and `cache_hit()`. `end_turn()` appends the turn to the
+    JSONL metrics file (METRICS_FILE) and adds it to the Prometheus textfile
+    (PROMETHEUS_TEXTFILE) when configured.
+    """
+
+    def __init__(self, console: Console, mode: str):
+        self.console = console
+        self.mode = mode
+        self.path = os.getenv("METRICS_FILE") or os.path.join(os.getenv("CACHE_DIR", "."), "metrics.jsonl")
+        self.prometheus_path = os.getenv("PROMETHEUS_TEXTFILE")
+
+        self._lock = threading.Lock()
+        self._runs: dict[UUID, float] = {}
+        self.totals = {
+            "turns": 0,
+            "generation_seconds": 0.0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "retrieval_seconds": 0.0,
+            "embedding_seconds": 0.0,
+            "cache_hits": 0,
+        }
+        self._reset()
+
+    def _reset(self):
+        self.turn_start = time.perf_counter()
+        self.ttft: float|None = None
+        self.generation = 0.0
+        self.llm_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.streamed_tokens = 0
+        self.retrieval = 0.0
+        self.embedding = 0.0
+        self.cache_hits = 0
+
+    def start_turn(self):
+        """Marks the beginning of a turn, TTFT is measured from here."""
+        with self._lock:
+            self._reset()
+
+    # LangChain callbacks
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._runs[run_id] = time.perf_counter()
+            self.llm_calls += 1
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self.on_llm_start(serialized, [], run_id=run_id, **kwargs)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs):
+        with self._lock:
+            if self.ttft is None:
+                self.ttft = time.perf_counter() - self.turn_start
+            self.streamed_tokens += 1
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        with self._lock:
+            start = self._runs.pop(run_id, None)
+            if start is not None:
+                self.generation += time.perf_counter() - start
+
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                    if usage:
+                        self.input_tokens += usage.get("input_tokens", 0)
+                        self.output_tokens += usage.get("output_tokens", 0)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    def on_retriever_start(self, serialized, query, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._runs[run_id] = time.perf_counter()
+
+    def on_retriever_end(self, documents, *, run_id: UUID, **kwargs):
+        with self._lock:
+            start = self._runs.pop(run_id, None)
+            if start is not None:
+                self.retrieval += time.perf_counter() - start
+
+    # Work done outside of the chains
+
+    @contextmanager
+    def timed(self, kind: str):
+        """Adds the duration of the block to the `retrieval` or `embedding` time."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                setattr(self, kind, getattr(self, kind) + elapsed)
+
+    def cache_hit(self):
+        with self._lock:
+            self.cache_hits += 1
+
+    def end_turn(self, verbose: bool = False) -> dict:
+        with self._lock:
+            output_tokens = self.output_tokens or self.streamed_tokens
+            record = {
+                "timestamp": time.time(),
+                "mode": self.mode,
+                "total": time.perf_counter() - self.turn_start,
+                "ttft": self.ttft,
+                "generation": self.generation,
+                "llm_calls": self.llm_calls,
+                "input_tokens": self.input_tokens,
+                "output_tokens": output_tokens,
+                "tokens_per_second": output_tokens / self.generation if self.generation else None,
+                "retrieval": self.retrieval,
+                "embedding": self.embedding,
+                "cache_hits": self.cache_hits,
+            }
+
+            self.totals["turns"] += 1
+            self.totals["generation_seconds"] += self.generation
+            self.totals["input_tokens"] += self.input_tokens
+            self.totals["output_tokens"] += output_tokens
+            self.totals["retrieval_seconds"] += self.retrieval
+            self.totals["embedding_seconds"] += self.embedding
+            self.totals["cache_hits"] += self.cache_hits
+
+            self._reset()
+
+        self._write(record)
+        if verbose:
+            self.console.info(self.summary(record))
+        return record
+
+    @staticmethod
+    def summary(record: dict) -> str:
+        parts = []
+        if record["ttft"] is not None:
+            parts.append(f"ttft {record['ttft']:.2f}s")
+        if record["llm_calls"]:
+            parts.append(f"gen {record['generation']:.2f}s")
+            tokens = f"{record['output_tokens']} tok"
+            if record["tokens_per_second"]:
+                tokens += f" ({record['tokens_per_second']:.1f} tok/s)"
+            parts.append(tokens)
+        if record["retrieval"]:
+            parts.append(f"retrieval {record['retrieval']:.2f}s")
+        if record["embedding"]:
+            parts.append(f"embedding {record['embedding']:.2f}s")
+        if record["cache_hits"]:
+            parts.append(f"cache hits {record['cache_hits']}")
+        parts.append(f"total {record['total']:.2f}s")
+        return " | ".join(parts)
+
+    def _write(self, record: dict):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+            if self.prometheus_path:
+                self._write_prometheus(record)
+        except OSError as e:
+            self.console.error(f"Unable to write metrics : {e}")
+
+    def _write_prometheus(self, record: dict):
+        counters = {
+            "chatbot_turns_total": 1,
+            "chatbot_generation_seconds_total": record["generation"],
+            "chatbot_input_tokens_total": record["input_tokens"],
+            "chatbot_output_tokens_total": record["output_tokens"],
+            "chatbot_retrieval_seconds_total": record["retrieval"],
+            "chatbot_embedding_seconds_total": record["embedding"],
+            "chatbot_cache_hits_total": record["cache_hits"],
+        }
+        gauges = {}
+        for name in ("ttft", "total", "tokens_per_second"):
+            if record[name] is not None:
+                gauges[f"chatbot_last_{name}" + ("" if name == "tokens_per_second" else "_seconds")] = record[name]
+        prometheus_textfile(self.prometheus_path).update(f'{{mode="{self.mode}"}}', counters, gauges)
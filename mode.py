@@ -1,13 +1,24 @@
 from abc import ABC
 from abc import abstractmethod
 from console import Console
+from metrics import MetricsCallbackHandler
 from argparse import _SubParsersAction
 
+class PathArgument(str):
+    """
+    Type of the command line arguments naming files or directories. The
+    serve daemon resolves them against the directory of its client.
+    """
+
 class Mode(ABC):
+    # Set by the App that created the mode
+    app = None
+
     def __init__(
         self, 
         console: Console):
         self.console = console
+        self.metrics = MetricsCallbackHandler(console, type(self).__name__)
 
     @staticmethod
     @abstractmethod
@@ -16,4 +27,4 @@ class Mode(ABC):
 
     @abstractmethod
     def run(self):
-        pass
\ No newline at end of file
+        pass
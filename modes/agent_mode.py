@@ -2,34 +2,38 @@ from argparse import _SubParsersAction
 import os
 from console import Console
 from mode import Mode
-from langchain.chat_models import init_chat_model
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.prompts import MessagesPlaceholder
+import resources
 from langchain_core.messages import SystemMessage
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import HumanMessagePromptTemplate
 from langchain_core.messages import HumanMessage
 from langchain.agents import tool
-from langchain.agents import AgentExecutor
 from typing import Annotated
-from langchain.agents import create_tool_calling_agent
+from tool_calling import ToolCallingLoop
 
 class AgentMode(Mode):
     def __init__(
         self, 
         console: Console,
         model: str = "llama3.2:3b",
+        max_steps: int = 5,
+        max_time: float = 60.0,
+        workers: int = 4,
         verbose: bool = False):
         super().__init__(console)
 
         self.verbose = verbose
         self.model = model
+        self.max_steps = max_steps
+        self.max_time = max_time
+        self.workers = workers
 
     @staticmethod
     def add_subparser(name: str, subparser: _SubParsersAction):
         agent_subparser = subparser.add_parser(name, help="Run the agent mode")
         agent_subparser.add_argument("--verbose", "-v", action="store_true")
         agent_subparser.add_argument("--model", type=str, default=os.getenv("DEFAULT_MODEL"))
+        agent_subparser.add_argument("--max-steps", type=int, default=5, help="Maximum number of model turns")
+        agent_subparser.add_argument("--max-time", type=float, default=60.0, help="Time budget in seconds")
+        agent_subparser.add_argument("--workers", type=int, default=4, help="Tool calls executed in parallel")
 
     def run(self):
         
@@ -42,22 +46,37 @@ class AgentMode(Mode):
             """
             return a * b
 
-        llm = init_chat_model(
+        @tool
+        def addition(
+            a: Annotated[int, "un entier à additionner à b"], 
+            b: Annotated[int, "un entier à additionner à a"]) -> int:
+            """
+            Cette fonction retourne un entier résultat de la somme de l'entier a et de l'entier b
+            """
+            return a + b
+
+        llm = resources.chat_model(
             self.model,
             model_provider="ollama")
-        
-        prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content="You are a helpful assistant."),
-            HumanMessagePromptTemplate.from_template("{input}"),
-        ])
 
-        #agent = create_tool_calling_agent(llm, [multiplication], prompt=prompt)
-        #agent_executor = AgentExecutor(agent=agent, tools=[multiplication])
-
-        chain = prompt | llm.bind_tools([multiplication])
+        loop = ToolCallingLoop(
+            llm,
+            [multiplication, addition],
+            self.console,
+            deterministic={"multiplication", "addition"},
+            max_steps=self.max_steps,
+            max_time=self.max_time,
+            max_workers=self.workers,
+            verbose=self.verbose)
 
         human_input = self.console.human_input()
 
-        response = chain.invoke({"input": human_input})
+        messages = [
+            SystemMessage(content="You are a helpful assistant."),
+            HumanMessage(content=human_input),
+        ]
 
-        print(response)
\ No newline at end of file
+        self.metrics.start_turn()
+        response = loop.run(messages, config={"callbacks": [self.metrics]})
+        self.console.bot_output(response.content)
+        self.metrics.end_turn(self.verbose)
@@ -1,12 +1,13 @@
 import os
-from mode import Mode
+from mode import Mode, PathArgument
 from console import Console
 from argparse import _SubParsersAction
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.prompts import SystemMessagePromptTemplate
 from langchain_core.prompts import HumanMessagePromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain.chat_models import init_chat_model
+import resources
+from router import ModelRouter
 
 class AskMode(Mode):
     def __init__(
@@ -14,6 +15,8 @@ class AskMode(Mode):
         console: Console,
         model: str = "llama3.2:1b",
         system: str = "default", 
+        route: bool = False,
+        large_model: str = "llama3.2:3b",
         out: str|None = None,
         data: list[str]|None = None,
         verbose: bool = False):
@@ -21,6 +24,8 @@ class AskMode(Mode):
 
         self.model = model
         self.system = system
+        self.route = route
+        self.large_model = large_model
         self.out = out
         self.data = data
         self.verbose = verbose
@@ -30,24 +35,27 @@ class AskMode(Mode):
         chat_subparser = subparser.add_parser(name)
         chat_subparser.add_argument("--model", type=str, default="llama3.2:1b")
         chat_subparser.add_argument("--system", type=str, default="default")
+        chat_subparser.add_argument("--route", action="store_true", help="Route complex turns to --large-model")
+        chat_subparser.add_argument("--large-model", type=str, default="llama3.2:3b")
         chat_subparser.add_argument("--verbose", "-v", action="store_true")
-        chat_subparser.add_argument("--out", type=str, default=None)
+        chat_subparser.add_argument("--out", type=PathArgument, default=None)
         chat_subparser.add_argument("--data", "-d", action="append", type=str, default=None)
 
     def run(self):
         # Read system prompt
         system_prompt_path = os.path.join(os.getenv("PROMPTS_DIR"), f"{self.system}.txt")
-        with open(system_prompt_path, "r") as f:
-            system_prompt = f.read()
+        system_prompt = resources.read_prompt(system_prompt_path)
 
         # Load model
         if self.verbose:
             self.console.info(f"Loading model {self.model}...")
 
-        model = init_chat_model(
-            self.model, 
-            model_provider="ollama", 
-            temperature=1)
+        router = ModelRouter(
+            self.console,
+            self.__class__.__name__,
+            self.model,
+            self.large_model if self.route else None,
+            verbose=self.verbose)
 
         # Parse data
         system_data = {}
@@ -77,26 +85,25 @@ class AskMode(Mode):
         ])
 
         # Create chain
-        chain = prompt | model | StrOutputParser()
+        def make_chain(model: str):
+            return prompt | resources.chat_model(model, model_provider="ollama", temperature=1) | StrOutputParser()
 
         # Print system prompt
         user_input = self.console.human_input()
+        self.metrics.start_turn()
 
-        stream = chain.stream({"request": user_input })
-
-        self.console.bot_start()
+        bot_message = router.stream(
+            make_chain,
+            {"request": user_input },
+            user_input,
+            config={"callbacks": [self.metrics]})
+        self.metrics.end_turn(self.verbose)
 
+        # Written once generated, an escalated turn replaces the first answer
         if self.out:
             with open(self.out, "w") as f:
-                for chunk in stream:
-                    f.write(chunk)
-                    self.console.bot_chunk(chunk)
+                f.write(bot_message)
                 f.write("\n")
-        else:
-            for chunk in stream:
-                self.console.bot_chunk(chunk)
-
-        self.console.bot_end()
 
         if self.verbose and self.out:
             self.console.info(f"Output saved to {self.out}")
\ No newline at end of file
@@ -1,38 +1,89 @@
 import os
+import time
 from mode import Mode
 from console import Console
 from argparse import _SubParsersAction
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from langchain.chat_models import init_chat_model
+import resources
+from router import ModelRouter
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
+from session_store import SessionHistory
+from semantic_cache import SemanticCache
+from bm25_index import BM25Index, index_directory, reciprocal_rank_fusion
+from quantized_index import QuantizedIndex, index_directory as quantized_directory
+from federated import FederatedRetriever
 
 class BookMode(Mode):
 
-    history: list[BaseMessage] = []
+    history: list[BaseMessage]
 
     def __init__(
         self, 
         console: Console,
         model: str = "llama3.2:1b",
         system: str = "default", 
+        route: bool = False,
+        large_model: str = "llama3.2:3b",
+        cache_threshold: float = 0.95,
+        no_cache: bool = False,
+        cache_report: bool = False,
+        retrieval: str = "hybrid",
+        lexical_threshold: float = 0.75,
+        quantized: bool = False,
+        sources: list[str]|None = None,
+        source_timeout: float = 2.0,
+        session: str|None = None,
+        window: int|None = None,
         verbose: bool = False):
         super().__init__(console)
 
         self.model = model
         self.system = system
+        self.route = route
+        self.large_model = large_model
+        self.cache_threshold = cache_threshold
+        self.no_cache = no_cache
+        self.cache_report = cache_report
+        self.retrieval = retrieval
+        self.lexical_threshold = lexical_threshold
+        self.quantized = quantized
+        self.sources = sources
+        self.source_timeout = source_timeout
         self.verbose = verbose
+        self.history = SessionHistory(resources.session_store() if session else None, session, window)
 
     @staticmethod
     def add_subparser(name: str, subparser: _SubParsersAction):
         chat_subparser = subparser.add_parser(name)
         chat_subparser.add_argument("--model", type=str, default="llama3.2:1b")
         chat_subparser.add_argument("--system", type=str, default="default")
+        chat_subparser.add_argument("--route", action="store_true", help="Route complex turns to --large-model")
+        chat_subparser.add_argument("--large-model", type=str, default="llama3.2:3b")
+        chat_subparser.add_argument("--cache-threshold", type=float, default=0.95, help="Cosine similarity above which a cached answer is reused")
+        chat_subparser.add_argument("--no-cache", action="store_true", help="Disable the semantic answer cache")
+        chat_subparser.add_argument("--cache-report", action="store_true", help="Print the semantic cache hit rate and exit")
+        chat_subparser.add_argument("--retrieval", choices=["hybrid", "dense", "lexical"], default="hybrid", help="Vector search, BM25 keyword search or both fused")
+        chat_subparser.add_argument("--lexical-threshold", type=float, default=0.75, help="BM25 match strength (0-1) above which hybrid retrieval skips the query embedding")
+        chat_subparser.add_argument("--quantized", action="store_true", help="Search the quantized index built by load-book --quantize")
+        chat_subparser.add_argument("--sources", nargs="*", default=None, help="Also search these sources concurrently (haikus, haikus-local, transcripts, books...)")
+        chat_subparser.add_argument("--source-timeout", type=float, default=2.0, help="Seconds after which a source is left out of the answer")
+        chat_subparser.add_argument("--session", type=str, default=None, help="Session id, saved and resumed across runs")
+        chat_subparser.add_argument("--window", type=int, default=None, help="Number of past messages kept in the prompt (default: 40 with --session, all without; 0: all)")
         chat_subparser.add_argument("--verbose", "-v", action="store_true")
 
     def run(self):
+        collection = os.getenv("BOOK_COLLECTION", "books")
+        cache = SemanticCache(collection, threshold=self.cache_threshold)
+
+        if self.cache_report:
+            report = cache.report()
+            self.console.info(f"Collection : {report['namespace']}")
+            self.console.info(f"Entries : {report['entries']}")
+            self.console.info(f"Hits : {report['hits']} / Misses : {report['misses']} ({report['hit_rate']:.1%})")
+            self.console.info(f"Latency saved : {report['latency_saved']:.2f}s")
+            return
+
         # Read system prompt
         system_prompt = """
         Répond à la question de l'utilisateur en te basant sur
@@ -45,19 +96,42 @@ class BookMode(Mode):
         """
 
         # load VectorStore
-        vector_store = Chroma(
-            embedding_function=OpenAIEmbeddings(),
-            persist_directory="./store"
-        )
+        embeddings = resources.embeddings("openai")
+        vector_store = resources.vector_store(collection, "openai")
+
+        quantized_index = None
+        if self.quantized:
+            if QuantizedIndex.exists(quantized_directory(collection)):
+                quantized_index = QuantizedIndex.load(quantized_directory(collection))
+                if quantized_index.is_stale(vector_store):
+                    self.console.error("Quantized index is out of date, run load-book --quantize again.")
+            else:
+                self.console.error("Quantized index not found, run load-book --quantize. Using the vector store.")
+
+        lexical_index = None
+        if self.retrieval != "dense":
+            if BM25Index.exists(index_directory(collection)):
+                lexical_index = BM25Index.load(index_directory(collection))
+            else:
+                self.console.error("Keyword index not found, run load-book again. Using vector search only.")
+
+        # The other sources are searched along with the book, concurrently
+        federated = None
+        if self.sources:
+            federated = FederatedRetriever(
+                [collection] + [source for source in self.sources if source != collection],
+                timeout=self.source_timeout)
 
         # Load model
         if self.verbose:
             self.console.info(f"Loading model {self.model}...")
 
-        model = init_chat_model(
-            self.model, 
-            model_provider="ollama", 
-            temperature=1)
+        router = ModelRouter(
+            self.console,
+            self.__class__.__name__,
+            self.model,
+            self.large_model if self.route else None,
+            verbose=self.verbose)
 
         # Create prompt
         prompt = ChatPromptTemplate.from_messages([
@@ -66,29 +140,89 @@ class BookMode(Mode):
         ])
 
         # Create chain
-        chain = prompt | model | StrOutputParser()
+        def make_chain(model: str):
+            return prompt | resources.chat_model(model, model_provider="ollama", temperature=1) | StrOutputParser()
 
         # Display optional informations
         if self.verbose:
             self.console.system_output(system_prompt)
 
+        # Cached answers were given without context: follow-up questions of a
+        # session and answers drawing on other sources are not cached
+        use_cache = not self.no_cache and not self.history and not self.sources
+        if self.verbose and not self.no_cache and not use_cache:
+            self.console.info("Semantic cache skipped, the question has a context.")
+
         # Print system prompt
         user_input = self.console.human_input()
         self.history.append(HumanMessage(user_input))
-
-        documents = vector_store.similarity_search(user_input, k=4)
+        self.metrics.start_turn()
+
+        start = time.perf_counter()
+
+        lexical_results = []
+        fast_path = False
+        if lexical_index:
+            with self.metrics.timed("retrieval"):
+                lexical_results = lexical_index.search(user_input, k=4)
+            strength = lexical_index.strength(user_input, lexical_results)
+            # Keyword matches are strong enough: skip the embedding round-trip.
+            # Other sources still need the query embedding.
+            fast_path = federated is None and (self.retrieval == "lexical" or strength >= self.lexical_threshold)
+            if self.verbose:
+                self.console.info(f"Keyword match strength {strength:.2f}" + (" (lexical fast path)" if fast_path else ""))
+
+        # The query embedding is shared by the cache lookup and the retrieval.
+        # Without it only exact question matches are looked up in the cache.
+        embedding = None
+        if not fast_path:
+            with self.metrics.timed("embedding"):
+                embedding = embeddings.embed_query(user_input)
+
+        if use_cache:
+            cached = cache.lookup(user_input, embedding)
+            if cached:
+                answer, similarity = cached
+                if self.verbose:
+                    self.console.info(f"Cached answer (similarity {similarity:.3f})")
+                self.console.bot_output(answer)
+                self.history.append(AIMessage(answer))
+                self.metrics.cache_hit()
+                self.metrics.end_turn(self.verbose)
+                return
+
+        lexical_documents = [document for document, _ in lexical_results]
+        if fast_path:
+            documents = lexical_documents
+        else:
+            with self.metrics.timed("retrieval"):
+                if federated:
+                    documents = federated.search(user_input, k=4, embeddings={"openai": embedding})
+                    federated.close()
+                    if self.verbose:
+                        for name, report in federated.report.items():
+                            self.console.info(f"Source {name} : {report['status']}, {report['results']} results" + (f" in {report['latency']:.2f}s" if "latency" in report else ""))
+                elif quantized_index:
+                    documents = [document for document, _ in quantized_index.search_by_vector(embedding, k=4)]
+                else:
+                    documents = vector_store.similarity_search_by_vector(embedding, k=4)
+            if lexical_documents:
+                documents = reciprocal_rank_fusion([documents, lexical_documents])[:4]
         for document in documents:
             self.console.info(document.page_content)
 
-        self.console.bot_start()
-        stream = chain.stream({
-            "messages": self.history,
-            "documents": documents
-        })
-        bot_message = ""
-        for chunk in stream:
-            bot_message += chunk
-            self.console.bot_chunk(chunk)
-        self.console.bot_end()
-
-        self.history.append(AIMessage(bot_message))
\ No newline at end of file
+        bot_message = router.stream(
+            make_chain,
+            {
+                "messages": self.history,
+                "documents": documents
+            },
+            user_input,
+            config={"callbacks": [self.metrics]})
+
+        self.history.append(AIMessage(bot_message))
+
+        if use_cache:
+            cache.store(user_input, bot_message, time.perf_counter() - start, embedding)
+
+        self.metrics.end_turn(self.verbose)
@@ -4,46 +4,60 @@ from console import Console
 from argparse import _SubParsersAction
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from langchain.chat_models import init_chat_model
+import resources
+from router import ModelRouter
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+from session_store import SessionHistory
 
 class ChatMode(Mode):
 
-    history: list[BaseMessage] = []
+    history: list[BaseMessage]
 
     def __init__(
         self, 
         console: Console,
         model: str = "llama3.2:1b",
         system: str = "default", 
+        route: bool = False,
+        large_model: str = "llama3.2:3b",
+        session: str|None = None,
+        window: int|None = None,
         verbose: bool = False):
         super().__init__(console)
 
         self.model = model
         self.system = system
+        self.route = route
+        self.large_model = large_model
         self.verbose = verbose
+        self.history = SessionHistory(resources.session_store() if session else None, session, window)
 
     @staticmethod
     def add_subparser(name: str, subparser: _SubParsersAction):
         chat_subparser = subparser.add_parser(name)
         chat_subparser.add_argument("--model", type=str, default="llama3.2:1b")
         chat_subparser.add_argument("--system", type=str, default="default")
+        chat_subparser.add_argument("--route", action="store_true", help="Route complex turns to --large-model")
+        chat_subparser.add_argument("--large-model", type=str, default="llama3.2:3b")
+        chat_subparser.add_argument("--session", type=str, default=None, help="Session id, saved and resumed across runs")
+        chat_subparser.add_argument("--window", type=int, default=None, help="Number of past messages kept in the prompt (default: 40 with --session, all without; 0: all)")
         chat_subparser.add_argument("--verbose", "-v", action="store_true")
 
     def run(self):
         # Read system prompt
         system_prompt_path = os.path.join(os.getenv("PROMPTS_DIR"), f"{self.system}.txt")
-        with open(system_prompt_path, "r") as f:
-            system_prompt = f.read()
+        system_prompt = resources.read_prompt(system_prompt_path)
 
         # Load model
         if self.verbose:
             self.console.info(f"Loading model {self.model}...")
 
-        model = init_chat_model(
-            self.model, 
-            model_provider="ollama", 
-            temperature=1)
+        router = ModelRouter(
+            self.console,
+            self.__class__.__name__,
+            self.model,
+            self.large_model if self.route else None,
+            verbose=self.verbose)
 
         # Create prompt
         prompt = ChatPromptTemplate.from_messages([
@@ -52,7 +66,8 @@ class ChatMode(Mode):
         ])
 
         # Create chain
-        chain = prompt | model | StrOutputParser()
+        def make_chain(model: str):
+            return prompt | resources.chat_model(model, model_provider="ollama", temperature=1) | StrOutputParser()
 
         # Display optional informations
         if self.verbose:
@@ -61,15 +76,15 @@ class ChatMode(Mode):
         # Print system prompt
         while True:
             user_input = self.console.human_input()
+            self.metrics.start_turn()
 
             self.history.append(HumanMessage(user_input))
 
-            self.console.bot_start()
-            stream = chain.stream({"messages": self.history})
-            bot_message = ""
-            for chunk in stream:
-                bot_message += chunk
-                self.console.bot_chunk(chunk)
-            self.console.bot_end()
+            bot_message = router.stream(
+                make_chain,
+                {"messages": self.history},
+                user_input,
+                config={"callbacks": [self.metrics]})
 
-            self.history.append(AIMessage(bot_message))
\ No newline at end of file
+            self.history.append(AIMessage(bot_message))
+            self.metrics.end_turn(self.verbose)
\ No newline at end of file
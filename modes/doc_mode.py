@@ -1,18 +1,19 @@
 import os
-from mode import Mode
+from mode import Mode, PathArgument
 from console import Console
 from argparse import _SubParsersAction
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from langchain.chat_models import init_chat_model
+import resources
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+from session_store import SessionHistory
 
 class DocMode(Mode):
 
     EXCLUDED_DIRS = {"venv", "__pycache__", ".git", ".idea", ".mypy_cache", ".pytest_cache"}
     INCLUDED_EXTENSIONS = {".py"}
 
-    history: list[BaseMessage] = []
+    history: list[BaseMessage]
 
     def __init__(
         self,
@@ -21,6 +22,8 @@ class DocMode(Mode):
         system: str = "doc",
         path: str = ".",
         out: str | None = None,
+        session: str|None = None,
+        window: int|None = None,
         verbose: bool = False):
         super().__init__(console)
 
@@ -29,21 +32,23 @@ class DocMode(Mode):
         self.path = path
         self.out = out
         self.verbose = verbose
+        self.history = SessionHistory(resources.session_store() if session else None, session, window)
 
     @staticmethod
     def add_subparser(name: str, subparser: _SubParsersAction):
         doc_subparser = subparser.add_parser(name)
         doc_subparser.add_argument("--model", type=str, default="llama3.2:3b")
         doc_subparser.add_argument("--system", type=str, default="doc")
-        doc_subparser.add_argument("--path", type=str, default=".")
-        doc_subparser.add_argument("--out", type=str, default=None)
+        doc_subparser.add_argument("--path", type=PathArgument, default=".")
+        doc_subparser.add_argument("--out", type=PathArgument, default=None)
+        doc_subparser.add_argument("--session", type=str, default=None, help="Session id, saved and resumed across runs")
+        doc_subparser.add_argument("--window", type=int, default=None, help="Number of past messages kept in the prompt (default: 40 with --session, all without; 0: all)")
         doc_subparser.add_argument("--verbose", "-v", action="store_true")
 
     def run(self):
         # Read system prompt
         system_prompt_path = os.path.join(os.getenv("PROMPTS_DIR"), f"{self.system}.txt")
-        with open(system_prompt_path, "r", encoding="utf-8") as f:
-            system_prompt = f.read()
+        system_prompt = resources.read_prompt(system_prompt_path)
 
         if self.verbose:
             self.console.system_output(system_prompt)
@@ -68,7 +73,7 @@ class DocMode(Mode):
         if self.verbose:
             self.console.info(f"Loading model {self.model}...")
 
-        model = init_chat_model(
+        model = resources.chat_model(
             self.model,
             model_provider="ollama",
             temperature=1
@@ -85,15 +90,12 @@ class DocMode(Mode):
         self.console.info("Generating documentation...")
 
         # Generation
-        self.console.bot_start()
-        bot_message = ""
-        stream = chain.stream({"messages": self.history})
-        for chunk in stream:
-            bot_message += chunk
-            self.console.bot_chunk(chunk)
-        self.console.bot_end()
+        self.metrics.start_turn()
+        bot_message = self.console.bot_stream(
+            chain.stream({"messages": self.history}, config={"callbacks": [self.metrics]}))
 
         self.history.append(AIMessage(content=bot_message))
+        self.metrics.end_turn(self.verbose)
 
         if self.out:
             with open(self.out, "w", encoding="utf-8") as f:
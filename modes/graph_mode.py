@@ -2,13 +2,14 @@ from argparse import _SubParsersAction
 import os
 from console import Console
 from mode import Mode
-from langchain.chat_models import init_chat_model
+import resources
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.prompts import MessagesPlaceholder
 from langchain_core.prompts import HumanMessagePromptTemplate
 from langchain_core.prompts import AIMessagePromptTemplate
 from langchain_core.messages import SystemMessage
 from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import START, END
 from langgraph.graph.message import MessageGraph
 from langgraph.graph import StateGraph
@@ -22,6 +23,7 @@ from uuid import uuid4
 from typing import TypedDict
 from pydantic import BaseModel, Field
 import sqlite3
+import time
 
 class MyState(TypedDict):
     user_request: str = None
@@ -55,7 +57,7 @@ class GraphMode(Mode):
         agent_subparser.add_argument("--model", type=str, default=os.getenv("DEFAULT_MODEL"))
     
     def chatbot_factory(self, llm: BaseChatModel):
-        def chatbot_node(state: MyState) -> MyState:
+        def chatbot_node(state: MyState, config: RunnableConfig) -> MyState:
             prompt = ChatPromptTemplate.from_messages([
                 SystemMessage("""
                 Tu es un générateur de tweet de qualité. Tu écris des tweet avec le niveau de qualité d'usage sur Twitter.
@@ -65,15 +67,15 @@ class GraphMode(Mode):
             
             chain = prompt | llm
 
-            answer = chain.invoke(state)
+            # The tokens reach the console through the graph "messages" stream
+            answer = chain.invoke(state, config=config)
 
-            self.console.bot_output(answer.content)
             state["tweet"] = answer.content
             return state
         return chatbot_node
 
     def loan_factory(self, llm: BaseChatModel):
-        def loan_node(state: MyState):
+        def loan_node(state: MyState, config: RunnableConfig):
             prompt = ChatPromptTemplate.from_messages([
                 SystemMessage("""
                     Tu es un critique de tweet. 
@@ -97,7 +99,7 @@ class GraphMode(Mode):
             ])
             chain = prompt |llm.with_structured_output(Critic)
 
-            response = chain.invoke({ "tweet": state["tweet"] })
+            response = chain.invoke({ "tweet": state["tweet"] }, config=config)
 
             state["rating"] = response.rating
             state["critic"] = response.critic
@@ -113,7 +115,7 @@ class GraphMode(Mode):
         return should_send
 
     def run(self):
-        llm = init_chat_model(
+        llm = resources.chat_model(
             self.model,
             model_provider="openai")
 
@@ -145,10 +147,61 @@ class GraphMode(Mode):
         config = {
             "configurable": {
                 "thread_id": self.thread if self.thread else uuid4()
-            }
+            },
+            "callbacks": [self.metrics]
         }
 
         while True:
             human_input = self.console.human_input()
             initial_state = MyState(user_request=human_input)
-            history = app.invoke(initial_state, config=config)
+            self.metrics.start_turn()
+            self.stream(app, initial_state, config)
+            self.metrics.end_turn(self.verbose)
+
+    def stream(self, app, state: MyState, config: dict):
+        """
+        Runs the graph, streaming each draft token by token and printing the
+        critic rating as soon as the critic node completes.
+        """
+        iteration = 1
+        start = time.perf_counter()
+        ttft = None
+        streaming = False
+
+        events = app.stream(state, config=config, stream_mode=["messages", "updates"])
+        try:
+            with self.console.generation():
+                for stream_mode, chunk in events:
+                    if stream_mode == "messages":
+                        message, metadata = chunk
+                        # Only the drafts are displayed, not the structured critic output
+                        if metadata.get("langgraph_node") != "chatbot" or not message.content:
+                            continue
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                            self.console.bot_start()
+                            streaming = True
+                        self.console.bot_chunk(message.content)
+                        continue
+
+                    for node, update in chunk.items():
+                        if node == "chatbot":
+                            if ttft is None:
+                                # Nothing was streamed, display the draft at once
+                                ttft = time.perf_counter() - start
+                                self.console.bot_output(update["tweet"])
+                            else:
+                                self.console.bot_end()
+                            streaming = False
+                        elif node == "loan":
+                            self.console.info(f"Draft {iteration} (ttft {ttft:.2f}s) : {update['rating']}/100 - {update['critic']}")
+                            iteration += 1
+                            start = time.perf_counter()
+                            ttft = None
+        except KeyboardInterrupt:
+            # Ctrl-C stops the critique loop, closing the stream stops the model
+            if streaming:
+                self.console.bot_end()
+            self.console.info("Génération interrompue.")
+        finally:
+            events.close()
@@ -1,48 +1,74 @@
 import os
 from argparse import _SubParsersAction
-from langchain_chroma import Chroma
-from langchain_ollama import OllamaEmbeddings
+import resources
 from mode import Mode
 from console import Console
+from quantized_index import QuantizedIndex, index_directory
 
 class HaikuMode(Mode):
     def __init__(
         self, 
         console: Console, 
+        quantized: bool = False,
+        embeddings: str = "ollama",
         verbose: bool = False):
         super().__init__(console)
         
+        self.quantized = quantized
+        self.embeddings = embeddings
         self.verbose = verbose
 
     @staticmethod
     def add_subparser(name: str, subparser: _SubParsersAction):
         haiku_subparser = subparser.add_parser(name)
+        haiku_subparser.add_argument("--quantized", action="store_true", help="Search the quantized index built by load-haiku --quantize")
+        haiku_subparser.add_argument("--embeddings", choices=["ollama", "local"], default="ollama", help="Ollama EMBEDDING_MODEL or in-process hashed n-grams")
         haiku_subparser.add_argument("--verbose", "-v", action="store_true")
         
     def run(self):
         # Load embedding model
-        embeddings_model = os.getenv("EMBEDDING_MODEL")
+        embeddings_model = os.getenv("EMBEDDING_MODEL") if self.embeddings == "ollama" else resources.embeddings("local").name
 
         if self.verbose:
             self.console.info(f"Loading embedding model {embeddings_model}...")
 
-        embeddings = OllamaEmbeddings(model=embeddings_model)
+        # Create vector store, local vectors live in their own collection
+        collection = os.getenv("HAIKU_COLLECTION", "haikus") + ("-local" if self.embeddings == "local" else "")
+        vector_store = resources.vector_store(collection, self.embeddings)
+        if self.embeddings == "ollama":
+            # Earlier versions kept the haikus in Chroma's default collection
+            migrated = resources.migrate_legacy_haikus(vector_store)
+            if migrated:
+                self.console.info(f"{migrated} haikus moved from the collection {resources.LEGACY_HAIKU_COLLECTION} to {collection}.")
 
-        # Create vector store
-        vector_store = Chroma(
-            embedding_function=embeddings,
-            persist_directory=os.getenv("VECTOR_STORE_DATA")
-        )
+        quantized_index = None
+        if self.quantized:
+            if QuantizedIndex.exists(index_directory(collection)):
+                quantized_index = QuantizedIndex.load(index_directory(collection))
+                if quantized_index.is_stale(vector_store):
+                    self.console.error("Quantized index is out of date, run load-haiku --quantize again.")
+            else:
+                self.console.error("Quantized index not found, run load-haiku --quantize. Using the vector store.")
 
         while True:
             user_input = self.console.human_input()
+            self.metrics.start_turn()
 
             self.console.bot_start()
-            response = vector_store.similarity_search(query=user_input, k=1)
+            if quantized_index:
+                with self.metrics.timed("embedding"):
+                    embedding = resources.embeddings(self.embeddings).embed_query(user_input)
+                with self.metrics.timed("retrieval"):
+                    response = [document for document, _ in quantized_index.search_by_vector(embedding, k=1)]
+            else:
+                with self.metrics.timed("retrieval"):
+                    response = vector_store.similarity_search(query=user_input, k=1)
             if len(response) == 0:
                 self.console.bot_chunk("Je ne connais aucun haiku ¯\\_(ツ)_/¯")
                 self.console.bot_end()
+                self.metrics.end_turn(self.verbose)
                 continue
 
             self.console.bot_chunk(response[0].page_content)
-            self.console.bot_end()
\ No newline at end of file
+            self.console.bot_end()
+            self.metrics.end_turn(self.verbose)
\ No newline at end of file
@@ -1,46 +1,89 @@
 import os
 from argparse import _SubParsersAction
 from console import Console
-from mode import Mode
+from mode import Mode, PathArgument
 from langchain_community.document_loaders import PyPDFLoader
-from langchain_experimental.text_splitter import SemanticChunker
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
+from streaming_chunker import StreamingSemanticChunker
+import resources
+from semantic_cache import SemanticCache
+from bm25_index import BM25Index, index_directory
+from quantized_index import QuantizedIndex, DTYPES, index_directory as quantized_directory
 
 class LoadBookMode(Mode):
     def __init__(
         self, 
         console: Console, 
         book: str, 
+        quantize: str|None = None,
+        batch_size: int = 256,
         verbose: bool = False):
         super().__init__(console)
 
         self.book = book
+        self.quantize = quantize
+        self.batch_size = batch_size
         self.verbose = verbose
 
     @staticmethod
     def add_subparser(name: str, subparser: _SubParsersAction):
         load_book_subparser = subparser.add_parser(name)
-        load_book_subparser.add_argument("book", type=str, help="The book to load")
+        load_book_subparser.add_argument("book", type=PathArgument, help="The book to load")
+        load_book_subparser.add_argument("--quantize", choices=DTYPES, default=None, help="Also build a quantized index of the collection")
+        load_book_subparser.add_argument("--batch-size", type=int, default=256, help="Sentences embedded per request while chunking")
         load_book_subparser.add_argument("--verbose", "-v", action="store_true", help="Verbose mode")
 
     def run(self):
         self.console.info(f"Loading book {self.book}...")
 
+        collection = os.getenv("BOOK_COLLECTION", "books")
+
         # Create vector store
-        vector_store = Chroma(
-            embedding_function=OpenAIEmbeddings(),
-            persist_directory=os.getenv("VECTOR_STORE_DATA")
-        )
-
-        # Loading
-        text_splitter = SemanticChunker(
-            embeddings=OpenAIEmbeddings(),
-        )
-        
+        vector_store = resources.vector_store(collection, "openai")
+
+        # Loading, chunks may span pages and are stored as they are emitted
+        chunker = StreamingSemanticChunker(resources.embeddings("openai"), batch_size=self.batch_size)
+
+        self.metrics.start_turn()
         loader = PyPDFLoader(self.book)
-        for page in loader.lazy_load():
-            chunks = text_splitter.split_documents([page])
-            vector_store.add_documents(chunks)
- 
- 
+        # The chunks of a previous load of this book are replaced, in the
+        # vector store as in the keyword index below
+        source = loader.source
+        vector_store.delete(where={"source": source})
+        documents = []
+        pending = []
+        with self.metrics.timed("embedding"):
+            for chunk in chunker.split_documents(loader.lazy_load()):
+                pending.append(chunk)
+                if len(pending) == 64:
+                    vector_store.add_documents(pending)
+                    documents.extend(pending)
+                    pending = []
+            if pending:
+                vector_store.add_documents(pending)
+                documents.extend(pending)
+        self.metrics.end_turn(self.verbose)
+        if self.verbose:
+            self.console.info(
+                f"{len(documents)} chunks from {chunker.sentence_count} sentences, "
+                f"{chunker.embedding_calls} embedding requests for the chunking.")
+
+        # Keyword index over every chunk of the collection, rebuilt in full
+        directory = index_directory(collection)
+        if BM25Index.exists(directory):
+            documents = [
+                document for document in BM25Index.load(directory).documents
+                if document.metadata.get("source") != source
+            ] + documents
+        BM25Index.build(documents).save(directory)
+        if self.verbose:
+            self.console.info(f"Keyword index rebuilt with {len(documents)} chunks.")
+
+        if self.quantize:
+            index = QuantizedIndex.from_vector_store(vector_store, self.quantize)
+            index.save(quantized_directory(collection))
+            self.console.info(f"Quantized index ({self.quantize}) built : {index.memory_footprint() / 2**20:.1f} MiB scanned per query, {index.disk_size() / 2**20:.1f} MiB on disk")
+
+        # Cached answers were generated from the previous content
+        removed = SemanticCache(collection).invalidate()
+        if self.verbose:
+            self.console.info(f"{removed} cached answers invalidated.")
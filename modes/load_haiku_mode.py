@@ -1,40 +1,47 @@
 import os
 from argparse import _SubParsersAction
-from langchain_chroma import Chroma
-from langchain_ollama import OllamaEmbeddings
+import resources
 from console import Console
-from mode import Mode
+from mode import Mode, PathArgument
+from quantized_index import QuantizedIndex, DTYPES, index_directory
 
 class LoadHaikuMode(Mode):
     def __init__(
         self, 
         console: Console, 
         verbose: bool = False,
-        file: str = None):
+        file: str = None,
+        quantize: str|None = None,
+        embeddings: str = "ollama"):
         super().__init__(console)
 
         self.verbose = verbose
         self.file = file
+        self.quantize = quantize
+        self.embeddings = embeddings
 
     @staticmethod
     def add_subparser(name: str, subparser: _SubParsersAction):
         load_haiku_subparser = subparser.add_parser("load-haiku")
         load_haiku_subparser.add_argument("--verbose", "-v", action="store_true")
-        load_haiku_subparser.add_argument("--file", type=str, default=None)
+        load_haiku_subparser.add_argument("--file", type=PathArgument, default=None)
+        load_haiku_subparser.add_argument("--quantize", choices=DTYPES, default=None, help="Also build a quantized index of the collection (with --file)")
+        load_haiku_subparser.add_argument("--embeddings", choices=["ollama", "local"], default="ollama", help="Ollama EMBEDDING_MODEL or in-process hashed n-grams")
 
     def run(self):
-        embeddings_model = os.getenv("EMBEDDING_MODEL")
+        embeddings_model = os.getenv("EMBEDDING_MODEL") if self.embeddings == "ollama" else resources.embeddings("local").name
 
         if self.verbose:
             self.console.info(f"Loading embedding model {embeddings_model}...")
 
-        embeddings = OllamaEmbeddings(model=embeddings_model)
-
-        # Create vector store
-        vector_store = Chroma(
-            embedding_function=embeddings,
-            persist_directory=os.getenv("VECTOR_STORE_DATA")
-        )
+        # Create vector store, local vectors live in their own collection
+        collection = os.getenv("HAIKU_COLLECTION", "haikus") + ("-local" if self.embeddings == "local" else "")
+        vector_store = resources.vector_store(collection, self.embeddings)
+        if self.embeddings == "ollama":
+            # Earlier versions kept the haikus in Chroma's default collection
+            migrated = resources.migrate_legacy_haikus(vector_store)
+            if migrated:
+                self.console.info(f"{migrated} haikus moved from the collection {resources.LEGACY_HAIKU_COLLECTION} to {collection}.")
 
         if self.file:
             with open(self.file, "r") as f:
@@ -42,15 +49,31 @@ class LoadHaikuMode(Mode):
 
             haikus = [haiku.strip() for haiku in haikus]
 
-            for haiku in haikus:
-                vector_store.add_texts([haiku])
+            self.metrics.start_turn()
+            with self.metrics.timed("embedding"):
+                if self.embeddings == "local":
+                    # Hashing is vectorized over each batch
+                    for i in range(0, len(haikus), 1000):
+                        vector_store.add_texts(haikus[i:i + 1000])
+                else:
+                    for haiku in haikus:
+                        vector_store.add_texts([haiku])
+            self.metrics.end_turn(self.verbose)
 
             self.console.info(f"{len(haikus)} haikus added to vector store.")
 
+            if self.quantize:
+                index = QuantizedIndex.from_vector_store(vector_store, self.quantize)
+                index.save(index_directory(collection))
+                self.console.info(f"Quantized index ({self.quantize}) built : {index.memory_footprint() / 2**20:.1f} MiB scanned per query, {index.disk_size() / 2**20:.1f} MiB on disk")
+
         else:
             while True:
                 user_input = self.console.human_input()
-                vector_store.add_texts([user_input])
+                self.metrics.start_turn()
+                with self.metrics.timed("embedding"):
+                    vector_store.add_texts([user_input])
+                self.metrics.end_turn(self.verbose)
 
                 if self.verbose:
                     self.console.bot_start()
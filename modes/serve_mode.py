@@ -0,0 +1,113 @@
+import os
+import socket
+import ollama
+from argparse import _SubParsersAction
+from console import Console
+from mode import Mode
+import resources
+from server import Server
+from client import socket_path, stats
+from singleflight import SingleFlight
+
+class ServeMode(Mode):
+    def __init__(
+        self, 
+        console: Console, 
+        preload: list[str]|None = None,
+        keep_alive: str = "-1",
+        coalesce: bool = True,
+        stats: bool = False,
+        verbose: bool = False):
+        super().__init__(console)
+
+        # The clients find the daemon through the same SERVE_SOCKET variable
+        self.socket = socket_path()
+        self.preload = preload if preload is not None else ["llama3.2:1b", os.getenv("DEFAULT_MODEL")]
+        self.keep_alive = keep_alive
+        self.coalesce = coalesce
+        self.stats = stats
+        self.verbose = verbose
+
+    @staticmethod
+    def add_subparser(name: str, subparser: _SubParsersAction):
+        serve_subparser = subparser.add_parser(name, help="Keep models and vector stores loaded behind a Unix socket (SERVE_SOCKET, default CACHE_DIR/chatbot.sock)")
+        serve_subparser.add_argument("--preload", nargs="*", type=str, default=None, help="Ollama chat models to load at startup")
+        serve_subparser.add_argument("--keep-alive", type=str, default="-1", help="How long Ollama keeps the models loaded (-1: forever)")
+        serve_subparser.add_argument("--no-coalesce", dest="coalesce", action="store_false", help="Do not share identical concurrent model and embedding calls between sessions")
+        serve_subparser.add_argument("--stats", action="store_true", help="Print the counters of the running daemon and exit")
+        serve_subparser.add_argument("--verbose", "-v", action="store_true")
+
+    def _is_running(self) -> bool:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            client.connect(self.socket)
+            return True
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+        finally:
+            client.close()
+
+    def warm_up(self):
+        keep_alive = int(self.keep_alive) if self.keep_alive.lstrip("-").isdigit() else self.keep_alive
+        resources.keep_alive = keep_alive
+        if self.coalesce:
+            # Before any model is created, so that every one of them is wrapped
+            resources.coalescing = SingleFlight()
+
+        for model in filter(None, self.preload):
+            try:
+                if self.verbose:
+                    self.console.info(f"Loading model {model}...")
+                # An empty request makes Ollama load the weights without generating
+                ollama.Client(host=os.getenv("OLLAMA_HOST")).generate(model=model, prompt="", keep_alive=keep_alive)
+            except Exception as e:
+                self.console.error(f"Unable to load model {model} : {e}")
+
+        stores = [
+            (os.getenv("HAIKU_COLLECTION", "haikus"), "ollama"),
+            (os.getenv("BOOK_COLLECTION", "books"), "openai"),
+        ]
+        for collection, provider in stores:
+            try:
+                if self.verbose:
+                    self.console.info(f"Opening collection {collection}...")
+                resources.vector_store(collection, provider)
+            except Exception as e:
+                self.console.error(f"Unable to open collection {collection} : {e}")
+
+    def report(self, counters: dict|None):
+        if counters is None:
+            self.console.info("Coalescing disabled")
+            return
+        saved = counters["coalesced"] / counters["requests"] if counters["requests"] else 0.0
+        self.console.info(
+            f"Coalescing : {counters['requests']} requests, {counters['upstream']} upstream calls, "
+            f"{counters['coalesced']} coalesced ({saved:.0%})")
+
+    def run(self):
+        if self.stats:
+            response = stats(self.socket)
+            if response is None:
+                self.console.error(f"No daemon listening on {self.socket}")
+                return
+            self.report(response["coalescing"])
+            return
+
+        if self._is_running():
+            self.console.error(f"A daemon is already listening on {self.socket}")
+            return
+        if os.path.exists(self.socket):
+            os.remove(self.socket)
+
+        self.warm_up()
+
+        server = Server(self.socket, self.app)
+        self.console.info(f"Listening on {self.socket}")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            if resources.coalescing is not None:
+                self.report(resources.coalescing.counters)
+            if os.path.exists(self.socket):
+                os.remove(self.socket)
@@ -0,0 +1,371 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import numpy as np
+from argparse import _SubParsersAction
+from langchain_chroma import Chroma
+from console import Console
+from mode import Mode, PathArgument
+import resources
+from semantic_cache import SemanticCache
+from bm25_index import BM25Index, index_directory
+from quantized_index import QuantizedIndex, index_directory as quantized_directory
+from langchain_core.documents import Document
+
+def embedding_model(provider: str) -> str|None:
+    """Name of the vector space of the provider, None when it is not configurable."""
+    if provider == "ollama":
+        return os.getenv("EMBEDDING_MODEL")
+    if provider == "local":
+        return resources.embeddings("local").name
+    return None
+
+def read_collection(vector_store: Chroma, batch_size: int = 5000, embeddings: bool = True):
+    """Yields the collection content in batches of ids, documents, metadatas and embeddings."""
+    include = ["documents", "metadatas"] + (["embeddings"] if embeddings else [])
+    offset = 0
+    while True:
+        batch = vector_store.get(include=include, limit=batch_size, offset=offset)
+        if len(batch["ids"]) == 0:
+            return
+        yield batch
+        offset += len(batch["ids"])
+
+def add_rows(vector_store: Chroma, ids: list[str], vectors: np.ndarray, documents: list[str], metadatas: list[dict|None]):
+    """Adds stored rows back to the collection, without embedding them again."""
+    # Chroma refuses empty metadata, rows without metadata are added apart
+    with_metadata = [i for i, metadata in enumerate(metadatas) if metadata]
+    without_metadata = [i for i, metadata in enumerate(metadatas) if not metadata]
+    for indices in (with_metadata, without_metadata):
+        if not indices:
+            continue
+        vector_store._collection.add(
+            ids=[ids[i] for i in indices],
+            embeddings=vectors[indices],
+            documents=[documents[i] for i in indices],
+            metadatas=[metadatas[i] for i in indices] if indices is with_metadata else None)
+
+def export_collection(vector_store: Chroma, directory: str, batch_size: int = 5000, manifest: dict|None = None) -> int:
+    """
+    Writes the collection to `directory` as a snapshot: vectors.npy (float32,
+    memory-mappable), documents.jsonl (id, document and metadata per row, in
+    the order of the vectors) and manifest.json. Returns the number of rows.
+    """
+    os.makedirs(directory, exist_ok=True)
+    count = resources.collection_count(vector_store)
+    vectors = None
+    written = 0
+    with open(os.path.join(directory, "documents.jsonl"), "w", encoding="utf-8") as f:
+        for batch in read_collection(vector_store, batch_size):
+            embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+            if vectors is None:
+                # Written in place batch after batch, never held in memory
+                vectors = np.lib.format.open_memmap(
+                    os.path.join(directory, "vectors.npy"), mode="w+", dtype=np.float32, shape=(count, embeddings.shape[1]))
+            vectors[written:written + len(embeddings)] = embeddings
+            written += len(embeddings)
+            for id, document, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                f.write(json.dumps({"id": id, "document": document, "metadata": metadata}, ensure_ascii=False) + "\n")
+    if vectors is None:
+        np.save(os.path.join(directory, "vectors.npy"), np.empty((0, 0), dtype=np.float32))
+    else:
+        vectors.flush()
+        del vectors
+
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            **(manifest or {}),
+            "count": written,
+            "dimension": int(np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r").shape[1]),
+            "dtype": "float32",
+            "created": time.time(),
+        }, f, indent=2)
+    return written
+
+def import_collection(vector_store: Chroma, directory: str, batch_size: int = 5000) -> tuple[int, int]:
+    """
+    Bulk-loads a snapshot of export_collection, without embedding calls.
+    Returns the number of rows of the snapshot and the number of rows added:
+    Chroma skips the ids the collection already holds.
+    """
+    vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+    count = resources.collection_count(vector_store)
+    imported = 0
+    with open(os.path.join(directory, "documents.jsonl"), "r", encoding="utf-8") as f:
+        rows = []
+        for line in f:
+            rows.append(json.loads(line))
+            if len(rows) == batch_size:
+                add_rows(vector_store, [r["id"] for r in rows], np.asarray(vectors[imported:imported + len(rows)]),
+                         [r["document"] for r in rows], [r["metadata"] for r in rows])
+                imported += len(rows)
+                rows = []
+        if rows:
+            add_rows(vector_store, [r["id"] for r in rows], np.asarray(vectors[imported:imported + len(rows)]),
+                     [r["document"] for r in rows], [r["metadata"] for r in rows])
+            imported += len(rows)
+    return imported, resources.collection_count(vector_store) - count
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def directory_size(path: str) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                size += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return size
+
+def reclaim_space(persist_directory: str) -> int:
+    """
+    Gives the space freed by deleted rows and dropped collections back to
+    the disk: vacuums the Chroma SQLite file and removes the HNSW segment
+    directories no collection refers to anymore. Returns the bytes freed.
+    """
+    size = directory_size(persist_directory)
+    conn = sqlite3.connect(os.path.join(persist_directory, "chroma.sqlite3"))
+    try:
+        conn.execute("PRAGMA busy_timeout = 5000")
+        segments = {row[0] for row in conn.execute("SELECT id FROM segments")}
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    for name in os.listdir(persist_directory):
+        path = os.path.join(persist_directory, name)
+        # Segment directories are named after their segment id
+        if os.path.isdir(path) and len(name) == 36 and name.count("-") == 4 and name not in segments:
+            shutil.rmtree(path)
+    return size - directory_size(persist_directory)
+
+class StoreMode(Mode):
+    def __init__(
+        self,
+        console: Console,
+        action: str,
+        collection: list[str]|None = None,
+        queries: int = 50,
+        batch_size: int = 5000,
+        directory: str = "snapshots",
+        replace: bool = False,
+        verbose: bool = False):
+        super().__init__(console)
+
+        self.action = action
+        self.directory = directory
+        self.replace = replace
+        self.collections = collection
+        self.queries = queries
+        self.batch_size = batch_size
+        self.verbose = verbose
+
+    @staticmethod
+    def add_subparser(name: str, subparser: _SubParsersAction):
+        common = argparse.ArgumentParser(add_help=False)
+        common.add_argument("--collection", nargs="*", default=None, help="Collections to maintain (default: the haiku and book collections)")
+        common.add_argument("--queries", type=int, default=50, help="Queries sampled to measure the search latency")
+        common.add_argument("--batch-size", type=int, default=5000)
+        common.add_argument("--verbose", "-v", action="store_true")
+
+        store_subparser = subparser.add_parser(name, help="Inspect and maintain the vector store")
+        actions = store_subparser.add_subparsers(dest="action", required=True)
+        actions.add_parser("stats", parents=[common], help="Report collection sizes, duplicate ratios and query latency")
+        actions.add_parser("dedup", parents=[common], help="Delete the chunks whose content is already in the collection")
+        actions.add_parser("compact", parents=[common], help="Rebuild the collections from the stored vectors and reclaim the freed disk space")
+        export_parser = actions.add_parser("export", parents=[common], help="Write the collections as snapshots, one directory per collection")
+        export_parser.add_argument("directory", nargs="?", type=PathArgument, default="snapshots")
+        import_parser = actions.add_parser("import", parents=[common], help="Load the snapshots written by export, without embedding calls")
+        import_parser.add_argument("directory", nargs="?", type=PathArgument, default="snapshots")
+        import_parser.add_argument("--replace", action="store_true", help="Empty the collections before the import")
+
+    def run(self):
+        providers = resources.collections()
+        for collection in self.collections or providers:
+            if collection not in providers:
+                self.console.error(f"Unknown collection {collection}, expected one of {', '.join(providers)}")
+                continue
+            try:
+                vector_store = resources.vector_store(collection, providers[collection])
+            except Exception as e:
+                # e.g. the book collection without OPENAI_API_KEY
+                self.console.error(f"Collection {collection} cannot be opened, skipped : {e}")
+                continue
+            actions = {
+                "stats": self.stats,
+                "dedup": self.dedup,
+                "compact": self.compact,
+                "export": self.export,
+                "import": self.import_,
+            }
+            actions[self.action](collection, vector_store)
+
+        if self.action == "stats":
+            self.console.info(f"Store total size : {directory_size(os.getenv('VECTOR_STORE_DATA')) / 2**20:.1f} MiB")
+
+    # Measures
+
+    def sample_queries(self, vector_store: Chroma) -> np.ndarray:
+        """Stored vectors used as queries, no embedding call is needed."""
+        count = resources.collection_count(vector_store)
+        if not count:
+            return np.empty((0, 0), dtype=np.float32)
+        rng = np.random.default_rng(0)
+        offsets = rng.choice(count, size=min(self.queries, count), replace=False)
+        return np.asarray([
+            vector_store.get(include=["embeddings"], limit=1, offset=int(offset))["embeddings"][0]
+            for offset in offsets
+        ], dtype=np.float32)
+
+    @staticmethod
+    def query_latency(vector_store: Chroma, queries: np.ndarray) -> tuple[float, float]|None:
+        """Returns the median and 95th percentile search latency in seconds."""
+        if not len(queries):
+            return None
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            vector_store.similarity_search_by_vector(query.tolist(), k=4)
+            latencies.append(time.perf_counter() - start)
+        p50, p95 = np.percentile(latencies, [50, 95])
+        return float(p50), float(p95)
+
+    def duplicates(self, vector_store: Chroma) -> tuple[int, list[str]]:
+        """Returns the number of chunks and the ids of the chunks repeating an earlier one."""
+        seen = set()
+        duplicate_ids = []
+        count = 0
+        for batch in read_collection(vector_store, self.batch_size, embeddings=False):
+            for id, content in zip(batch["ids"], batch["documents"]):
+                count += 1
+                digest = content_hash(content or "")
+                if digest in seen:
+                    duplicate_ids.append(id)
+                else:
+                    seen.add(digest)
+        return count, duplicate_ids
+
+    def _report_latency(self, label: str, latency: tuple[float, float]|None):
+        if latency:
+            self.console.info(f"{label} query latency : p50 {latency[0] * 1000:.1f} ms | p95 {latency[1] * 1000:.1f} ms")
+
+    # Actions
+
+    def stats(self, collection: str, vector_store: Chroma):
+        count, duplicate_ids = self.duplicates(vector_store)
+        ratio = len(duplicate_ids) / count if count else 0.0
+        self.console.info(f"Collection {collection} : {count} chunks, {len(duplicate_ids)} duplicates ({ratio:.1%})")
+        self._report_latency("Current", self.query_latency(vector_store, self.sample_queries(vector_store)))
+
+    def dedup(self, collection: str, vector_store: Chroma):
+        queries = self.sample_queries(vector_store)
+        before = self.query_latency(vector_store, queries)
+
+        count, duplicate_ids = self.duplicates(vector_store)
+        if not duplicate_ids:
+            self.console.info(f"Collection {collection} : no duplicates among {count} chunks")
+            return
+        for i in range(0, len(duplicate_ids), self.batch_size):
+            vector_store.delete(ids=duplicate_ids[i:i + self.batch_size])
+        self.console.info(f"Collection {collection} : {len(duplicate_ids)} duplicates deleted, {count - len(duplicate_ids)} chunks left")
+
+        self.rebuild_indexes(collection, vector_store)
+        self._report_latency("Before", before)
+        self._report_latency("After", self.query_latency(vector_store, queries))
+
+    def compact(self, collection: str, vector_store: Chroma):
+        queries = self.sample_queries(vector_store)
+        before = self.query_latency(vector_store, queries)
+        persist_directory = os.getenv("VECTOR_STORE_DATA")
+        size = directory_size(persist_directory)
+
+        # The content is set aside as a snapshot until the new collection is complete
+        backup = os.path.join(persist_directory, "compact", collection)
+        count = export_collection(vector_store, backup, self.batch_size)
+        if not count:
+            self.console.info(f"Collection {collection} is empty")
+            shutil.rmtree(os.path.dirname(backup))
+            return
+
+        # Dropping the collection drops its fragmented HNSW segment, adding
+        # the vectors back builds a fresh one
+        vector_store.reset_collection()
+        try:
+            import_collection(vector_store, backup, self.batch_size)
+        except Exception as e:
+            self.console.error(f"Rebuild of {collection} failed, its content is kept in {backup} (store import) : {e}")
+            raise
+        shutil.rmtree(os.path.dirname(backup))
+
+        # The dropped segment and the freed pages stay on disk until reclaimed
+        reclaim_space(persist_directory)
+
+        self.console.info(f"Collection {collection} : {count} chunks rebuilt")
+        self.console.info(f"Store total size : {size / 2**20:.1f} MiB -> {directory_size(persist_directory) / 2**20:.1f} MiB")
+        self._report_latency("Before", before)
+        self._report_latency("After", self.query_latency(vector_store, queries))
+
+    def export(self, collection: str, vector_store: Chroma):
+        start = time.perf_counter()
+        directory = os.path.join(self.directory, collection)
+        count = export_collection(vector_store, directory, self.batch_size, manifest={
+            "collection": collection,
+            "provider": resources.collections()[collection],
+            "embedding_model": embedding_model(resources.collections()[collection]),
+        })
+        self.console.info(
+            f"Collection {collection} : {count} chunks exported to {directory} "
+            f"({directory_size(directory) / 2**20:.1f} MiB, {time.perf_counter() - start:.2f}s)")
+
+    def import_(self, collection: str, vector_store: Chroma):
+        directory = os.path.join(self.directory, collection)
+        if not os.path.exists(os.path.join(directory, "manifest.json")):
+            self.console.error(f"No snapshot of {collection} in {self.directory}")
+            return
+        with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        # Vectors of another embeddings model would not match the queries
+        provider = resources.collections()[collection]
+        if manifest.get("provider") != provider or manifest.get("embedding_model") != embedding_model(provider):
+            self.console.error(
+                f"Snapshot of {collection} was embedded with {manifest.get('provider')} "
+                f"{manifest.get('embedding_model') or ''}, not imported")
+            return
+
+        start = time.perf_counter()
+        if self.replace:
+            vector_store.reset_collection()
+        count, added = import_collection(vector_store, directory, self.batch_size)
+        # Book mode needs its keyword index, a new node has none yet
+        self.rebuild_indexes(collection, vector_store, keyword=collection == os.getenv("BOOK_COLLECTION", "books"))
+        self.console.info(f"Collection {collection} : {added} chunks imported in {time.perf_counter() - start:.2f}s")
+        if added < count:
+            self.console.error(f"{count - added} chunks of the snapshot were already in {collection} and skipped, use --replace to overwrite them")
+
+    def rebuild_indexes(self, collection: str, vector_store: Chroma, keyword: bool = False):
+        """Rebuilds the keyword and quantized indexes existing for the collection, the keyword index anyway with `keyword`."""
+        if keyword or BM25Index.exists(index_directory(collection)):
+            documents = [
+                Document(page_content=content, metadata=metadata or {})
+                for batch in read_collection(vector_store, self.batch_size, embeddings=False)
+                for content, metadata in zip(batch["documents"], batch["metadatas"])
+            ]
+            BM25Index.build(documents).save(index_directory(collection))
+            if self.verbose:
+                self.console.info(f"Keyword index rebuilt with {len(documents)} chunks.")
+
+        if QuantizedIndex.exists(quantized_directory(collection)):
+            dtype = QuantizedIndex.load(quantized_directory(collection)).dtype
+            index = QuantizedIndex.from_vector_store(vector_store, dtype, self.batch_size)
+            index.save(quantized_directory(collection))
+            if self.verbose:
+                self.console.info(f"Quantized index ({dtype}) rebuilt.")
+
+        # Cached answers were generated from the previous content
+        SemanticCache(collection).invalidate()
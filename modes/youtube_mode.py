@@ -1,23 +1,37 @@
 from argparse import _SubParsersAction
 from console import Console
-from mode import Mode
+from mode import Mode, PathArgument
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from langchain.chat_models import init_chat_model
+import resources
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+from session_store import SessionHistory
 import os
 import time
-import json
-import hashlib
 from youtube_transcript_api import YouTubeTranscriptApi
 import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from summary_store import SummaryStore
 # Imports pour le cache
 import langchain
 from langchain_community.cache import SQLiteCache
 
 class YoutubeMode(Mode):
     system: str = "default"
-    history: list[BaseMessage] = []
+    history: list[BaseMessage]
+
+    # API des transcriptions, remplaçable pour les benchmarks
+    transcript_api = YouTubeTranscriptApi
+    # Téléchargements de transcriptions simultanés
+    max_workers: int = 8
+    # Listes des transcriptions par vidéo, partagées entre les sessions :
+    # au plus `transcript_lists_size` vidéos, gardées `transcript_lists_ttl` secondes
+    transcript_lists_size: int = 64
+    transcript_lists_ttl: float = 3600.0
+    _transcript_lists: OrderedDict = OrderedDict()
+    _transcript_lists_lock = threading.Lock()
 
     def __init__(
         self,
@@ -26,13 +40,17 @@ class YoutubeMode(Mode):
         transcript: str = None,
         verbose: bool = False,
         model: str = None,
-        clear_cache: bool = False):
+        clear_cache: bool = False,
+        evict_older_than: float = None,
+        session: str = None,
+        window: int|None = None):
         super().__init__(console)
 
         self.url = url
         self.transcript = transcript
         self.verbose = verbose
         self.model = model if model else os.getenv("DEFAULT_MODEL")
+        self.history = SessionHistory(resources.session_store() if session else None, session, window)
 
         # Initialisation du cache LangChain
         cache_path = os.path.join(os.path.dirname(os.getenv("CACHE_DIR")), ".langchain.db")
@@ -47,25 +65,34 @@ class YoutubeMode(Mode):
             self.console.info(f"Cache LangChain activé ({cache_path})")
 
         # Initialisation du cache de résumés
-        self.summaries_cache_dir = os.path.join(os.path.dirname(os.getenv("CACHE_DIR")), "summaries_cache")
-        os.makedirs(self.summaries_cache_dir, exist_ok=True)
+        self.summaries = SummaryStore(os.path.join(os.path.dirname(os.getenv("CACHE_DIR")), "summaries.db"))
+
+        # Reprise de l'ancien cache (un fichier JSON par vidéo)
+        migrated = self.summaries.migrate(os.path.join(os.path.dirname(os.getenv("CACHE_DIR")), "summaries_cache"))
+        if migrated and self.verbose:
+            self.console.info(f"{migrated} résumés importés depuis summaries_cache")
 
         # Si clear_cache est activé, vider aussi le cache des résumés
         if clear_cache:
-            for file in os.listdir(self.summaries_cache_dir):
-                if file.endswith('.json'):
-                    os.remove(os.path.join(self.summaries_cache_dir, file))
+            self.summaries.clear()
             if self.verbose:
                 self.console.info(f"Cache des résumés vidéo vidé")
+        elif evict_older_than is not None:
+            evicted = self.summaries.evict(older_than=time.time() - evict_older_than * 86400)
+            if self.verbose:
+                self.console.info(f"{evicted} résumés de plus de {evict_older_than:g} jours supprimés du cache")
 
     @staticmethod
     def add_subparser(name: str, subparser: _SubParsersAction):
         youtube_subparser = subparser.add_parser(name)
         youtube_subparser.add_argument("url", type=str, help="URL de la vidéo Youtube à résumer")
-        youtube_subparser.add_argument("--transcript", "-t", type=str, help="Chemin vers un fichier de transcription local (optionnel)")
+        youtube_subparser.add_argument("--transcript", "-t", type=PathArgument, help="Chemin vers un fichier de transcription local (optionnel)")
         youtube_subparser.add_argument("--verbose", "-v", action="store_true", help="Mode verbeux")
         youtube_subparser.add_argument("--model", "-m", type=str, help="Modèle à utiliser (ex: llama3.2:3b)")
         youtube_subparser.add_argument("--clear-cache", "-cc", action="store_true", help="Vider le cache LangChain et des résumés")
+        youtube_subparser.add_argument("--evict-older-than", type=float, default=None, metavar="JOURS", help="Supprimer du cache les résumés plus anciens que JOURS jours")
+        youtube_subparser.add_argument("--session", type=str, default=None, help="Identifiant de session, sauvegardée et reprise entre les exécutions")
+        youtube_subparser.add_argument("--window", type=int, default=None, help="Nombre de messages passés gardés dans le prompt (par défaut : 40 avec --session, tous sans ; 0 : tous)")
 
     def get_video_id(self, url):
         # Extrait l'ID de la vidéo depuis l'URL
@@ -73,45 +100,25 @@ class YoutubeMode(Mode):
         match = re.search(regex, url)
         return match.group(1) if match else None
 
-    def get_cache_key(self, video_id):
-        """Génère une clé de cache basée sur l'ID de la vidéo"""
-        return hashlib.md5(video_id.encode()).hexdigest()
-
     def get_cached_data(self, video_id):
         """Récupère le résumé et la transcription en cache pour une vidéo donnée"""
-        cache_key = self.get_cache_key(video_id)
-        cache_file = os.path.join(self.summaries_cache_dir, f"{cache_key}.json")
+        try:
+            cached = self.summaries.get(video_id)
+        except Exception as e:
+            self.console.error(f"Erreur lors du chargement des données en cache : {e}")
+            return None, None
 
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                if self.verbose:
-                    self.console.info(f"Données trouvées en cache pour la vidéo {video_id}")
-                return cache_data.get('summary'), cache_data.get('transcript')
-            except Exception as e:
-                self.console.error(f"Erreur lors du chargement des données en cache : {e}")
-                return None, None
-        return None, None
+        if cached is None:
+            return None, None
+        if self.verbose:
+            self.console.info(f"Données trouvées en cache pour la vidéo {video_id}")
+        return cached
 
     def save_summary_to_cache(self, video_id, summary, transcript=None):
         """Sauvegarde le résumé d'une vidéo dans le cache"""
-        cache_key = self.get_cache_key(video_id)
-        cache_file = os.path.join(self.summaries_cache_dir, f"{cache_key}.json")
-
-        cache_data = {
-            'video_id': video_id,
-            'summary': summary,
-            'timestamp': time.time()
-        }
-
-        # Optionnellement, stocker aussi la transcription
-        if transcript:
-            cache_data['transcript'] = transcript
-
         try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            # Optionnellement, stocker aussi la transcription
+            self.summaries.put(video_id, summary, transcript or None, model=self.model)
             if self.verbose:
                 self.console.info(f"Résumé sauvegardé en cache pour la vidéo {video_id}")
         except Exception as e:
@@ -130,56 +137,18 @@ class YoutubeMode(Mode):
             self.console.error(f"Erreur lors du chargement du fichier de transcription : {e}")
             return None
 
-    def get_transcript(self, video_id, retries=3, delay=2):
-        """Récupère la transcription avec gestion des retries en cas d'erreur de connexion"""
+    def list_transcripts(self, video_id, retries=3, delay=2):
+        """Liste les transcriptions de la vidéo, avec retries et cache par vidéo"""
+        with self._transcript_lists_lock:
+            cached = self._transcript_lists.get(video_id)
+            if cached and time.monotonic() - cached[0] < self.transcript_lists_ttl:
+                self._transcript_lists.move_to_end(video_id)
+                return cached[1]
+
         for attempt in range(retries):
             try:
-                transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-
-                if self.verbose:
-                    self.console.info("Transcriptions disponibles :")
-                    for transcript in transcript_list:
-                        self.console.info(f" - {transcript.language_code} | Générée: {transcript.is_generated} | Traduisible: {transcript.is_translatable}")
-
-                # 1. Essaye de récupérer directement la transcription en français
-                try:
-                    transcript = transcript_list.find_transcript(['fr'])
-                    transcript_data = transcript.fetch()
-                    texts = [t['text'] if isinstance(t, dict) else getattr(t, 'text', '') for t in transcript_data]
-                    texts = [txt.strip() for txt in texts if txt.strip()]  # Filtre les textes vides
-                    if texts:
-                        return " ".join(texts)
-                except Exception as e:
-                    if self.verbose:
-                        self.console.info(f"Impossible de récupérer la transcription française directe: {e}")
-
-                # 2. Sinon, essaye de traduire une transcription en français
-                for transcript in transcript_list:
-                    if transcript.is_translatable:
-                        try:
-                            translated = transcript.translate('fr')
-                            transcript_data = translated.fetch()
-                            texts = [t['text'] if isinstance(t, dict) else getattr(t, 'text', '') for t in transcript_data]
-                            texts = [txt.strip() for txt in texts if txt.strip()]
-                            if texts:
-                                return " ".join(texts)
-                        except Exception as e:
-                            if self.verbose:
-                                self.console.info(f"Erreur lors de la traduction en français: {e}")
-                        try:
-                            translated = transcript.translate('en')
-                            transcript_data = translated.fetch()
-                            texts = [t['text'] if isinstance(t, dict) else getattr(t, 'text', '') for t in transcript_data]
-                            texts = [txt.strip() for txt in texts if txt.strip()]
-                            if texts:
-                                return " ".join(texts)
-                        except Exception as e:
-                            if self.verbose:
-                                self.console.info(f"Erreur lors de la traduction en anglais: {e}")
-
-                self.console.error("Aucune transcription exploitable trouvée pour cette vidéo.")
-                return None
-
+                transcript_list = self.transcript_api.list_transcripts(video_id)
+                break
             except Exception as e:
                 if attempt < retries - 1:
                     self.console.info(f"Tentative {attempt+1}/{retries} échouée : {e}")
@@ -191,11 +160,73 @@ class YoutubeMode(Mode):
                     self.console.error(f"Erreur lors de la récupération de la transcription : {e}")
                     return None
 
+        # La liste est itérée plusieurs fois, on la matérialise
+        transcript_list = (transcript_list, list(transcript_list))
+        with self._transcript_lists_lock:
+            self._transcript_lists[video_id] = (time.monotonic(), transcript_list)
+            self._transcript_lists.move_to_end(video_id)
+            # Les vidéos les moins récemment demandées sortent du cache
+            while len(self._transcript_lists) > self.transcript_lists_size:
+                self._transcript_lists.popitem(last=False)
+        return transcript_list
+
+    @staticmethod
+    def fetch_text(transcript):
+        """Télécharge une transcription et retourne son texte, None si elle est vide"""
+        transcript_data = transcript.fetch()
+        texts = [t['text'] if isinstance(t, dict) else getattr(t, 'text', '') for t in transcript_data]
+        texts = [txt.strip() for txt in texts if txt.strip()]  # Filtre les textes vides
+        return " ".join(texts) if texts else None
+
+    def get_transcript(self, video_id, retries=3, delay=2):
+        """
+        Récupère la transcription : la version française si elle existe, sinon
+        une traduction en français ou en anglais. Les candidates sont
+        téléchargées en parallèle mais retenues par ordre de préférence : une
+        candidate n'est retenue que si toutes les précédentes ont échoué.
+        """
+        listing = self.list_transcripts(video_id, retries, delay)
+        if listing is None:
+            return None
+        transcript_list, transcripts = listing
+
+        if self.verbose:
+            self.console.info("Transcriptions disponibles :")
+            for transcript in transcripts:
+                self.console.info(f" - {transcript.language_code} | Générée: {transcript.is_generated} | Traduisible: {transcript.is_translatable}")
+
+        # Candidates par ordre de préférence
+        candidates = [("française directe", lambda: transcript_list.find_transcript(['fr']))]
+        for transcript in transcripts:
+            if transcript.is_translatable:
+                candidates.append((f"traduction {transcript.language_code} -> fr", lambda t=transcript: t.translate('fr')))
+                candidates.append((f"traduction {transcript.language_code} -> en", lambda t=transcript: t.translate('en')))
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(candidates)))
+        futures = [(name, executor.submit(lambda c=candidate: self.fetch_text(c()))) for name, candidate in candidates]
+        try:
+            for name, future in futures:
+                try:
+                    text = future.result()
+                except Exception as e:
+                    if self.verbose:
+                        self.console.info(f"Transcription {name} impossible : {e}")
+                    continue
+                if text:
+                    if self.verbose:
+                        self.console.info(f"Transcription retenue : {name}")
+                    return text
+        finally:
+            # Les téléchargements restants ne sont plus utiles
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        self.console.error("Aucune transcription exploitable trouvée pour cette vidéo.")
+        return None
+
     def run(self):
         # Charge le prompt système
         system_prompt_path = os.path.join(os.getenv("PROMPTS_DIR"), f"system/{self.system}.txt")
-        with open(system_prompt_path, "r") as f:
-            system_prompt = f.read()
+        system_prompt = resources.read_prompt(system_prompt_path)
 
         # Récupérer l'ID de la vidéo
         video_id = self.get_video_id(self.url)
@@ -222,8 +253,8 @@ class YoutubeMode(Mode):
         if self.verbose:
             self.console.info(f"Transcription récupérée, chargement du modèle {self.model}...")
 
-        model = init_chat_model(
-            model=self.model,
+        model = resources.chat_model(
+            self.model,
             model_provider="ollama",
             temperature=1)
 
@@ -242,15 +273,13 @@ class YoutubeMode(Mode):
         ])
         resume_chain = resume_prompt | model | StrOutputParser()
         self.console.info("Résumé de la vidéo :")
-        self.console.bot_start()
-        resume = ""
-        for chunk in resume_chain.stream({}):
-            resume += chunk
-            self.console.bot_chunk(chunk)
-        self.console.bot_end()
+        self.metrics.start_turn()
+        resume = self.console.bot_stream(resume_chain.stream({}, config={"callbacks": [self.metrics]}))
+        self.metrics.end_turn(self.verbose)
 
-        # Sauvegarder le résumé et la transcription en cache
-        self.save_summary_to_cache(video_id, resume, transcript)
+        # Sauvegarder le résumé et la transcription en cache, sauf s'il a été interrompu
+        if not self.console.interrupted:
+            self.save_summary_to_cache(video_id, resume, transcript)
 
         self.console.info("\n---\n")
 
@@ -288,15 +317,12 @@ class YoutubeMode(Mode):
                         user_input += f"\n\nVoici le segment {segment_num+1} complet:\n{transcript_segments[segment_num]}"
                         self.console.info(f"[Ajout du segment {segment_num+1} à la requête]")
 
+                self.metrics.start_turn()
                 self.history.append(HumanMessage(user_input))
-                stream = chain.stream({"messages": self.history})
-                bot_message = ""
-                self.console.bot_start()
-                for chunk in stream:
-                    bot_message += chunk
-                    self.console.bot_chunk(chunk)
-                self.console.bot_end()
+                bot_message = self.console.bot_stream(
+                    chain.stream({"messages": self.history}, config={"callbacks": [self.metrics]}))
                 self.history.append(AIMessage(bot_message))
+                self.metrics.end_turn(self.verbose)
         else:
             self.console.error("Discussion interactive impossible : Aucune transcription disponible.")
             self.console.info("Conseil: Utilisez l'option --clear-cache pour forcer la récupération de la transcription.")
\ No newline at end of file
@@ -0,0 +1,61 @@
+import os
+import json
+import time
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from console import Console
+
+@contextmanager
+def profiled(directory: str, console: Console, top: int = 30):
+    """
+    Profiles the block and writes to `directory`:
+
+    - profile.prof: cProfile stats (open with `python -m pstats` or snakeviz)
+    - allocations.txt: the `top` tracemalloc allocation sites
+    - breakdown.json: wall-clock split between local CPU, user input and
+      waiting (network and disk I/O, mostly the model server)
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    # CPU spent before the mode runs: interpreter start and imports
+    startup_cpu = time.process_time()
+    input_time = console.input_time
+
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        profiler.dump_stats(os.path.join(directory, "profile.prof"))
+
+        with open(os.path.join(directory, "allocations.txt"), "w", encoding="utf-8") as f:
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
+
+        user_input = console.input_time - input_time
+        breakdown = {
+            "startup_cpu": startup_cpu,
+            "wall": wall,
+            "cpu": cpu,
+            "user_input": user_input,
+            "wait": max(wall - cpu - user_input, 0.0),
+            "traced_memory_current": current,
+            "traced_memory_peak": peak,
+        }
+        with open(os.path.join(directory, "breakdown.json"), "w", encoding="utf-8") as f:
+            json.dump(breakdown, f, indent=2)
+
+        console.info(
+            f"Profile saved to {directory} : wall {wall:.2f}s | cpu {cpu:.2f}s | "
+            f"input {user_input:.2f}s | wait {breakdown['wait']:.2f}s | startup cpu {startup_cpu:.2f}s")
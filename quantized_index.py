@@ -0,0 +1,142 @@
+import os
+import json
+import numpy as np
+from langchain_core.documents import Document
+from langchain_chroma import Chroma
+import resources
+
+DTYPES = ("float16", "int8")
+
+def index_directory(collection: str) -> str:
+    return os.path.join(os.getenv("VECTOR_STORE_DATA"), "quantized", collection)
+
+class QuantizedIndex:
+    """
+    Brute-force cosine index over quantized vectors.
+
+    Vectors are normalized then stored as float16, or as int8 with one scale
+    per vector (symmetric scalar quantization). The codes are scanned to
+    build a shortlist, which is re-ranked with the exact float32 vectors.
+    Every array is memory mapped: only the codes are read on each query, the
+    float32 vectors are paged in for the shortlist rows only.
+    """
+
+    # Rows scored at once, bounds the temporary float32 copy of the codes
+    BLOCK = 65536
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        scales: np.ndarray|None,
+        vectors: np.ndarray,
+        documents: list[Document]):
+        self.codes = codes
+        self.scales = scales
+        self.vectors = vectors
+        self.documents = documents
+
+    @property
+    def dtype(self) -> str:
+        return str(self.codes.dtype)
+
+    @staticmethod
+    def quantize(vectors: np.ndarray, dtype: str) -> tuple[np.ndarray, np.ndarray|None]:
+        if dtype == "float16":
+            return vectors.astype(np.float16), None
+        if dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127
+            scales[scales == 0] = 1
+            codes = np.rint(vectors / scales[:, np.newaxis]).astype(np.int8)
+            return codes, scales.astype(np.float32)
+        raise ValueError(f"Unknown quantization {dtype}, expected one of {DTYPES}")
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, documents: list[Document], dtype: str = "int8") -> "QuantizedIndex":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        vectors = vectors / norms
+        codes, scales = cls.quantize(vectors, dtype)
+        return cls(codes, scales, vectors, documents)
+
+    @classmethod
+    def from_vector_store(cls, vector_store: Chroma, dtype: str = "int8", batch_size: int = 5000) -> "QuantizedIndex":
+        vectors = []
+        documents = []
+        offset = 0
+        while True:
+            batch = vector_store.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+            if len(batch["ids"]) == 0:
+                break
+            vectors.append(np.asarray(batch["embeddings"], dtype=np.float32))
+            for content, metadata in zip(batch["documents"], batch["metadatas"]):
+                documents.append(Document(page_content=content, metadata=metadata or {}))
+            offset += len(batch["ids"])
+
+        if not vectors:
+            raise ValueError("The collection is empty")
+        return cls.build(np.concatenate(vectors), documents, dtype)
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "codes.npy"), self.codes)
+        np.save(os.path.join(directory, "vectors.npy"), self.vectors)
+        if self.scales is not None:
+            np.save(os.path.join(directory, "scales.npy"), self.scales)
+        with open(os.path.join(directory, "documents.jsonl"), "w", encoding="utf-8") as f:
+            for document in self.documents:
+                f.write(json.dumps({"page_content": document.page_content, "metadata": document.metadata}, ensure_ascii=False) + "\n")
+        with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"dtype": self.dtype, "count": len(self.documents), "dimension": int(self.codes.shape[1])}, f)
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, "manifest.json"))
+
+    @classmethod
+    def load(cls, directory: str) -> "QuantizedIndex":
+        codes = np.load(os.path.join(directory, "codes.npy"), mmap_mode="r")
+        vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        scales_path = os.path.join(directory, "scales.npy")
+        scales = np.load(scales_path) if os.path.exists(scales_path) else None
+        documents = []
+        with open(os.path.join(directory, "documents.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                data = json.loads(line)
+                documents.append(Document(page_content=data["page_content"], metadata=data["metadata"]))
+        return cls(codes, scales, vectors, documents)
+
+    def is_stale(self, vector_store: Chroma) -> bool:
+        """True when the collection changed size since the index was built."""
+        return resources.collection_count(vector_store) != len(self.documents)
+
+    def memory_footprint(self) -> int:
+        """Bytes read by a query: the codes and their scales."""
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def disk_size(self) -> int:
+        """Bytes stored besides the vector store: the codes, their scales and the float32 re-rank vectors."""
+        return self.memory_footprint() + self.vectors.nbytes
+
+    def approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), self.BLOCK):
+            block = np.asarray(self.codes[start:start + self.BLOCK], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search_by_vector(self, embedding: list[float], k: int = 4, oversample: int = 4) -> list[tuple[Document, float]]:
+        if len(self.documents) == 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1)
+
+        # Shortlist on the quantized codes, exact re-ranking on float32
+        scores = self.approximate_scores(query)
+        size = min(k * oversample, len(scores))
+        shortlist = np.sort(np.argpartition(-scores, size - 1)[:size])
+        exact = np.asarray(self.vectors[shortlist]) @ query
+        order = np.argsort(-exact)[:k]
+        return [(self.documents[shortlist[i]], float(exact[i])) for i in order]
@@ -0,0 +1,137 @@
+import os
+import threading
+from langchain.chat_models import init_chat_model
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_ollama import OllamaEmbeddings
+from langchain_openai import OpenAIEmbeddings
+from langchain_chroma import Chroma
+from chromadb.errors import NotFoundError
+from singleflight import SingleFlight, CoalescingChatModel, CoalescingEmbeddings
+from session_store import SessionStore
+from local_embeddings import HashedNgramEmbeddings
+
+# Process-wide registry of the expensive objects used by the modes. In a
+# one-shot CLI run every object is created once anyway; in the `serve` daemon
+# they stay loaded between sessions.
+
+_lock = threading.RLock()
+_chat_models: dict[tuple, BaseChatModel] = {}
+_embeddings: dict[tuple, Embeddings] = {}
+_vector_stores: dict[tuple, Chroma] = {}
+_prompts: dict[str, tuple[float, str]] = {}
+_session_stores: dict[str, SessionStore] = {}
+
+# How long Ollama keeps a model in memory after a request (None: server default)
+keep_alive: int|str|None = None
+
+# When set, identical concurrent model and embedding requests share one call
+coalescing: SingleFlight|None = None
+
+def collections() -> dict[str, str]:
+    """The collections of the modes and the embeddings provider of each."""
+    return {
+        os.getenv("HAIKU_COLLECTION", "haikus"): "ollama",
+        os.getenv("HAIKU_COLLECTION", "haikus") + "-local": "local",
+        os.getenv("BOOK_COLLECTION", "books"): "openai",
+    }
+
+def chat_model(model: str, model_provider: str = "ollama", **kwargs) -> BaseChatModel:
+    key = (model, model_provider, tuple(sorted(kwargs.items())))
+    with _lock:
+        if key not in _chat_models:
+            if model_provider == "ollama" and keep_alive is not None:
+                kwargs["keep_alive"] = keep_alive
+            _chat_models[key] = init_chat_model(model, model_provider=model_provider, **kwargs)
+            if coalescing is not None:
+                _chat_models[key] = CoalescingChatModel(inner=_chat_models[key], name_key=repr(key), group=coalescing)
+        return _chat_models[key]
+
+def embeddings(provider: str = "ollama", model: str|None = None) -> Embeddings:
+    key = (provider, model)
+    with _lock:
+        if key not in _embeddings:
+            if provider == "ollama":
+                kwargs = {"keep_alive": keep_alive} if keep_alive is not None else {}
+                _embeddings[key] = OllamaEmbeddings(model=model or os.getenv("EMBEDDING_MODEL"), **kwargs)
+            elif provider == "openai":
+                _embeddings[key] = OpenAIEmbeddings(**({"model": model} if model else {}))
+            elif provider == "local":
+                _embeddings[key] = HashedNgramEmbeddings()
+            else:
+                raise ValueError(f"Unknown embeddings provider: {provider}")
+            if coalescing is not None:
+                _embeddings[key] = CoalescingEmbeddings(_embeddings[key], repr(key), coalescing)
+        return _embeddings[key]
+
+def vector_store(collection: str, provider: str = "ollama", model: str|None = None) -> Chroma:
+    persist_directory = os.getenv("VECTOR_STORE_DATA")
+    key = (collection, persist_directory, provider, model)
+    with _lock:
+        if key not in _vector_stores:
+            _vector_stores[key] = Chroma(
+                collection_name=collection,
+                embedding_function=embeddings(provider, model),
+                persist_directory=persist_directory
+            )
+        return _vector_stores[key]
+
+def collection_count(vector_store: Chroma) -> int:
+    """Number of rows of the collection, langchain_chroma has no public count."""
+    return vector_store._collection.count()
+
+# Collection of the haikus before they had their own, Chroma's default
+LEGACY_HAIKU_COLLECTION = "langchain"
+
+def migrate_legacy_haikus(vector_store: Chroma, batch_size: int = 5000) -> int:
+    """
+    Copies the haikus loaded by earlier versions into `vector_store` (the
+    ollama haiku collection) when it is still empty, vectors included.
+    Returns the number of haikus copied, the old collection is left as is.
+    """
+    with _lock:
+        if collection_count(vector_store):
+            return 0
+        try:
+            legacy = vector_store._client.get_collection(LEGACY_HAIKU_COLLECTION)
+        except (NotFoundError, ValueError):
+            return 0
+
+        copied = 0
+        while True:
+            batch = legacy.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=copied)
+            if len(batch["ids"]) == 0:
+                return copied
+            # Chroma refuses empty metadata, rows without metadata are added apart
+            metadatas = batch["metadatas"]
+            for with_metadata in (True, False):
+                indices = [i for i, metadata in enumerate(metadatas) if bool(metadata) == with_metadata]
+                if indices:
+                    vector_store._collection.add(
+                        ids=[batch["ids"][i] for i in indices],
+                        embeddings=[batch["embeddings"][i] for i in indices],
+                        documents=[batch["documents"][i] for i in indices],
+                        metadatas=[metadatas[i] for i in indices] if with_metadata else None)
+            copied += len(batch["ids"])
+
+def session_store() -> SessionStore:
+    path = os.path.join(os.getenv("CACHE_DIR", "."), "sessions.db")
+    with _lock:
+        if path not in _session_stores:
+            _session_stores[path] = SessionStore(path)
+        return _session_stores[path]
+
+def read_prompt(path: str) -> str:
+    """Reads a prompt file, served from memory until the file changes."""
+    mtime = os.path.getmtime(path)
+    with _lock:
+        cached = _prompts.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    with _lock:
+        _prompts[path] = (mtime, content)
+    return content
@@ -0,0 +1,182 @@
+import os
+import re
+import json
+import time
+from typing import Callable
+from langchain_core.runnables import Runnable
+from console import Console
+
+# Requests that a small model usually handles poorly
+COMPLEX_PATTERNS = [
+    r"```", r"\bdef |\bclass |\bimport ",
+    r"\bexpliqu", r"\bpourquoi\b", r"\bcompar", r"\banalys", r"\bdémontr", r"\bjustifi",
+    r"\bétape", r"\bcode\b", r"\balgorithm", r"\brésum",
+    r"\bexplain", r"\bwhy\b", r"\bstep by step\b",
+]
+
+# Answers showing the small model was not up to the task
+HEDGING_PATTERNS = [
+    r"je ne sais pas", r"je ne suis pas (sûr|certain)", r"je ne peux pas", r"désolé",
+    r"i don't know", r"i'm not sure", r"i cannot", r"sorry",
+]
+
+class ModelRouter:
+    """
+    Sends each turn to the small or the large model.
+
+    A turn goes to the large model when the prompt is long or when a cheap
+    keyword classifier flags it as complex. When the small model answers
+    with an empty, very short or hedging answer the turn is escalated to the
+    large model. The start of a small model answer is held back until it can
+    be judged, so that a discarded answer is never shown. Without `large`
+    every turn goes to `small`.
+
+    Chat, ask and book route their turns. Doc and youtube run the large
+    model by default on long inputs, and agent and graph need tool calls and
+    structured outputs, which the small model handles poorly and which the
+    escalation cannot judge: they keep their single model.
+
+    Decisions and per-model latency are appended to ROUTING_LOG (JSONL,
+    default CACHE_DIR/routing.jsonl) when routing is enabled.
+    """
+
+    def __init__(
+        self,
+        console: Console,
+        mode: str,
+        small: str,
+        large: str|None = None,
+        max_small_chars: int = 600,
+        min_answer_chars: int = 20,
+        verbose: bool = False):
+        self.console = console
+        self.mode = mode
+        self.small = small
+        self.large = large
+        self.max_small_chars = max_small_chars
+        self.min_answer_chars = min_answer_chars
+        self.verbose = verbose
+        self.path = os.getenv("ROUTING_LOG") or os.path.join(os.getenv("CACHE_DIR", "."), "routing.jsonl")
+
+    def route(self, text: str) -> tuple[str, str]:
+        """Returns the model for the prompt and the reason of the choice."""
+        if not self.large:
+            return self.small, "fixed"
+        if len(text) > self.max_small_chars:
+            return self.large, "length"
+        if text.count("?") > 1:
+            return self.large, "questions"
+        lowered = text.lower()
+        for pattern in COMPLEX_PATTERNS:
+            if re.search(pattern, lowered):
+                return self.large, "classifier"
+        return self.small, "simple"
+
+    # Characters at the start of an answer searched for hedging
+    hedging_window = 200
+
+    def confident(self, answer: str) -> bool:
+        answer = answer.strip().lower()
+        if len(answer) < self.min_answer_chars:
+            return False
+        return not any(re.search(pattern, answer[:self.hedging_window]) for pattern in HEDGING_PATTERNS)
+
+    def judged(self, start: str) -> bool:
+        """Whether the start of an answer is long enough for confident() to judge the whole answer."""
+        return len(start.lstrip()) >= max(self.hedging_window, self.min_answer_chars)
+
+    def stream(
+        self,
+        make_chain: Callable[[str], Runnable],
+        inputs: dict,
+        text: str,
+        config: dict|None = None) -> str:
+        """
+        Streams the answer of the routed model to the console and returns it.
+        `make_chain` builds the chain for a model name, `text` is the prompt
+        used for routing.
+        """
+        model, reason = self.route(text)
+        answer, ttft, latency = self._stream(make_chain(model), inputs, config, hold=bool(self.large) and model == self.small)
+        decision = {
+            "timestamp": time.time(),
+            "mode": self.mode,
+            "prompt_chars": len(text),
+            "model": model,
+            "reason": reason,
+            "ttft": ttft,
+            "latency": latency,
+            "escalated": False,
+        }
+
+        # The held answer of the small model was discarded
+        if answer is None:
+            self.console.info(f"Low confidence answer of {self.small} discarded, answering with {self.large}...")
+            answer, ttft, latency = self._stream(make_chain(self.large), inputs, config)
+            decision.update({
+                "escalated": True,
+                "escalation_model": self.large,
+                "escalation_ttft": ttft,
+                "escalation_latency": latency,
+            })
+
+        if self.large:
+            self._log(decision)
+            if self.verbose:
+                self.console.info(f"Routed to {model} ({reason})" + (f", escalated to {self.large}" if decision["escalated"] else ""))
+        return answer
+
+    def _stream(self, chain: Runnable, inputs: dict, config: dict|None, hold: bool = False) -> tuple[str|None, float|None, float]:
+        """
+        Streams the answer of the chain, returns it with its TTFT and latency.
+        With `hold`, nothing is shown until the answer can be judged, and an
+        answer that is not confident is discarded: None is returned.
+        """
+        start = time.perf_counter()
+        ttft = None
+
+        def timed(stream):
+            nonlocal ttft
+            try:
+                for chunk in stream:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    yield chunk
+            finally:
+                stream.close()
+
+        chunks = timed(chain.stream(inputs, config=config))
+        held = ""
+        if hold:
+            try:
+                with self.console.generation():
+                    for chunk in chunks:
+                        held += chunk
+                        if self.judged(held):
+                            break
+            except KeyboardInterrupt:
+                # Cancelled before it could be judged, kept as in bot_stream
+                chunks.close()
+                self.console.bot_output(held)
+                self.console.interrupted = True
+                self.console.info("Génération interrompue.")
+                return held, ttft, time.perf_counter() - start
+            if not self.confident(held):
+                chunks.close()
+                return None, ttft, time.perf_counter() - start
+
+        def resumed():
+            if held:
+                yield held
+            yield from chunks
+
+        answer = self.console.bot_stream(resumed())
+        return answer, ttft, time.perf_counter() - start
+
+    def _log(self, decision: dict):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(decision) + "\n")
+        except OSError as e:
+            self.console.error(f"Unable to write the routing log : {e}")
@@ -0,0 +1,164 @@
+import os
+import time
+import sqlite3
+import hashlib
+import numpy as np
+
+class SemanticCache:
+    """
+    Answer cache keyed by question embeddings.
+
+    A question whose embedding is within `threshold` (cosine similarity) of a
+    cached question returns the cached answer. Entries are grouped by
+    namespace (the vector store collection they were generated from) so that
+    reingesting a collection only drops its own answers.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        threshold: float = 0.95,
+        path: str|None = None):
+        self.namespace = namespace
+        self.threshold = threshold
+
+        path = path or os.path.join(os.getenv("CACHE_DIR"), "semantic_cache.db")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                question TEXT NOT NULL,
+                question_hash TEXT NOT NULL,
+                embedding BLOB,
+                answer TEXT NOT NULL,
+                latency REAL NOT NULL,
+                created REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_namespace ON entries (namespace);
+            CREATE INDEX IF NOT EXISTS entries_hash ON entries (namespace, question_hash);
+            CREATE TABLE IF NOT EXISTS stats (
+                namespace TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0,
+                saved REAL NOT NULL DEFAULT 0
+            );
+        """)
+
+        # Normalized embeddings of the namespace, loaded on first lookup
+        self._ids: list[int]|None = None
+        self._matrix: np.ndarray|None = None
+
+    @staticmethod
+    def _hash(question: str) -> str:
+        normalized = " ".join(question.lower().split())
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        # A zero embedding (e.g. hashed n-grams of a punctuation-only
+        # question) stays zero and never matches, instead of NaN
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+    def _load(self):
+        rows = self.conn.execute(
+            "SELECT id, embedding FROM entries WHERE namespace = ? AND embedding IS NOT NULL",
+            (self.namespace,)).fetchall()
+
+        self._ids = [row[0] for row in rows]
+        if rows:
+            matrix = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+            self._matrix = self._normalize(matrix)
+        else:
+            self._matrix = None
+
+    def lookup(self, question: str, embedding: list[float]|None = None) -> tuple[str, float]|None:
+        """
+        Returns (answer, similarity) for a cached question close enough to
+        `question`, or None. Without embedding only exact (normalized) matches
+        are considered.
+        """
+        start = time.perf_counter()
+
+        row = self.conn.execute(
+            "SELECT answer, latency FROM entries WHERE namespace = ? AND question_hash = ? LIMIT 1",
+            (self.namespace, self._hash(question))).fetchone()
+        if row:
+            self._record_hit(row[1] - (time.perf_counter() - start))
+            return row[0], 1.0
+
+        if embedding is not None:
+            if self._ids is None:
+                self._load()
+
+            if self._matrix is not None:
+                query = np.asarray(embedding, dtype=np.float32)
+                similarities = self._matrix @ self._normalize(query)
+                best = int(np.argmax(similarities))
+                similarity = float(similarities[best])
+
+                if similarity >= self.threshold:
+                    answer, latency = self.conn.execute(
+                        "SELECT answer, latency FROM entries WHERE id = ?",
+                        (self._ids[best],)).fetchone()
+                    self._record_hit(latency - (time.perf_counter() - start))
+                    return answer, similarity
+
+        self._record_miss()
+        return None
+
+    def store(self, question: str, answer: str, latency: float, embedding: list[float]|None = None):
+        """Caches the answer, `latency` being the time it took to produce it."""
+        blob = np.asarray(embedding, dtype=np.float32).tobytes() if embedding is not None else None
+        cursor = self.conn.execute(
+            "INSERT INTO entries (namespace, question, question_hash, embedding, answer, latency, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self.namespace, question, self._hash(question), blob, answer, latency, time.time()))
+        self.conn.commit()
+
+        if embedding is not None and self._ids is not None:
+            vector = np.frombuffer(blob, dtype=np.float32)
+            vector = self._normalize(vector)[np.newaxis, :]
+            self._ids.append(cursor.lastrowid)
+            self._matrix = vector if self._matrix is None else np.vstack([self._matrix, vector])
+
+    def invalidate(self) -> int:
+        """Drops every entry of the namespace, returns the number of entries removed."""
+        cursor = self.conn.execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+        self.conn.commit()
+        self._ids = None
+        self._matrix = None
+        return cursor.rowcount
+
+    def report(self) -> dict:
+        entries = self.conn.execute(
+            "SELECT COUNT(*) FROM entries WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+        row = self.conn.execute(
+            "SELECT hits, misses, saved FROM stats WHERE namespace = ?", (self.namespace,)).fetchone()
+        hits, misses, saved = row if row else (0, 0, 0.0)
+        lookups = hits + misses
+
+        return {
+            "namespace": self.namespace,
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "latency_saved": saved,
+        }
+
+    def _record_hit(self, saved: float):
+        self._record(hits=1, saved=max(saved, 0.0))
+
+    def _record_miss(self):
+        self._record(misses=1)
+
+    def _record(self, hits: int = 0, misses: int = 0, saved: float = 0.0):
+        self.conn.execute(
+            "INSERT INTO stats (namespace, hits, misses, saved) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (namespace) DO UPDATE SET "
+            "hits = hits + excluded.hits, misses = misses + excluded.misses, saved = saved + excluded.saved",
+            (self.namespace, hits, misses, saved))
+        self.conn.commit()
@@ -0,0 +1,131 @@
+import queue
+import threading
+import socketserver
+from contextlib import contextmanager
+import resources
+from app import ArgumentParser, resolve_paths
+from client import send, receive
+from console import Console
+
+# Line-delimited JSON protocol spoken over the serve daemon's Unix socket:
+#
+#   client -> server  {"argv": [...], "cwd": ...} once, the command line to run
+#                                                and the directory of its paths
+#   server -> client  {"event": "print", ...}    text to display
+#   server -> client  {"event": "input", ...}    the mode waits for user input
+#   client -> server  {"input": "..."}           answer to an input event
+#   server -> client  {"event": "generating", ...} a generation starts or ends
+#   client -> server  {"cancel": true}           Ctrl-C, cancels the generation
+#   server -> client  {"event": "exit", ...}     the mode returned
+#
+# or, to query the daemon instead of running a mode:
+#
+#   client -> server  {"stats": true}
+#   server -> client  {"event": "stats", ...}    the daemon counters
+
+class RemoteConsole(Console):
+    """
+    Console whose input and output go through a daemon client connection.
+
+    Once `listen` is called the client messages are read by a thread of
+    their own, so that a cancel message arriving during a generation is
+    seen: the next bot_chunk raises KeyboardInterrupt, as Ctrl-C does in a
+    local run.
+    """
+
+    def __init__(self, rfile, wfile):
+        super().__init__()
+        self.rfile = rfile
+        self.wfile = wfile
+        self._inputs: queue.Queue[str|None] = queue.Queue()
+        self._cancelled = threading.Event()
+
+    def listen(self):
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        try:
+            while True:
+                message = receive(self.rfile)
+                if message.get("cancel"):
+                    self._cancelled.set()
+                elif "input" in message:
+                    self._inputs.put(message["input"])
+        except (EOFError, OSError, ValueError):
+            # The client went away, the pending input gets EOFError
+            self._inputs.put(None)
+
+    def print(self, *objects, sep: str = " ", end: str = "\n", **kwargs):
+        send(self.wfile, {"event": "print", "text": sep.join(str(o) for o in objects), "end": end})
+
+    def input(self, prompt: str = "", **kwargs) -> str:
+        send(self.wfile, {"event": "input", "prompt": str(prompt)})
+        user_input = self._inputs.get()
+        if user_input is None:
+            raise EOFError("Connection closed")
+        return user_input
+
+    @contextmanager
+    def generation(self):
+        # A cancel sent after the previous generation ended is stale
+        self._cancelled.clear()
+        send(self.wfile, {"event": "generating", "value": True})
+        try:
+            with super().generation():
+                yield
+        finally:
+            try:
+                send(self.wfile, {"event": "generating", "value": False})
+            except OSError:
+                pass
+
+    def bot_chunk(self, chunk: str):
+        if self.generating and self._cancelled.is_set():
+            self._cancelled.clear()
+            raise KeyboardInterrupt
+        super().bot_chunk(chunk)
+
+    def exit(self, code: int):
+        send(self.wfile, {"event": "exit", "code": code})
+
+class _SessionHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        console = RemoteConsole(self.rfile, self.wfile)
+        code = 0
+        try:
+            request = receive(self.rfile)
+            if request.get("stats"):
+                coalescing = resources.coalescing
+                send(self.wfile, {"event": "stats", "coalescing": dict(coalescing.counters) if coalescing else None})
+                return
+            console.listen()
+            # Usage and errors go to the client, not to the daemon's stderr
+            with ArgumentParser.redirect(console):
+                args = self.server.app.parser.parse_args(request["argv"])
+            if request.get("cwd"):
+                resolve_paths(args, request["cwd"])
+            if args.mode == "serve":
+                raise ValueError("Cannot run serve inside the daemon")
+            self.server.app.create(args, console).run()
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 0
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            # Client went away
+            return
+        except Exception as e:
+            console.error(str(e))
+            code = 1
+
+        try:
+            console.exit(code)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+class Server(socketserver.ThreadingUnixStreamServer):
+    """Runs each client session in its own thread, sharing the process resources."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, app):
+        self.app = app
+        super().__init__(path, _SessionHandler)
@@ -0,0 +1,93 @@
+import os
+import time
+import zlib
+import sqlite3
+import threading
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+# Roles are stored as small integers rather than strings
+ROLES = {"human": 0, "ai": 1, "system": 2}
+MESSAGES = {0: HumanMessage, 1: AIMessage, 2: SystemMessage}
+
+class SessionStore:
+    """
+    Chat sessions in a single SQLite file.
+
+    Messages are only ever appended. They are stored zlib-compressed in a
+    table clustered by (session, turn), so reading the last turns of a
+    session does not scan the older ones.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS messages (
+                session TEXT NOT NULL,
+                turn INTEGER NOT NULL,
+                role INTEGER NOT NULL,
+                timestamp REAL NOT NULL,
+                content BLOB NOT NULL,
+                PRIMARY KEY (session, turn)
+            ) WITHOUT ROWID;
+        """)
+
+    def append(self, session: str, message: BaseMessage):
+        with self._lock:
+            self.conn.execute(
+                """
+                INSERT INTO messages (session, turn, role, timestamp, content)
+                SELECT ?, COALESCE(MAX(turn) + 1, 0), ?, ?, ? FROM messages WHERE session = ?
+                """,
+                (session, ROLES[message.type], time.time(), zlib.compress(message.content.encode("utf-8"), 6), session))
+            self.conn.commit()
+
+    def tail(self, session: str, count: int|None = None) -> list[BaseMessage]:
+        """Returns the last `count` messages of the session, every message without count."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT role, content FROM messages WHERE session = ? ORDER BY turn DESC LIMIT ?",
+                (session, count if count else -1)).fetchall()
+        return [MESSAGES[role](zlib.decompress(content).decode("utf-8")) for role, content in reversed(rows)]
+
+    def count(self, session: str) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM messages WHERE session = ?", (session,)).fetchone()[0]
+
+# Messages kept in memory by default for a saved session
+DEFAULT_WINDOW = 40
+
+class SessionHistory(list):
+    """
+    Message history of a mode, holding at most `window` messages in memory.
+
+    With a store and a session id the history starts from the last messages
+    of the session and every message appended is saved, `window` defaulting
+    to DEFAULT_WINDOW. Without them it is a plain in-memory history, bounded
+    only when `window` is given.
+    """
+
+    def __init__(self, store: SessionStore|None = None, session: str|None = None, window: int|None = None):
+        super().__init__()
+        self.store = store if session else None
+        self.session = session
+        self.window = window if window is not None or self.store is None else DEFAULT_WINDOW
+        if self.store is not None:
+            super().extend(self.store.tail(session, window))
+            self._trim()
+
+    def append(self, message: BaseMessage):
+        if self.store is not None:
+            self.store.append(self.session, message)
+        super().append(message)
+        self._trim()
+
+    def _trim(self):
+        if self.window and len(self) > self.window:
+            del self[:len(self) - self.window]
+        # The window starts with a question, not with an answer
+        while self.window and len(self) > 1 and self[0].type == "ai":
+            del self[0]
@@ -0,0 +1,208 @@
+import json
+import hashlib
+import threading
+from typing import Any, Callable, Iterator
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+def request_key(*parts) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class _Flight:
+    def __init__(self):
+        self.items: list = []
+        self.done = False
+        self.error: BaseException|None = None
+        self.waiters = 0
+        self.cancelled = False
+        self.condition = threading.Condition()
+
+class SingleFlight:
+    """
+    Shares one upstream call between identical concurrent requests.
+
+    The first request for a key starts the producer in a background thread,
+    requests arriving while it runs subscribe to the same call and receive
+    every item from the beginning. When all the subscribers are gone the
+    producer is closed, which closes the upstream stream.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[str, _Flight] = {}
+        self.counters = {"requests": 0, "upstream": 0, "coalesced": 0}
+
+    def stream(self, key: str, producer: Callable[[], Iterator]) -> Iterator:
+        with self._lock:
+            self.counters["requests"] += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                with flight.condition:
+                    # A cancelled call is being closed, it will not complete
+                    if flight.cancelled:
+                        flight = None
+                    else:
+                        flight.waiters += 1
+
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                flight.waiters = 1
+                self.counters["upstream"] += 1
+                threading.Thread(target=self._produce, args=(key, flight, producer), daemon=True).start()
+            else:
+                self.counters["coalesced"] += 1
+
+        return self._subscribe(flight)
+
+    def do(self, key: str, function: Callable[[], Any]) -> Any:
+        return list(self.stream(key, lambda: iter([function()])))[0]
+
+    def _produce(self, key: str, flight: _Flight, producer: Callable[[], Iterator]):
+        iterator = None
+        try:
+            iterator = producer()
+            for item in iterator:
+                with flight.condition:
+                    if flight.cancelled:
+                        break
+                    flight.items.append(item)
+                    flight.condition.notify_all()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
+
+    def _subscribe(self, flight: _Flight) -> Iterator:
+        return _Subscription(flight)
+
+class _Subscription:
+    """
+    Iterator of a subscriber over the items of a flight.
+
+    The subscriber is counted as a waiter from the stream() call: it leaves
+    when the flight is read to the end, when it is closed, or when it is
+    garbage collected, even if it was never iterated. A generator would
+    skip its cleanup when closed before its first item.
+    """
+
+    def __init__(self, flight: _Flight):
+        self.flight = flight
+        self.index = 0
+        self.left = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        flight = self.flight
+        with flight.condition:
+            while not self.left and self.index >= len(flight.items) and not flight.done:
+                flight.condition.wait()
+            if not self.left and self.index < len(flight.items):
+                self.index += 1
+                return flight.items[self.index - 1]
+            finished = not self.left
+
+        self.close()
+        if finished and flight.error is not None:
+            raise flight.error
+        raise StopIteration
+
+    def close(self):
+        flight = self.flight
+        with flight.condition:
+            if self.left:
+                return
+            self.left = True
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.done:
+                # Nobody reads the call anymore, stop the upstream request
+                flight.cancelled = True
+
+    def __del__(self):
+        self.close()
+
+class CoalescingChatModel(BaseChatModel):
+    """Chat model sharing identical concurrent generations through a SingleFlight."""
+
+    inner: BaseChatModel
+    name_key: str
+    group: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return self.inner._llm_type
+
+    @property
+    def _identifying_params(self) -> dict:
+        return self.inner._identifying_params
+
+    def _key(self, method: str, messages: list[BaseMessage], stop: list[str]|None, kwargs: dict) -> str:
+        return request_key(method, self.name_key, [message.model_dump() for message in messages], stop, kwargs)
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str]|None = None,
+        run_manager: CallbackManagerForLLMRun|None = None,
+        **kwargs: Any) -> ChatResult:
+        return self.group.do(
+            self._key("generate", messages, stop, kwargs),
+            lambda: self.inner._generate(messages, stop=stop, **kwargs))
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str]|None = None,
+        run_manager: CallbackManagerForLLMRun|None = None,
+        **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        chunks = self.group.stream(
+            self._key("stream", messages, stop, kwargs),
+            lambda: self.inner._stream(messages, stop=stop, **kwargs))
+        for chunk in chunks:
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def bind_tools(self, tools, **kwargs):
+        # Tool calling is left to the wrapped model
+        return self.inner.bind_tools(tools, **kwargs)
+
+    def with_structured_output(self, schema, **kwargs):
+        return self.inner.with_structured_output(schema, **kwargs)
+
+class CoalescingEmbeddings(Embeddings):
+    """Embeddings sharing identical concurrent requests through a SingleFlight."""
+
+    def __init__(self, inner: Embeddings, name_key: str, group: SingleFlight):
+        self.inner = inner
+        self.name_key = name_key
+        self.group = group
+
+    def __getattr__(self, name: str):
+        # Attributes of the wrapped embeddings, such as the name of the
+        # vector space of HashedNgramEmbeddings
+        if "inner" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.group.do(
+            request_key("embed_documents", self.name_key, texts),
+            lambda: self.inner.embed_documents(texts))
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.group.do(
+            request_key("embed_query", self.name_key, text),
+            lambda: self.inner.embed_query(text))
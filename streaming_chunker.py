@@ -0,0 +1,109 @@
+import re
+from typing import Iterable, Iterator
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.?!])\s+")
+
+class StreamingSemanticChunker:
+    """
+    Semantic chunking of a stream of pages, chunks may span pages.
+
+    Like SemanticChunker, each sentence is embedded together with its
+    `buffer_size` neighbours and a chunk ends where the cosine distance
+    between two consecutive sentences is above the `breakpoint_percentile`
+    of the distances. Sentences are embedded `batch_size` at a time whatever
+    the page they come from, and the percentile is taken over the last
+    `window` distances so that chunks are emitted while the pages are read.
+    Chunks keep the metadata of their first page, with `page` and
+    `page_end` set to the pages they span.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: int = 256,
+        breakpoint_percentile: float = 95.0,
+        buffer_size: int = 1,
+        window: int = 1024):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.breakpoint_percentile = breakpoint_percentile
+        self.buffer_size = buffer_size
+        self.window = window
+
+        self.embedding_calls = 0
+        self.sentence_count = 0
+
+    def split_documents(self, pages: Iterable[Document]) -> Iterator[Document]:
+        # Sentences not emitted yet as (text, metadata), `embedded` of them
+        # are embedded and `start` of them belong to emitted chunks
+        self._sentences: list[tuple[str, dict]] = []
+        self._embedded = 0
+        self._start = 0
+        self._previous: np.ndarray|None = None
+        self._distances = np.empty(0, dtype=np.float32)
+
+        for page in pages:
+            for sentence in SENTENCE_SPLIT.split(page.page_content):
+                if sentence.strip():
+                    self._sentences.append((sentence.strip(), page.metadata))
+                    self.sentence_count += 1
+            yield from self._process(final=False)
+
+        yield from self._process(final=True)
+        if self._start < len(self._sentences):
+            yield self._chunk(len(self._sentences))
+
+    def _process(self, final: bool) -> Iterator[Document]:
+        while True:
+            # A sentence is embedded once its right neighbours are known,
+            # counted again after each batch since _trim shifts the indices
+            ready = len(self._sentences) if final else len(self._sentences) - self.buffer_size
+            if not (ready - self._embedded >= self.batch_size or (final and ready > self._embedded)):
+                return
+            end = min(self._embedded + self.batch_size, ready)
+            combined = [
+                " ".join(text for text, _ in self._sentences[max(0, i - self.buffer_size):i + self.buffer_size + 1])
+                for i in range(self._embedded, end)
+            ]
+            vectors = np.asarray(self.embeddings.embed_documents(combined), dtype=np.float32)
+            self.embedding_calls += 1
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+            # Distance of each sentence to the one before it, the last
+            # vector of the previous batch included
+            if self._previous is not None:
+                vectors = np.vstack([self._previous, vectors])
+            distances = 1.0 - np.einsum("ij,ij->i", vectors[:-1], vectors[1:])
+            first = end - len(distances)
+            self._previous = vectors[-1:]
+
+            self._distances = np.concatenate([self._distances, distances])[-self.window:]
+            if len(self._distances):
+                threshold = np.percentile(self._distances, self.breakpoint_percentile)
+                for index in first + np.flatnonzero(distances > threshold):
+                    yield self._chunk(int(index))
+            self._embedded = end
+            self._trim()
+
+    def _chunk(self, end: int) -> Document:
+        """Emits the sentences from the current start up to `end` as a chunk."""
+        sentences = self._sentences[self._start:end]
+        self._start = end
+        metadata = dict(sentences[0][1])
+        metadata["page"] = sentences[0][1].get("page")
+        metadata["page_end"] = sentences[-1][1].get("page")
+        # Chroma does not store None values
+        metadata = {key: value for key, value in metadata.items() if value is not None}
+        return Document(page_content=" ".join(text for text, _ in sentences), metadata=metadata)
+
+    def _trim(self):
+        # Sentences of emitted chunks are dropped, except the neighbours of
+        # sentences still to embed
+        drop = min(self._start, self._embedded - self.buffer_size)
+        if drop > 0:
+            del self._sentences[:drop]
+            self._start -= drop
+            self._embedded -= drop
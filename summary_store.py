@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+class SummaryStore:
+    """
+    Video summaries and transcripts in a single SQLite file.
+
+    Summaries and transcripts are stored zlib-compressed, rows are keyed by
+    video id and indexed by model and timestamp so that lookups and bulk
+    evictions do not scan the store.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS summaries (
+                video_id TEXT PRIMARY KEY,
+                model TEXT,
+                timestamp REAL NOT NULL,
+                summary BLOB NOT NULL,
+                transcript BLOB
+            );
+            CREATE INDEX IF NOT EXISTS summaries_model ON summaries (model);
+            CREATE INDEX IF NOT EXISTS summaries_timestamp ON summaries (timestamp);
+        """)
+
+    @staticmethod
+    def _compress(text: str|None) -> bytes|None:
+        return zlib.compress(text.encode("utf-8"), 6) if text is not None else None
+
+    @staticmethod
+    def _decompress(blob: bytes|None) -> str|None:
+        return zlib.decompress(blob).decode("utf-8") if blob is not None else None
+
+    def get(self, video_id: str) -> tuple[str, str|None]|None:
+        """Returns (summary, transcript) for the video, or None."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT summary, transcript FROM summaries WHERE video_id = ?", (video_id,)).fetchone()
+        if row is None:
+            return None
+        return self._decompress(row[0]), self._decompress(row[1])
+
+    def put(self, video_id: str, summary: str, transcript: str|None = None, model: str|None = None, timestamp: float|None = None):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO summaries (video_id, model, timestamp, summary, transcript) VALUES (?, ?, ?, ?, ?)",
+                (video_id, model, timestamp or time.time(), self._compress(summary), self._compress(transcript)))
+            self.conn.commit()
+
+    def evict(self, older_than: float|None = None, model: str|None = None) -> int:
+        """
+        Deletes the entries created before the `older_than` timestamp and/or
+        generated by `model`, every entry without criteria. Returns the
+        number of entries deleted.
+        """
+        clauses, params = [], []
+        if older_than is not None:
+            clauses.append("timestamp < ?")
+            params.append(older_than)
+        if model is not None:
+            clauses.append("model = ?")
+            params.append(model)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            count = self.conn.execute(f"DELETE FROM summaries{where}", params).rowcount
+            self.conn.commit()
+        return count
+
+    def clear(self) -> int:
+        count = self.evict()
+        with self._lock:
+            self.conn.execute("VACUUM")
+        return count
+
+    def texts(self) -> list[tuple[str, str, str|None]]:
+        """Returns (video_id, summary, transcript) for every video."""
+        with self._lock:
+            rows = self.conn.execute("SELECT video_id, summary, transcript FROM summaries ORDER BY video_id").fetchall()
+        return [(video_id, self._decompress(summary), self._decompress(transcript)) for video_id, summary, transcript in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def state(self) -> tuple[int, float|None]:
+        """(entries, latest timestamp), changes whenever an entry is added, replaced or deleted."""
+        with self._lock:
+            return tuple(self.conn.execute("SELECT COUNT(*), MAX(timestamp) FROM summaries").fetchone())
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def migrate(self, directory: str) -> int:
+        """
+        Imports the JSON files of the former one-file-per-video cache from
+        `directory` and deletes them. Returns the number of files imported.
+        """
+        if not os.path.isdir(directory):
+            return 0
+
+        rows = []
+        imported = []
+        files = [os.path.join(directory, file) for file in os.listdir(directory) if file.endswith(".json")]
+        for file in files:
+            try:
+                with open(file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if "video_id" not in data:
+                continue
+            rows.append((
+                data["video_id"],
+                data.get("model"),
+                data.get("timestamp", time.time()),
+                self._compress(data.get("summary", "")),
+                self._compress(data.get("transcript")),
+            ))
+            imported.append(file)
+
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO summaries (video_id, model, timestamp, summary, transcript) VALUES (?, ?, ?, ?, ?)",
+                rows)
+            self.conn.commit()
+
+        for file in imported:
+            os.remove(file)
+        return len(rows)
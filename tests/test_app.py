@@ -0,0 +1,74 @@
+import pytest
+from argparse import Namespace
+from app import App, ArgumentParser, resolve_paths
+from console import Console
+from mode import Mode, PathArgument
+
+class EchoMode(Mode):
+    def __init__(self, console: Console, model: str = "m", verbose: bool = False):
+        super().__init__(console)
+        self.model = model
+        self.verbose = verbose
+
+    @staticmethod
+    def add_subparser(name, subparser):
+        echo_subparser = subparser.add_parser(name)
+        echo_subparser.add_argument("--model", type=str, default="m")
+        echo_subparser.add_argument("--verbose", "-v", action="store_true")
+
+    def run(self):
+        pass
+
+@pytest.fixture
+def app():
+    app = App(Console())
+    app.use("echo", EchoMode)
+    return app
+
+def test_profile_before_mode_keeps_the_mode(app):
+    args = app.parser.parse_args(["--profile", "echo"])
+    assert args.profile and args.mode == "echo"
+    assert args.profile_dir == "profile"
+
+def test_profile_dir(app):
+    args = app.parser.parse_args(["--profile", "--profile-dir", "out", "echo", "--model", "x"])
+    assert args.profile_dir == "out"
+    assert args.model == "x"
+
+def test_no_profile_by_default(app):
+    args = app.parser.parse_args(["echo"])
+    assert not args.profile and not args.no_daemon
+
+def test_global_options_are_not_passed_to_the_mode(app):
+    args = app.parser.parse_args(["--no-daemon", "--profile", "--profile-dir", "out", "echo", "-v"])
+    mode = app.create(args, Console())
+    assert isinstance(mode, EchoMode)
+    assert mode.verbose and mode.app is app
+
+def test_missing_mode_exits(app):
+    with pytest.raises(SystemExit):
+        app.parser.parse_args(["--profile"])
+
+def test_resolve_paths_only_changes_path_arguments():
+    args = Namespace(book=PathArgument("./x.pdf"), out=PathArgument("/tmp/out"), files=[PathArgument("a"), "b"], model="./m")
+    resolve_paths(args, "/home/user")
+    assert args.book == "/home/user/x.pdf"
+    assert args.out == "/tmp/out"
+    assert args.files == ["/home/user/a", "b"]
+    assert args.model == "./m"
+
+class RecordingConsole(Console):
+    def __init__(self):
+        super().__init__()
+        self.printed = []
+
+    def print(self, *objects, end="\n", **kwargs):
+        self.printed.append("".join(map(str, objects)) + end)
+
+def test_redirected_errors_go_to_the_console(app, capsys):
+    console = RecordingConsole()
+    with ArgumentParser.redirect(console), pytest.raises(SystemExit) as exit:
+        app.parser.parse_args(["echo", "--bogus"])
+    assert exit.value.code == 2
+    assert "unrecognized arguments: --bogus" in "".join(console.printed)
+    assert capsys.readouterr().err == ""
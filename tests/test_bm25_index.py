@@ -0,0 +1,40 @@
+from langchain_core.documents import Document
+from bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+DOCUMENTS = [
+    Document("Les fonctions doivent être courtes et ne faire qu'une chose.", metadata={"page": 1}),
+    Document("Les noms des variables révèlent leurs intentions.", metadata={"page": 2}),
+    Document("Les commentaires ne compensent pas un code mal écrit.", metadata={"page": 3}),
+    Document("Une fonction courte, une fonction lisible : des fonctions courtes.", metadata={"page": 4}),
+]
+
+def test_tokenize_folds_accents_and_case():
+    assert tokenize("Écrit ÉCRIT écrit") == ["ecrit", "ecrit", "ecrit"]
+
+def test_search_ranks_by_term_frequency():
+    results = BM25Index.build(DOCUMENTS).search("fonctions courtes", k=4)
+    assert [document.metadata["page"] for document, _ in results] == [4, 1]
+    assert results[0][1] > results[1][1]
+
+def test_search_without_match():
+    assert BM25Index.build(DOCUMENTS).search("refactoring") == []
+
+def test_save_and_load(tmp_path):
+    index = BM25Index.build(DOCUMENTS)
+    index.save(str(tmp_path))
+    assert BM25Index.exists(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded.documents == DOCUMENTS
+    assert loaded.search("variables intentions") == index.search("variables intentions")
+
+def test_strength():
+    index = BM25Index.build(DOCUMENTS)
+    strong = index.strength("noms variables intentions", index.search("noms variables intentions"))
+    partial = index.strength("variables refactoring", index.search("variables refactoring"))
+    assert 0.0 < partial < strong <= 1.0
+    assert index.strength("refactoring", []) == 0.0
+
+def test_reciprocal_rank_fusion():
+    a, b, c = Document("a"), Document("b"), Document("c")
+    assert reciprocal_rank_fusion([[a, b], [c, b]]) == [b, a, c]
+    assert reciprocal_rank_fusion([[a], []]) == [a]
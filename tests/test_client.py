@@ -0,0 +1,18 @@
+import pytest
+from client import forwardable
+
+@pytest.mark.parametrize("argv, expected", [
+    (["chat"], True),
+    (["chat", "--model", "serve"], True),
+    (["serve"], False),
+    (["--no-daemon", "chat"], False),
+    (["--no-d", "chat"], False),
+    (["--profile", "chat"], False),
+    (["--profile-dir", "chat", "book"], True),
+    (["--profile-dir=out", "book"], True),
+    (["--help"], False),
+    (["-h", "chat"], False),
+    ([], False),
+])
+def test_forwardable(argv, expected):
+    assert forwardable(argv) is expected
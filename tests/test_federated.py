@@ -0,0 +1,131 @@
+import threading
+import pytest
+from langchain_core.documents import Document
+import federated
+from federated import FederatedRetriever, TranscriptSource
+from summary_store import SummaryStore
+
+class Source:
+    def __init__(self, name, results):
+        self.name = name
+        self.results = results
+        self.closed = False
+
+    def search(self, query, k, embedding=None):
+        return self.results
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture(autouse=True)
+def indexes(monkeypatch):
+    monkeypatch.setattr(TranscriptSource, "_indexes", {})
+
+class Hung(Source):
+    def __init__(self, name):
+        super().__init__(name, [])
+        self.release = threading.Event()
+
+    def search(self, query, k, embedding=None):
+        self.release.wait(5.0)
+        return [(Document("late"), 1.0)]
+
+class Failing(Source):
+    def search(self, query, k, embedding=None):
+        raise RuntimeError("store unavailable")
+
+def retriever(monkeypatch, sources, timeout=2.0):
+    monkeypatch.setattr(federated, "default_sources", lambda: {source.name: source for source in sources})
+    return FederatedRetriever([source.name for source in sources], timeout=timeout)
+
+def test_slow_source_is_left_out(monkeypatch):
+    hung = Hung("slow")
+    search = retriever(monkeypatch, [hung, Source("fast", [(Document("a"), 1.0)])], timeout=0.2)
+    try:
+        assert [document.page_content for document in search.search("query")] == ["a"]
+        assert search.report["slow"] == {"status": "timeout", "results": 0}
+        assert search.report["fast"]["status"] == "ok"
+
+        # The hung search keeps its worker, the other sources still answer
+        for _ in range(3):
+            assert [document.page_content for document in search.search("query")] == ["a"]
+            assert search.report["slow"]["status"] == "busy"
+            assert search.report["fast"]["status"] == "ok"
+
+        hung.release.set()
+        search.running["slow"].result(timeout=2.0)
+        assert {document.page_content for document in search.search("query")} == {"a", "late"}
+        assert search.report["slow"]["status"] == "ok"
+    finally:
+        hung.release.set()
+        search.close()
+
+def test_failing_source_is_reported(monkeypatch):
+    search = retriever(monkeypatch, [Failing("broken", []), Source("fast", [(Document("a"), 1.0)])])
+    assert [document.page_content for document in search.search("query")] == ["a"]
+    assert search.report["broken"] == {"status": "error", "error": "store unavailable", "results": 0}
+    assert search.report["fast"] == {"status": "ok", "latency": search.report["fast"]["latency"], "results": 1}
+    search.close()
+
+def test_fusion_ignores_score_scales(monkeypatch):
+    # BM25 scores and negated distances, the second hit of each source
+    # must not lose against the first of the other because of its scale
+    lexical = Source("lexical", [(Document("a"), 12.0), (Document("b"), 11.5)])
+    dense = Source("dense", [(Document("c"), -0.9), (Document("d"), -0.1)])
+    documents = retriever(monkeypatch, [lexical, dense]).search("query", k=4)
+    assert [document.page_content for document in documents][:2] in (["a", "d"], ["d", "a"])
+    assert {document.metadata["source"] for document in documents} == {"lexical", "dense"}
+
+def test_documents_found_twice_rank_first(monkeypatch):
+    first = Source("first", [(Document("a"), 3.0), (Document("b"), 2.0)])
+    second = Source("second", [(Document("c"), 3.0), (Document("b"), 2.0)])
+    documents = retriever(monkeypatch, [first, second]).search("query", k=1)
+    assert documents[0].page_content == "b"
+
+def test_close_closes_the_sources(monkeypatch):
+    source = Source("source", [])
+    retriever(monkeypatch, [source]).close()
+    assert source.closed
+
+def test_transcripts_are_searched(tmp_path):
+    path = str(tmp_path / "summaries.db")
+    store = SummaryStore(path)
+    filler = " ".join(f"mot{i}" for i in range(400))
+    store.put("video1", "Un résumé sur la cuisine.", f"{filler} le refactoring des fonctions longues")
+    store.put("video2", "Un résumé sur les tests unitaires.")
+    store.close()
+
+    source = TranscriptSource(path)
+    try:
+        results = source.search("refactoring", k=2)
+        assert results[0][0].metadata == {"video_id": "video1", "kind": "transcript", "passage": 2}
+        results = source.search("tests unitaires", k=1)
+        assert results[0][0].metadata["video_id"] == "video2"
+    finally:
+        source.close()
+
+def test_index_follows_the_store(tmp_path):
+    path = str(tmp_path / "summaries.db")
+    source = TranscriptSource(path)
+    try:
+        assert source.search("refactoring", k=1) == []
+        store = SummaryStore(path)
+        store.put("video1", "Le refactoring expliqué.")
+        store.close()
+        assert source.search("refactoring", k=1)[0][0].metadata["video_id"] == "video1"
+    finally:
+        source.close()
+
+def test_store_is_opened_once(tmp_path, monkeypatch):
+    opened = []
+    class Store(SummaryStore):
+        def __init__(self, path):
+            opened.append(path)
+            super().__init__(path)
+    monkeypatch.setattr(federated, "SummaryStore", Store)
+    source = TranscriptSource(str(tmp_path / "summaries.db"))
+    for _ in range(3):
+        source.search("refactoring", k=1)
+    source.close()
+    assert len(opened) == 1
+    assert source._store is None
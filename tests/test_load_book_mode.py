@@ -0,0 +1,39 @@
+import pytest
+from langchain_chroma import Chroma
+import resources
+from bench.fakes import ScriptedConsole, write_pdf
+from bm25_index import BM25Index, index_directory
+from modes.load_book_mode import LoadBookMode
+from tests.test_streaming_chunker import RecordingEmbeddings
+
+@pytest.fixture
+def environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path / "cache") + "/")
+    monkeypatch.setenv("VECTOR_STORE_DATA", str(tmp_path / "store"))
+    vector_store = Chroma("books", RecordingEmbeddings(), persist_directory=str(tmp_path / "chroma"))
+    monkeypatch.setattr(resources, "vector_store", lambda collection, provider: vector_store)
+    monkeypatch.setattr(resources, "embeddings", lambda provider: RecordingEmbeddings())
+    return tmp_path, vector_store
+
+def book(path, name):
+    write_pdf(str(path), [[f"Phrase {name} {page}-{i}." for i in range(6)] for page in range(3)])
+    return str(path)
+
+def keyword_index():
+    return BM25Index.load(index_directory("books"))
+
+def test_reloading_a_book_replaces_its_chunks(environment):
+    path, vector_store = environment
+    first = book(path / "first.pdf", "alpha")
+    second = book(path / "second.pdf", "beta")
+    LoadBookMode(ScriptedConsole([]), first).run()
+    LoadBookMode(ScriptedConsole([]), second).run()
+    count = len(keyword_index().documents)
+    assert len(vector_store.get(include=[])["ids"]) == count
+
+    LoadBookMode(ScriptedConsole([]), first).run()
+    documents = keyword_index().documents
+    assert len(documents) == count
+    assert {document.metadata["source"] for document in documents} == {first, second}
+    # Both indexes hold the same chunks
+    assert sorted(vector_store.get(include=["documents"])["documents"]) == sorted(document.page_content for document in documents)
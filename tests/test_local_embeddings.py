@@ -0,0 +1,29 @@
+import numpy as np
+from local_embeddings import HashedNgramEmbeddings
+from singleflight import SingleFlight, CoalescingEmbeddings
+
+def test_vectors_are_normalized_and_deterministic():
+    embeddings = HashedNgramEmbeddings(size=256)
+    vectors = embeddings.encode(["le vent d'automne", "Le vent d'automne", ""])
+    assert vectors.shape == (3, 256)
+    assert np.allclose(np.linalg.norm(vectors[:2], axis=1), 1.0)
+    assert np.allclose(vectors[0], vectors[1])
+    assert not vectors[2].any()
+
+def test_batch_does_not_mix_texts():
+    embeddings = HashedNgramEmbeddings(size=256)
+    texts = ["cerisier en fleurs", "neige sur le mont", "grenouille"]
+    batch = embeddings.encode(texts)
+    for text, vector in zip(texts, batch):
+        assert np.allclose(embeddings.encode([text])[0], vector)
+
+def test_similar_texts_are_closer():
+    embeddings = HashedNgramEmbeddings()
+    query, close, far = embeddings.encode(["cerisiers en fleurs", "les cerisiers fleurissent", "neige sur la montagne"])
+    assert query @ close > query @ far
+
+def test_name_through_coalescing_wrapper():
+    embeddings = HashedNgramEmbeddings()
+    wrapped = CoalescingEmbeddings(embeddings, "local", SingleFlight())
+    assert wrapped.name == embeddings.name == "hashed-ngrams-1024-3-4-5"
+    assert wrapped.embed_query("haiku") == embeddings.embed_query("haiku")
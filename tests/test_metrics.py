@@ -0,0 +1,45 @@
+import threading
+from console import Console
+from metrics import MetricsCallbackHandler, PrometheusTextfile
+
+def series(path) -> dict[str, float]:
+    with open(path, encoding="utf-8") as f:
+        return {key: float(value) for key, value in (line.rsplit(" ", 1) for line in f if not line.startswith("#"))}
+
+def test_counters_survive_runs_and_modes(tmp_path, monkeypatch):
+    path = str(tmp_path / "chatbot.prom")
+    monkeypatch.setenv("METRICS_FILE", str(tmp_path / "metrics.jsonl"))
+    monkeypatch.setenv("PROMETHEUS_TEXTFILE", path)
+
+    for mode, turns in (("ChatMode", 2), ("BookMode", 1), ("ChatMode", 3)):
+        # A new handler per run, as in separate CLI runs
+        handler = MetricsCallbackHandler(Console(), mode)
+        for _ in range(turns):
+            handler.start_turn()
+            handler.cache_hit()
+            handler.end_turn()
+
+    values = series(path)
+    assert values['chatbot_turns_total{mode="ChatMode"}'] == 5
+    assert values['chatbot_cache_hits_total{mode="ChatMode"}'] == 5
+    assert values['chatbot_turns_total{mode="BookMode"}'] == 1
+    assert 'chatbot_last_total_seconds{mode="BookMode"}' in values
+    with open(path, encoding="utf-8") as f:
+        assert f.read().count("# TYPE chatbot_turns_total counter") == 1
+
+def test_concurrent_writers_do_not_lose_updates(tmp_path):
+    path = str(tmp_path / "chatbot.prom")
+    # Separate instances only share the file lock, like separate processes
+    textfiles = [PrometheusTextfile(path) for _ in range(4)]
+
+    def work(textfile):
+        for _ in range(50):
+            textfile.update('{mode="ChatMode"}', {"chatbot_turns_total": 1}, {"chatbot_last_total_seconds": 0.5})
+
+    threads = [threading.Thread(target=work, args=(textfile,)) for textfile in textfiles]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert series(path)['chatbot_turns_total{mode="ChatMode"}'] == 200
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from quantized_index import QuantizedIndex, DTYPES
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(500, 32)).astype(np.float32)
+    documents = [Document(f"document {i}", metadata={"id": i}) for i in range(len(vectors))]
+    return vectors, documents
+
+def exact(vectors, query, k):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return list(np.argsort(-(vectors @ (query / np.linalg.norm(query))))[:k])
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_search_matches_exact_search(data, dtype):
+    vectors, documents = data
+    index = QuantizedIndex.build(vectors, documents, dtype)
+    assert index.dtype == dtype
+    for query in vectors[:20] + 0.1:
+        results = index.search_by_vector(query.tolist(), k=5)
+        assert [document.metadata["id"] for document, _ in results] == exact(vectors, query, 5)
+
+def test_int8_footprint_is_one_byte_per_component(data):
+    vectors, documents = data
+    index = QuantizedIndex.build(vectors, documents, "int8")
+    assert index.memory_footprint() == vectors.size + 4 * len(vectors)
+
+def test_unknown_dtype(data):
+    with pytest.raises(ValueError):
+        QuantizedIndex.build(*data, dtype="int4")
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_save_and_load(tmp_path, data, dtype):
+    vectors, documents = data
+    index = QuantizedIndex.build(vectors, documents, dtype)
+    index.save(str(tmp_path))
+    assert QuantizedIndex.exists(str(tmp_path))
+    loaded = QuantizedIndex.load(str(tmp_path))
+    assert loaded.dtype == dtype
+    assert loaded.documents == documents
+    assert loaded.search_by_vector(vectors[7].tolist(), k=3) == index.search_by_vector(vectors[7].tolist(), k=3)
+
+def test_empty_index():
+    index = QuantizedIndex.build(np.zeros((0, 4), dtype=np.float32), [], "int8")
+    assert index.search_by_vector([1.0, 0.0, 0.0, 0.0]) == []
+
+def test_disk_size_includes_rerank_vectors(data):
+    vectors, documents = data
+    index = QuantizedIndex.build(vectors, documents, "int8")
+    assert index.disk_size() == index.memory_footprint() + vectors.size * 4
+
+def test_is_stale(tmp_path):
+    from langchain_chroma import Chroma
+    from local_embeddings import HashedNgramEmbeddings
+    vector_store = Chroma("haikus", HashedNgramEmbeddings(), persist_directory=str(tmp_path))
+    vector_store.add_texts(["un", "deux"])
+    index = QuantizedIndex.from_vector_store(vector_store, "int8")
+    assert not index.is_stale(vector_store)
+    vector_store.add_texts(["trois"])
+    assert index.is_stale(vector_store)
@@ -0,0 +1,22 @@
+from langchain_chroma import Chroma
+import resources
+from local_embeddings import HashedNgramEmbeddings
+
+def test_legacy_haikus_are_migrated(tmp_path):
+    embeddings = HashedNgramEmbeddings()
+    legacy = Chroma(resources.LEGACY_HAIKU_COLLECTION, embeddings, persist_directory=str(tmp_path))
+    legacy.add_texts(["le vieil étang", "une grenouille plonge"])
+    legacy.add_texts(["bruit de l'eau"], metadatas=[{"auteur": "Bashō"}])
+
+    haikus = Chroma("haikus", embeddings, persist_directory=str(tmp_path))
+    assert resources.migrate_legacy_haikus(haikus, batch_size=2) == 3
+    assert haikus.similarity_search("grenouille", k=1)[0].page_content == "une grenouille plonge"
+    assert haikus.get(where={"auteur": "Bashō"})["documents"] == ["bruit de l'eau"]
+
+    # Only an empty collection is filled
+    assert resources.migrate_legacy_haikus(haikus) == 0
+    assert len(haikus.get(include=[])["ids"]) == 3
+
+def test_nothing_to_migrate(tmp_path):
+    haikus = Chroma("haikus", HashedNgramEmbeddings(), persist_directory=str(tmp_path))
+    assert resources.migrate_legacy_haikus(haikus) == 0
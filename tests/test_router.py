@@ -0,0 +1,77 @@
+import pytest
+from bench.fakes import ScriptedConsole
+from router import ModelRouter
+
+class Chain:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def stream(self, inputs, config=None):
+        try:
+            yield from self.chunks
+        finally:
+            self.closed = True
+
+class Console(ScriptedConsole):
+    def __init__(self):
+        super().__init__([])
+        self.shown = ""
+        self.infos = []
+
+    def bot_chunk(self, chunk):
+        self.shown += chunk
+
+    def bot_output(self, content):
+        self.shown += content
+
+    def info(self, content):
+        self.infos.append(content)
+
+@pytest.fixture
+def router(tmp_path, monkeypatch):
+    monkeypatch.setenv("ROUTING_LOG", str(tmp_path / "routing.jsonl"))
+    return ModelRouter(Console(), "ChatMode", "small", "large")
+
+@pytest.mark.parametrize("text, expected", [
+    ("Bonjour !", ("small", "simple")),
+    ("x" * 601, ("large", "length")),
+    ("Qui ? Quand ?", ("large", "questions")),
+    ("Explique-moi les closures", ("large", "classifier")),
+    ("```print(1)```", ("large", "classifier")),
+])
+def test_route(router, text, expected):
+    assert router.route(text) == expected
+
+def test_route_without_large_model():
+    assert ModelRouter(Console(), "ChatMode", "small").route("x" * 1000) == ("small", "fixed")
+
+@pytest.mark.parametrize("answer, expected", [
+    ("", False),
+    ("Oui.", False),
+    ("Désolé, je ne sais pas répondre à cette question.", False),
+    ("Une closure capture les variables de sa portée englobante.", True),
+    ("x" * 300 + " je ne sais pas", True),
+])
+def test_confident(router, answer, expected):
+    assert router.confident(answer) is expected
+
+def test_confident_answer_is_streamed(router):
+    chunks = ["Une closure ", "capture ", "x" * 300, " fin"]
+    chains = {"small": Chain(chunks), "large": Chain(["grand"])}
+    assert router.stream(chains.get, {}, "Bonjour") == "".join(chunks)
+    assert router.console.shown == "".join(chunks)
+    assert not chains["large"].closed
+
+def test_escalated_answer_is_never_shown(router):
+    chains = {"small": Chain(["Désolé, ", "je ne sais pas."]), "large": Chain(["Une réponse ", "complète."])}
+    assert router.stream(chains.get, {}, "Bonjour") == "Une réponse complète."
+    assert router.console.shown == "Une réponse complète."
+    assert any("discarded" in info for info in router.console.infos)
+
+def test_hedging_small_answer_is_closed_early(router):
+    small = Chain(["Désolé, je ne peux pas." + " " * 10] + ["x" * 100] * 1000)
+    chains = {"small": small, "large": Chain(["Réponse du grand modèle."])}
+    router.stream(chains.get, {}, "Bonjour")
+    assert small.closed
+    assert "x" not in router.console.shown
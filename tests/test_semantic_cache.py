@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from semantic_cache import SemanticCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return SemanticCache("books", threshold=0.9, path=str(tmp_path / "cache.db"))
+
+def test_similar_question_hits(cache):
+    cache.store("Qu'est-ce qu'une fonction ?", "Un bloc de code.", 2.0, [1.0, 0.0, 0.1])
+    assert cache.lookup("C'est quoi une fonction ?", [1.0, 0.0, 0.2]) == ("Un bloc de code.", pytest.approx(0.995, abs=1e-3))
+    assert cache.report()["hits"] == 1
+
+def test_distant_question_misses(cache):
+    cache.store("Qu'est-ce qu'une fonction ?", "Un bloc de code.", 2.0, [1.0, 0.0, 0.0])
+    assert cache.lookup("Qu'est-ce qu'un commentaire ?", [0.6, 0.8, 0.0]) is None
+    assert cache.report()["misses"] == 1
+
+def test_exact_question_without_embedding(cache):
+    cache.store("Qu'est-ce qu'une fonction ?", "Un bloc de code.", 2.0, [1.0, 0.0, 0.0])
+    # Case and spaces are ignored
+    assert cache.lookup("  qu'est-ce   qu'une FONCTION ?") == ("Un bloc de code.", 1.0)
+    assert cache.lookup("Une autre question ?") is None
+
+def test_zero_embeddings_never_match(cache):
+    cache.store("?!", "Rien.", 1.0, [0.0, 0.0, 0.0])
+    cache.store("Qu'est-ce qu'une fonction ?", "Un bloc de code.", 2.0, [1.0, 0.0, 0.0])
+    assert cache.lookup("...", [0.0, 0.0, 0.0]) is None
+    assert cache.lookup("C'est quoi une fonction ?", [1.0, 0.0, 0.0])[0] == "Un bloc de code."
+    assert not np.isnan(cache._matrix).any()
+
+def test_zero_embedding_stored_after_load(cache):
+    cache.store("Qu'est-ce qu'une fonction ?", "Un bloc de code.", 2.0, [1.0, 0.0, 0.0])
+    cache.lookup("Autre ?", [0.0, 1.0, 0.0])
+    cache.store("?!", "Rien.", 1.0, [0.0, 0.0, 0.0])
+    assert cache.lookup("C'est quoi une fonction ?", [1.0, 0.0, 0.0])[0] == "Un bloc de code."
+
+def test_invalidate(cache, tmp_path):
+    other = SemanticCache("haikus", path=str(tmp_path / "cache.db"))
+    other.store("Un haiku ?", "Le vieil étang.", 1.0, [0.0, 1.0, 0.0])
+    cache.store("Qu'est-ce qu'une fonction ?", "Un bloc de code.", 2.0, [1.0, 0.0, 0.0])
+    cache.lookup("Qu'est-ce qu'une fonction ?", [1.0, 0.0, 0.0])
+
+    assert cache.invalidate() == 1
+    assert cache.lookup("Qu'est-ce qu'une fonction ?", [1.0, 0.0, 0.0]) is None
+    # Other namespaces keep their answers
+    assert other.lookup("Un haiku ?") == ("Le vieil étang.", 1.0)
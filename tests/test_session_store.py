@@ -0,0 +1,56 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from session_store import DEFAULT_WINDOW, SessionHistory, SessionStore
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(str(tmp_path / "sessions.db"))
+
+def conversation(turns):
+    for i in range(turns):
+        yield HumanMessage(f"question {i}")
+        yield AIMessage(f"réponse {i}")
+
+def test_tail(store):
+    store.append("s1", SystemMessage("système"))
+    for message in conversation(3):
+        store.append("s1", message)
+    store.append("s2", HumanMessage("autre session"))
+
+    assert [message.content for message in store.tail("s1", 2)] == ["question 2", "réponse 2"]
+    assert [message.type for message in store.tail("s1")] == ["system"] + ["human", "ai"] * 3
+    assert store.count("s1") == 7
+    assert store.tail("unknown") == []
+
+def test_session_persists_across_instances(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    history = SessionHistory(SessionStore(path), "s1")
+    for message in conversation(2):
+        history.append(message)
+
+    resumed = SessionHistory(SessionStore(path), "s1")
+    assert resumed == list(conversation(2))
+    resumed.append(HumanMessage("suite"))
+    assert SessionStore(path).count("s1") == 5
+
+def test_window_starts_with_a_question(store):
+    history = SessionHistory(store, "s1", window=3)
+    for message in conversation(3):
+        history.append(message)
+    # The last three messages would start with an answer
+    assert [message.content for message in history] == ["question 2", "réponse 2"]
+    assert store.count("s1") == 6
+
+    resumed = SessionHistory(store, "s1", window=3)
+    assert [message.content for message in resumed] == ["question 2", "réponse 2"]
+
+def test_default_window(store):
+    assert SessionHistory(store, "s1").window == DEFAULT_WINDOW
+    assert SessionHistory(store, "s1", window=0).window == 0
+
+def test_in_memory_history_is_unbounded():
+    history = SessionHistory()
+    for message in conversation(DEFAULT_WINDOW):
+        history.append(message)
+    assert len(history) == 2 * DEFAULT_WINDOW
+    assert history.store is None
@@ -0,0 +1,140 @@
+import threading
+import time
+import pytest
+from singleflight import CoalescingEmbeddings, SingleFlight
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+class Upstream:
+    """Stream yielding its items once released, recording whether it was closed."""
+
+    def __init__(self, items):
+        self.items = items
+        self.calls = 0
+        self.closed = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        try:
+            for item in self.items:
+                self.release.wait(2.0)
+                yield item
+        finally:
+            self.closed.set()
+
+class Endless(Upstream):
+    """Stream that only ends when closed."""
+
+    def __init__(self):
+        super().__init__(None)
+
+    def __call__(self):
+        self.calls += 1
+        try:
+            item = 0
+            while True:
+                yield item
+                item += 1
+                time.sleep(0.001)
+        finally:
+            self.closed.set()
+
+def test_concurrent_requests_share_the_call():
+    group = SingleFlight()
+    upstream = Upstream([1, 2, 3])
+    first = group.stream("key", upstream)
+    second = group.stream("key", upstream)
+    upstream.release.set()
+    assert list(first) == [1, 2, 3]
+    assert list(second) == [1, 2, 3]
+    assert upstream.calls == 1
+    assert group.counters == {"requests": 2, "upstream": 1, "coalesced": 1}
+
+def test_late_subscriber_gets_every_item():
+    group = SingleFlight()
+    upstream = Endless()
+    first = group.stream("key", upstream)
+    assert [next(first), next(first)] == [0, 1]
+    second = group.stream("key", upstream)
+    assert [next(second) for _ in range(3)] == [0, 1, 2]
+    assert upstream.calls == 1
+    first.close()
+    second.close()
+
+def test_different_keys_are_not_shared():
+    group = SingleFlight()
+    assert group.do("a", lambda: 1) == 1
+    assert group.do("b", lambda: 2) == 2
+    assert group.counters["upstream"] == 2
+
+def test_error_reaches_every_subscriber():
+    group = SingleFlight()
+    release = threading.Event()
+    def failing():
+        release.wait(2.0)
+        yield 1
+        raise RuntimeError("upstream failed")
+    streams = [group.stream("key", failing) for _ in range(2)]
+    release.set()
+    for stream in streams:
+        with pytest.raises(RuntimeError, match="upstream failed"):
+            list(stream)
+    # The failed call is forgotten
+    assert group.do("key", lambda: 42) == 42
+
+def test_upstream_closed_when_every_subscriber_leaves():
+    group = SingleFlight()
+    upstream = Endless()
+    streams = [group.stream("key", upstream) for _ in range(2)]
+    for stream in streams:
+        next(stream)
+    streams[0].close()
+    assert not upstream.closed.is_set()
+    streams[1].close()
+    wait_for(upstream.closed.is_set)
+
+def test_new_request_after_cancellation_starts_a_call():
+    group = SingleFlight()
+    upstream = Endless()
+    stream = group.stream("key", upstream)
+    next(stream)
+    stream.close()
+    assert list(group.stream("key", lambda: iter([7]))) == [7]
+
+def test_coalescing_embeddings():
+    class Embeddings:
+        name = "hashed"
+        def __init__(self):
+            self.calls = 0
+        def embed_documents(self, texts):
+            self.calls += 1
+            return [[float(len(text))] for text in texts]
+        def embed_query(self, text):
+            return self.embed_documents([text])[0]
+
+    inner = Embeddings()
+    embeddings = CoalescingEmbeddings(inner, "model", SingleFlight())
+    assert embeddings.embed_query("abc") == [3.0]
+    assert embeddings.embed_documents(["a", "bb"]) == [[1.0], [2.0]]
+    assert embeddings.name == "hashed"
+
+def test_subscriber_never_iterated_leaves_on_close():
+    group = SingleFlight()
+    upstream = Endless()
+    stream = group.stream("key", upstream)
+    stream.close()
+    wait_for(upstream.closed.is_set)
+
+def test_subscriber_never_iterated_leaves_when_collected():
+    group = SingleFlight()
+    upstream = Endless()
+    reader = group.stream("key", upstream)
+    group.stream("key", upstream)  # dropped at once
+    next(reader)
+    reader.close()
+    wait_for(upstream.closed.is_set)
@@ -0,0 +1,123 @@
+import os
+import numpy as np
+import pytest
+from langchain_chroma import Chroma
+import resources
+from bench.fakes import ScriptedConsole
+from local_embeddings import HashedNgramEmbeddings
+from singleflight import SingleFlight
+from modes.store_mode import StoreMode, add_rows, directory_size, embedding_model, export_collection, import_collection
+
+@pytest.fixture
+def coalescing(monkeypatch):
+    # Like the serve daemon: every embeddings object is wrapped
+    monkeypatch.setattr(resources, "coalescing", SingleFlight())
+    monkeypatch.setattr(resources, "_embeddings", {})
+
+def test_local_embedding_model_in_the_daemon(coalescing):
+    assert embedding_model("local") == HashedNgramEmbeddings().name
+
+def test_ollama_embedding_model(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_MODEL", "mxbai-embed-large")
+    assert embedding_model("ollama") == "mxbai-embed-large"
+    assert embedding_model("openai") is None
+
+class RecordingConsole(ScriptedConsole):
+    def __init__(self):
+        super().__init__([])
+        self.infos = []
+        self.errors = []
+
+    def info(self, content):
+        self.infos.append(content)
+
+    def error(self, content):
+        self.errors.append(content)
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_STORE_DATA", str(tmp_path / "store"))
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path / "cache") + "/")
+    monkeypatch.setattr(resources, "coalescing", None)
+    monkeypatch.setattr(resources, "_embeddings", {})
+    monkeypatch.setattr(resources, "_vector_stores", {})
+    return tmp_path / "store"
+
+def fill(vector_store, count, dimension=16, metadata=True):
+    rng = np.random.default_rng(0)
+    add_rows(
+        vector_store,
+        [f"id{i}" for i in range(count)],
+        rng.normal(size=(count, dimension)).astype(np.float32),
+        [f"chunk {i} " + "x" * 200 for i in range(count)],
+        [{"index": i} if metadata else None for i in range(count)])
+
+def test_compact_reclaims_space(store):
+    vector_store = resources.vector_store("haikus-local", "local")
+    fill(vector_store, 2000)
+    vector_store.delete(ids=[f"id{i}" for i in range(0, 2000, 2)])
+    size = directory_size(str(store))
+
+    console = RecordingConsole()
+    StoreMode(console, "compact", collection=["haikus-local"]).run()
+    assert directory_size(str(store)) < size
+    assert vector_store._collection.count() == 1000
+    assert len(vector_store.similarity_search_by_vector([1.0] * 16, k=2)) == 2
+    assert not os.path.exists(store / "compact")
+
+def test_stats_skips_collections_failing_to_open(store, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    console = RecordingConsole()
+    StoreMode(console, "stats", collection=["haikus-local", "books"]).run()
+    assert len(console.errors) == 1 and "books" in console.errors[0]
+    assert any(info.startswith("Collection haikus-local") for info in console.infos)
+    assert sum(info.startswith("Store total size") for info in console.infos) == 1
+
+def rows(vector_store):
+    data = vector_store.get(include=["documents", "metadatas", "embeddings"])
+    return sorted(
+        (id, document, tuple(sorted((metadata or {}).items())), tuple(np.round(embedding, 5)))
+        for id, document, metadata, embedding in zip(data["ids"], data["documents"], data["metadatas"], data["embeddings"]))
+
+def test_export_import_round_trip(store, tmp_path):
+    source = resources.vector_store("haikus-local", "local")
+    fill(source, 30)
+    # Rows without metadata are added apart by add_rows
+    source._collection.add(ids=["bare"], embeddings=[[0.5] * 16], documents=["sans métadonnées"])
+
+    assert export_collection(source, str(tmp_path / "snapshot"), batch_size=7) == 31
+    target = Chroma("copy", resources.embeddings("local"), persist_directory=str(store))
+    assert import_collection(target, str(tmp_path / "snapshot"), batch_size=7) == (31, 31)
+    assert rows(target) == rows(source)
+
+    # Ids already in the collection are skipped
+    assert import_collection(target, str(tmp_path / "snapshot")) == (31, 0)
+
+def test_import_reports_skipped_chunks(store, tmp_path):
+    vector_store = resources.vector_store("haikus-local", "local")
+    fill(vector_store, 3)
+    StoreMode(RecordingConsole(), "export", collection=["haikus-local"], directory=str(tmp_path / "snapshots")).run()
+
+    console = RecordingConsole()
+    StoreMode(console, "import", collection=["haikus-local"], directory=str(tmp_path / "snapshots")).run()
+    assert any(info.startswith("Collection haikus-local : 0 chunks imported") for info in console.infos)
+    assert console.errors and "3 chunks" in console.errors[0]
+
+    console = RecordingConsole()
+    StoreMode(console, "import", collection=["haikus-local"], directory=str(tmp_path / "snapshots"), replace=True).run()
+    assert any(info.startswith("Collection haikus-local : 3 chunks imported") for info in console.infos)
+    assert not console.errors
+
+def test_dedup(store):
+    vector_store = resources.vector_store("haikus-local", "local")
+    rng = np.random.default_rng(0)
+    documents = ["a", "b", "a", "c", "b", "a"]
+    add_rows(vector_store, [f"id{i}" for i in range(6)], rng.normal(size=(6, 16)).astype(np.float32), documents, [{"i": i} for i in range(6)])
+
+    console = RecordingConsole()
+    StoreMode(console, "dedup", collection=["haikus-local"]).run()
+    data = vector_store.get(include=["documents"])
+    assert sorted(data["documents"]) == ["a", "b", "c"]
+    # The first copy of each chunk is kept
+    assert sorted(data["ids"]) == ["id0", "id1", "id3"]
+    assert "3 duplicates deleted" in console.infos[0]
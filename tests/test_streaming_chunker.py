@@ -0,0 +1,42 @@
+import zlib
+import pytest
+from langchain_core.documents import Document
+from streaming_chunker import StreamingSemanticChunker
+
+class RecordingEmbeddings:
+    """Records the embedded texts, vectors depend on the text only."""
+
+    def __init__(self):
+        self.texts = []
+
+    def embed_documents(self, texts):
+        self.texts.extend(texts)
+        return [[1.0, zlib.crc32(text.encode()) % 97 / 10.0] for text in texts]
+
+def pages(count, sentences):
+    return [
+        Document(" ".join(f"Phrase {page}-{i}." for i in range(sentences)), metadata={"page": page})
+        for page in range(count)
+    ]
+
+@pytest.mark.parametrize("batch_size", [1, 2, 3, 7, 256])
+@pytest.mark.parametrize("buffer_size", [0, 1, 2])
+def test_every_sentence_once_in_order(batch_size, buffer_size):
+    sentences = [f"Phrase {page}-{i}." for page in range(12) for i in range(9)]
+    embeddings = RecordingEmbeddings()
+    chunker = StreamingSemanticChunker(embeddings, batch_size=batch_size, buffer_size=buffer_size, breakpoint_percentile=80.0)
+    chunks = list(chunker.split_documents(pages(12, 9)))
+
+    assert len(chunks) > 1
+    assert " ".join(chunk.page_content for chunk in chunks).split(" ") == " ".join(sentences).split(" ")
+    # Each sentence is embedded once, with its neighbours
+    assert embeddings.texts == [
+        " ".join(sentences[max(0, i - buffer_size):i + buffer_size + 1])
+        for i in range(len(sentences))
+    ]
+    assert chunker.sentence_count == len(sentences)
+
+def test_chunks_span_pages():
+    chunks = list(StreamingSemanticChunker(RecordingEmbeddings(), batch_size=4).split_documents(pages(3, 2)))
+    assert chunks[0].metadata["page"] == 0
+    assert chunks[-1].metadata["page_end"] == 2
@@ -0,0 +1,73 @@
+import json
+import sqlite3
+import pytest
+from summary_store import SummaryStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = SummaryStore(str(tmp_path / "summaries.db"))
+    yield store
+    store.close()
+
+def test_compression_round_trip(store):
+    transcript = "Bonjour à tous, aujourd'hui on parle de refactoring. " * 200
+    store.put("video1", "Un résumé — avec des accents.", transcript, model="llama3.2:3b")
+    store.put("video2", "Sans transcription.")
+    assert store.get("video1") == ("Un résumé — avec des accents.", transcript)
+    assert store.get("video2") == ("Sans transcription.", None)
+    assert store.get("unknown") is None
+
+    size = sqlite3.connect(store.path).execute("SELECT LENGTH(transcript) FROM summaries WHERE video_id = 'video1'").fetchone()[0]
+    assert size < len(transcript.encode("utf-8")) / 10
+
+def test_evict_by_model(store):
+    store.put("a", "A", model="llama3.2:1b")
+    store.put("b", "B", model="llama3.2:3b")
+    store.put("c", "C", model="llama3.2:1b")
+    assert store.evict(model="llama3.2:1b") == 2
+    assert [video_id for video_id, _, _ in store.texts()] == ["b"]
+
+def test_evict_by_age(store):
+    store.put("old", "A", timestamp=1000.0)
+    store.put("recent", "B", timestamp=3000.0)
+    assert store.evict(older_than=2000.0) == 1
+    assert store.get("old") is None
+    assert store.get("recent") == ("B", None)
+
+def test_evict_by_age_and_model(store):
+    store.put("a", "A", model="m1", timestamp=1000.0)
+    store.put("b", "B", model="m2", timestamp=1000.0)
+    store.put("c", "C", model="m1", timestamp=3000.0)
+    assert store.evict(older_than=2000.0, model="m1") == 1
+    assert [video_id for video_id, _, _ in store.texts()] == ["b", "c"]
+
+def test_clear(store):
+    store.put("a", "A")
+    store.put("b", "B")
+    assert store.clear() == 2
+    assert store.count() == 0
+
+def test_migration_round_trip(store, tmp_path):
+    directory = tmp_path / "summaries_cache"
+    directory.mkdir()
+    (directory / "video1.json").write_text(json.dumps({
+        "video_id": "video1", "summary": "Résumé 1", "transcript": "Transcription 1",
+        "model": "llama3.2:3b", "timestamp": 1234.0,
+    }), encoding="utf-8")
+    (directory / "video2.json").write_text(json.dumps({"video_id": "video2", "summary": "Résumé 2"}), encoding="utf-8")
+    (directory / "broken.json").write_text("{", encoding="utf-8")
+    (directory / "notes.txt").write_text("ignored", encoding="utf-8")
+
+    assert store.migrate(str(directory)) == 2
+    assert store.get("video1") == ("Résumé 1", "Transcription 1")
+    assert store.get("video2") == ("Résumé 2", None)
+    assert store.evict(model="llama3.2:3b", older_than=2000.0) == 1
+    # Imported files are deleted, the others are left
+    assert sorted(path.name for path in directory.iterdir()) == ["broken.json", "notes.txt"]
+
+    # A second run finds nothing to import
+    assert store.migrate(str(directory)) == 0
+    assert store.count() == 1
+
+def test_migration_without_directory(store, tmp_path):
+    assert store.migrate(str(tmp_path / "missing")) == 0
@@ -0,0 +1,65 @@
+import time
+import threading
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+from console import Console
+from tool_calling import ToolCallingLoop
+
+release = threading.Event()
+
+@tool
+def slow(query: str) -> str:
+    """Answers after a long time."""
+    release.wait(10)
+    return "slow"
+
+@tool
+def add(a: int, b: int) -> int:
+    """Adds two numbers."""
+    return a + b
+
+class ScriptedModel:
+    """Model answering with the scripted messages, in order."""
+
+    def __init__(self, responses: list[AIMessage]):
+        self.responses = responses
+        self.calls = 0
+
+    def bind_tools(self, tools):
+        return self
+
+    def invoke(self, messages, config=None):
+        self.calls += 1
+        return self.responses.pop(0)
+
+def call(name: str, id: str, **args) -> dict:
+    return {"name": name, "args": args, "id": id, "type": "tool_call"}
+
+def test_tool_calls_run_and_answer():
+    model = ScriptedModel([
+        AIMessage(content="", tool_calls=[call("add", "1", a=1, b=2), call("add", "2", a=3, b=4)]),
+        AIMessage(content="3 et 7"),
+    ])
+    messages = [HumanMessage("?")]
+    answer = ToolCallingLoop(model, [add], Console()).run(messages)
+    assert answer.content == "3 et 7"
+    assert [m.content for m in messages if isinstance(m, ToolMessage)] == ["3", "7"]
+    assert messages[-1] is answer
+
+def test_hung_tool_does_not_block_past_the_deadline():
+    model = ScriptedModel([
+        AIMessage(content="", tool_calls=[call("slow", "1", query="x")]),
+        AIMessage(content="never asked"),
+    ])
+    messages = [HumanMessage("?")]
+    start = time.perf_counter()
+    try:
+        answer = ToolCallingLoop(model, [slow], Console(), max_time=0.2).run(messages)
+    finally:
+        release.set()
+    assert time.perf_counter() - start < 2
+    assert "Time budget" in answer.content
+    assert messages[-1] is answer
+    assert messages[-2].status == "error"
+    # No model call once the budget is spent
+    assert model.calls == 1
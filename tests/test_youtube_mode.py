@@ -0,0 +1,51 @@
+import pytest
+from bench.fakes import FakeTranscript, FakeTranscriptList, ScriptedConsole
+from modes.youtube_mode import YoutubeMode
+
+class Api:
+    def __init__(self, transcripts):
+        self.transcripts = transcripts
+        self.listings = 0
+
+    def list_transcripts(self, video_id):
+        self.listings += 1
+        return FakeTranscriptList(self.transcripts)
+
+class Translatable(FakeTranscript):
+    def translate(self, language_code):
+        return FakeTranscript(language_code, 0.0, f"traduction {language_code}", translatable=False)
+
+@pytest.fixture
+def mode(tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path) + "/")
+    monkeypatch.setattr(YoutubeMode, "_transcript_lists", type(YoutubeMode._transcript_lists)())
+    return lambda api: _mode(api, monkeypatch)
+
+def _mode(api, monkeypatch):
+    monkeypatch.setattr(YoutubeMode, "transcript_api", api)
+    return YoutubeMode(ScriptedConsole([]), url="https://youtu.be/abcdefghijk")
+
+def test_french_transcript_wins_over_faster_translation(mode):
+    api = Api([FakeTranscript("fr", 0.2, "original"), Translatable("de", 0.0, "")])
+    assert mode(api).get_transcript("abcdefghijk") == "original"
+
+def test_translation_when_french_fails(mode):
+    api = Api([FakeTranscript("fr", 0.0, "", fails=True), Translatable("de", 0.0, "")])
+    assert mode(api).get_transcript("abcdefghijk") == "traduction fr"
+
+def test_listing_cache_is_bounded(mode, monkeypatch):
+    monkeypatch.setattr(YoutubeMode, "transcript_lists_size", 2)
+    api = Api([FakeTranscript("fr", 0.0, "original")])
+    youtube = mode(api)
+    for video_id in ("a", "b", "a", "c", "a"):
+        youtube.list_transcripts(video_id)
+    assert list(YoutubeMode._transcript_lists) == ["c", "a"]
+    assert api.listings == 3
+
+def test_listing_cache_expires(mode, monkeypatch):
+    api = Api([FakeTranscript("fr", 0.0, "original")])
+    youtube = mode(api)
+    youtube.list_transcripts("a")
+    monkeypatch.setattr(YoutubeMode, "transcript_lists_ttl", 0.0)
+    youtube.list_transcripts("a")
+    assert api.listings == 2
@@ -0,0 +1,137 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.tools import BaseTool
+from console import Console
+
+class ToolCallingLoop:
+    """
+    Runs the model / tools loop until the model answers without tool calls.
+
+    All the tool calls of a model turn are executed concurrently, so a
+    question needing several tools costs one model round-trip instead of one
+    per tool. Results of the tools listed in `deterministic` are memoized for
+    the lifetime of the loop. `max_steps` bounds the number of model turns
+    and `max_time` the total duration.
+    """
+
+    def __init__(
+        self,
+        llm: BaseChatModel,
+        tools: list[BaseTool],
+        console: Console,
+        deterministic: set[str]|None = None,
+        max_steps: int = 5,
+        max_time: float = 60.0,
+        max_workers: int = 4,
+        verbose: bool = False):
+        self.llm = llm
+        self.model = llm.bind_tools(tools)
+        self.tools = {tool.name: tool for tool in tools}
+        self.console = console
+        self.deterministic = deterministic or set()
+        self.max_steps = max_steps
+        self.max_time = max_time
+        self.max_workers = max_workers
+        self.verbose = verbose
+
+        self.memo: dict[tuple[str, str], object] = {}
+        self.steps: list[dict] = []
+
+    def run(self, messages: list[BaseMessage], config: dict|None = None) -> AIMessage:
+        """Appends the model and tool messages to `messages`, returns the final answer."""
+        deadline = time.perf_counter() + self.max_time
+
+        # Not a with block: leaving it would wait for the tools still running
+        # past the deadline
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            for step in range(self.max_steps):
+                if time.perf_counter() >= deadline:
+                    return self._out_of_time(messages, step)
+
+                start = time.perf_counter()
+                response = self.model.invoke(messages, config=config)
+                model_time = time.perf_counter() - start
+                messages.append(response)
+
+                if not response.tool_calls:
+                    self._report(step, model_time)
+                    return response
+
+                start = time.perf_counter()
+                tool_messages, cached = self._execute(executor, response.tool_calls, deadline)
+                messages.extend(tool_messages)
+                self._report(step, model_time, len(tool_messages), time.perf_counter() - start, cached)
+
+            if time.perf_counter() >= deadline:
+                return self._out_of_time(messages, self.max_steps)
+
+            # Step budget exhausted: ask for an answer from the results gathered so far
+            response = self.llm.invoke(messages, config=config)
+            messages.append(response)
+            return response
+        finally:
+            # Timed out tools are abandoned, their threads end on their own
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _out_of_time(self, messages: list[BaseMessage], steps: int) -> AIMessage:
+        response = AIMessage(content=f"Time budget of {self.max_time:.0f}s exhausted after {steps} steps.")
+        messages.append(response)
+        return response
+
+    def _execute(self, executor: ThreadPoolExecutor, tool_calls: list[dict], deadline: float) -> tuple[list[ToolMessage], int]:
+        results: dict[str, object] = {}
+        futures = {}
+        cached = 0
+
+        for call in tool_calls:
+            key = (call["name"], json.dumps(call["args"], sort_keys=True))
+            if key in self.memo:
+                results[call["id"]] = self.memo[key]
+                cached += 1
+            elif call["name"] not in self.tools:
+                results[call["id"]] = ValueError(f"Unknown tool {call['name']}")
+            else:
+                futures[call["id"]] = executor.submit(self.tools[call["name"]].invoke, call["args"])
+
+        done, _ = wait(futures.values(), timeout=max(deadline - time.perf_counter(), 0))
+
+        messages = []
+        for call in tool_calls:
+            future = futures.get(call["id"])
+            if future is not None:
+                if future not in done:
+                    future.cancel()
+                    results[call["id"]] = TimeoutError("Tool call timed out")
+                elif future.exception() is not None:
+                    results[call["id"]] = future.exception()
+                else:
+                    results[call["id"]] = future.result()
+                    if call["name"] in self.deterministic:
+                        self.memo[(call["name"], json.dumps(call["args"], sort_keys=True))] = results[call["id"]]
+
+            result = results[call["id"]]
+            messages.append(ToolMessage(
+                content=f"Error: {result}" if isinstance(result, Exception) else str(result),
+                tool_call_id=call["id"],
+                name=call["name"],
+                status="error" if isinstance(result, Exception) else "success"))
+
+        return messages, cached
+
+    def _report(self, step: int, model_time: float, calls: int = 0, tools_time: float = 0.0, cached: int = 0):
+        self.steps.append({
+            "step": step + 1,
+            "model": model_time,
+            "tool_calls": calls,
+            "tools": tools_time,
+            "cached": cached,
+        })
+        if self.verbose:
+            line = f"Step {step + 1}: model {model_time:.2f}s"
+            if calls:
+                line += f" | {calls} tool calls {tools_time:.3f}s ({cached} cached)"
+            self.console.info(line)